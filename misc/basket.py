@@ -77,9 +77,10 @@ def get_membership_function(domain, def_linear_picewise):
     return array
 
 
-def basquet_qrbs(throw, height, qpu, type_qpu=None, shots=None, model='cf', rule_certainty=1.0):
+def basket_system(throw, height, rule_certainty=1.0):
     """
-    QRBS for a basket dummy problem
+    Build the QRBS for a basket dummy problem, with the precision of the
+    input facts loaded for a player
 
     Parameters
     ----------
@@ -87,14 +88,17 @@ def basquet_qrbs(throw, height, qpu, type_qpu=None, shots=None, model='cf', rule
         Number of target trhows (of 20)
     height : int
         Height in cm
-    qpu : QLM QPU
-        QLM QPU for executing the quantum circuits
-    type_qpu: QLM QPU
-        QLM QPU for executing the quantum circuits
-    shots : int
-        number of shots
-    model : str
-        indetermination propagation model
+    rule_certainty : float
+        certainty of the rules
+
+    Returns
+    ----------
+    basket : QRBS
+        the QRBS of the problem
+    output : list
+        output facts: bad, normal, good and very good player
+    additional_info : list
+        intermediate facts of the bad player rules
     """
     # Instantiate the QRBS
     basket = QRBS()
@@ -194,11 +198,34 @@ def basquet_qrbs(throw, height, qpu, type_qpu=None, shots=None, model='cf', rule
     for fact in list_height:
         fact.precision = degree_of_membership(height, fact.value)
     # print([fact.precision for fact in list_height])
+    additional_info = [throw_bad_player, small_player, normal_regular]
+    return basket, output, additional_info
+
+
+def basquet_qrbs(throw, height, qpu, type_qpu=None, shots=None, model='cf', rule_certainty=1.0):
+    """
+    QRBS for a basket dummy problem
+
+    Parameters
+    ----------
+    throw : int
+        Number of target trhows (of 20)
+    height : int
+        Height in cm
+    qpu : QLM QPU
+        QLM QPU for executing the quantum circuits
+    type_qpu: QLM QPU
+        QLM QPU for executing the quantum circuits
+    shots : int
+        number of shots
+    model : str
+        indetermination propagation model
+    """
+    basket, output, additional_info = basket_system(throw, height, rule_certainty)
     # Inference Execution
     qpu.execute(basket, qpu=type_qpu, shots=shots, model=model)
     # Output post processing
     #output_precision = [fact.precision for fact in output]
-    additional_info = [throw_bad_player, small_player, normal_regular]
     score_domain = np.array(range(0, 101))
 
     # Computing degree of membership for each output fact for the input player
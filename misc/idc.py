@@ -10,6 +10,7 @@ import pandas as pd
 sys.path.append("../")
 from neasqc_qrbs.qrbs import QRBS
 from neasqc_qrbs.knowledge_rep import AndOperator, OrOperator, NotOperator
+from neasqc_qrbs.estimation import AmplitudeEstimationQPU
 from selectable_qpu import SelectableQPU
 
 def save(save, save_name, input_pdf, save_mode):
@@ -145,7 +146,7 @@ def load_data_in_qrbs(row, qrbs):
             fact.precision = row[fact.attribute]
     return qrbs
 
-def solve_qrbs(qrbs, qpu, shots=100, model="cf"):
+def solve_qrbs(qrbs, qpu, shots=100, model="cf", ae_epsilon=None, ae_method="iterative"):
     """
     Solved a propely initialized qrbs
     Parameters
@@ -155,17 +156,36 @@ def solve_qrbs(qrbs, qpu, shots=100, model="cf"):
     qpu : QLM qpu
         QLM qpu for solving the quantum circuits
     shots : int
-        Number of shots for measuring the quantum circuits
+        Number of shots for measuring the quantum circuits. When using
+        amplitude estimation, number of shots of each round
     model : string
         String with the inacuracy propagation model: cf, fuzzy, bayes
+    ae_epsilon : float
+        If given, the probabilities of the outputs are estimated by
+        amplitude estimation, with this maximum half-width
+    ae_method : string
+        Amplitude estimation method: iterative, maximum_likelihood
     Return
     ------
     pdf : pandas DataFrame
         Dataframe with the solution
     """
     
-    inference_engine = SelectableQPU()
-    inference_engine.execute(qrbs, qpu=qpu, shots=shots, model=model)
+    if ae_epsilon is None:
+        inference_engine = SelectableQPU()
+        inference_engine.execute(qrbs, qpu=qpu, shots=shots, model=model)
+    else:
+        reports = AmplitudeEstimationQPU.execute(
+            qrbs, qpu=qpu, model=model, method=ae_method,
+            epsilon=ae_epsilon, shots=shots or 100)
+        # The precision of the outputs is their probability, as written
+        # by SelectableQPU
+        probabilities = {}
+        for report in reports:
+            probabilities.update(report['probabilities'])
+        for fact in qrbs._memory._facts:
+            if fact.attribute in probabilities:
+                fact.precision = min(probabilities[fact.attribute], 1.0)
     output_label = ["IA", "IB", "IIA", "IIB", "IIIA", "IIIB", "IIIC", "IV"]
     output_precision = []
     output_names = []
@@ -177,7 +197,7 @@ def solve_qrbs(qrbs, qpu, shots=100, model="cf"):
     pdf = pd.DataFrame(output_precision, index = output_names).T
     return pdf
 
-def idc_qrbs(row, qpu=None, shots=None, model='cf'):
+def idc_qrbs(row, qpu=None, shots=None, model='cf', ae_epsilon=None):
     """
     QRBS implementation of the IDC
     Parameters
@@ -190,6 +210,9 @@ def idc_qrbs(row, qpu=None, shots=None, model='cf'):
         Number of shots for measuring the quantum circuits
     model : string
         String with the inacuracy propagation model: cf, fuzzy, bayes
+    ae_epsilon : float
+        If given, maximum half-width of the probabilities of the outputs,
+        estimated by amplitude estimation
     Return
     ------
     pdf : pandas DataFrame
@@ -198,7 +221,7 @@ def idc_qrbs(row, qpu=None, shots=None, model='cf'):
     # Create qrbs
     idc = qrbs_idc()
     idc = load_data_in_qrbs(row, idc)
-    pdf = solve_qrbs(idc, qpu, shots=shots, model=model)
+    pdf = solve_qrbs(idc, qpu, shots=shots, model=model, ae_epsilon=ae_epsilon)
     return pdf
     
     
@@ -421,7 +444,7 @@ def prepare_input():
 
     return tmn_final
 
-def exe(qpu_cfg, qpu, shots, model, save_name, save_):
+def exe(qpu_cfg, qpu, shots, model, save_name, save_, ae_epsilon=None):
     tmn_final = prepare_input()
     tmn_compatible = [
         "T1 N0 M0", "T0 N1 M0", "T1 N1 M0", "T0 N1 M0", "T1 N1 M0", "T2 N0 M0",
@@ -432,7 +455,7 @@ def exe(qpu_cfg, qpu, shots, model, save_name, save_):
         step_tmn = tmn_final[tmn_final["tmn"] == tmn]
         row = step_tmn.iloc[0]
         tick = time.time()
-        step = idc_qrbs(row, qpu, shots, model)
+        step = idc_qrbs(row, qpu, shots, model, ae_epsilon)
         tack = time.time()
         step["elapsed"] = tack - tick
         pdf_row = pd.DataFrame(row).T.reset_index(drop=True)
@@ -495,6 +518,13 @@ if __name__ == "__main__":
         default="cf",
         help="Inferential model desired: cf, bayes, fuzzy"
     )
+    parser.add_argument(
+        "-ae_epsilon",
+        dest="ae_epsilon",
+        type=float,
+        default=None,
+        help="Precision of the outputs estimated by amplitude estimation",
+    )
     parser.add_argument(
         "-name",
         dest="base_name",
@@ -541,4 +571,6 @@ if __name__ == "__main__":
             qpu_cfg = final_list[args.id]
             qpu = select_qpu(qpu_cfg)
             base_name = args.base_name + "_" + str(args.id) + ".csv"
-            exe(qpu_cfg, qpu, args.shots, args.model, base_name, args.save)
+            exe(
+                qpu_cfg, qpu, args.shots, args.model, base_name, args.save,
+                args.ae_epsilon)
@@ -1,9 +1,10 @@
+import os
 import sys
 import pandas as pd
 from qpu.select_qpu import select_qpu
 from qpu.benchmark_utils import combination_for_list
 from selectable_qpu import SelectableQPU
-from basket import basquet_qrbs
+from basket import basket_system, basquet_qrbs
 
 def to_pdf(qpu_cfg):
     lista = [
@@ -110,6 +111,147 @@ def run_id(**kwargs):
     save(save_, file_name, pdf, "w")
     return pdf
 
+def sweep_qpu(hw_cfg):
+    """
+    Create the QPU simulating every noise model of a sweep: the plugins of
+    the configuration composed with the local simulator of its backend.
+    The noise model is replaced by the sweep, so it is pooled by the KAK
+    decomposition and the simulation method only.
+
+    Parameters
+    ----------
+
+    hw_cfg :  dict
+        Python dictionary with parameters for configuring the QPU
+
+    Return
+    ------
+
+    qpu : QPU
+        plugins composed with a DensityMatrixSimulator, or a
+        TrajectorySimulator for stochastic simulations
+    """
+    from neasqc_qrbs.backends import config_key, pooled
+    from neasqc_qrbs.noise import DensityMatrixSimulator, TrajectorySimulator
+    from qpu.model_noise import create_plugins
+    qpu_cfg = hw_cfg["sim_method"]
+    stochastic = qpu_cfg["sim_method"] in ["stochastic", "local_stochastic"]
+
+    def factory():
+        if stochastic:
+            simulator = TrajectorySimulator(
+                n_samples=qpu_cfg.get("n_samples") or 1000,
+                workers=qpu_cfg.get("workers") or os.cpu_count()
+            )
+        else:
+            simulator = DensityMatrixSimulator()
+        return create_plugins(hw_cfg["kak_compiler"]) | simulator
+
+    return pooled(
+        config_key({
+            "sweep": hw_cfg["kak_compiler"],
+            "stochastic": stochastic,
+            "n_samples": qpu_cfg.get("n_samples"),
+            "workers": qpu_cfg.get("workers")
+        }),
+        factory
+    )
+
+def run_sweep(**kwargs):
+    """
+    Execute the inference of every player under every noise configuration
+    of the list in one process. Each knowledge island is compiled once
+    and evaluated under each noise model by the same simulator or, when
+    analytic, by propagating the noise through its classical logic.
+    """
+    from neasqc_qrbs.noise import NoiseModel, noise_sweep
+    model = kwargs.get("model", "cf")
+    shots = kwargs.get("shots", 0)
+    qpu_list = kwargs.get("qpu_list")
+    folder = kwargs.get("folder_path")
+    name = kwargs.get("base_name")
+    save_ = kwargs.get("save")
+    analytic = kwargs.get("analytic", False)
+    file_name = folder + name + ("_analytic" if analytic else "") + "_sweep.csv"
+    # Players
+    if kwargs.get("test"):
+        players = [("Elias", 16, 198)]
+    else:
+        players = list(zip(
+            ["Elias" , "Blas", "Luis", "Juan", "Raul", "Cholo"],
+            [16, 17, 17, 15, 18, 18],
+            [198, 193, 188, 203, 176, 186]
+        ))
+    rows = []
+    # Configurations with the same plugins and simulator share their QPU
+    groups = {}
+    for index, qpu_cfg in enumerate(qpu_list):
+        groups.setdefault(sweep_qpu(qpu_cfg), []).append(index)
+    for qpu, indices in groups.items():
+        noises = [NoiseModel.from_config(qpu_list[index]) for index in indices]
+        for name_, throw, height in players:
+            basket, _, _ = basket_system(throw, height)
+            for row in noise_sweep(basket, noises, model=model, qpu=qpu, shots=shots or None, analytic=analytic, seed=kwargs.get("seed")):
+                row["point"] = indices[row["point"]]
+                row["qpu_name"] = qpu_list[row["point"]]["qpu_name"]
+                row.update({"Name": name_, "Throws": throw, "Height": height})
+                rows.append(row)
+    pdf = pd.DataFrame(rows)
+    pdf["model"] = model
+    pdf["shots"] = shots
+    save(save_, file_name, pdf, "w")
+    return pdf
+
+def run_shots(**kwargs):
+    """
+    Execute the inference of every player for every number of shots of a
+    list, drawing several realisations of the shot noise of each one. The
+    circuits are simulated once, without shots, and the shots are drawn
+    locally from their exact probabilities by a ShotEmulator.
+    """
+    from neasqc_qrbs.sampling import ShotEmulator
+    model = kwargs.get("model", "cf")
+    shots_list = kwargs.get("shots_list")
+    realisations = kwargs.get("realisations", 1)
+    qpu_cfg = kwargs.get("qpu_cfg")
+    folder = kwargs.get("folder_path")
+    name = kwargs.get("base_name")
+    save_ = kwargs.get("save")
+    file_name = folder + name + "_" + str(kwargs.get("id")) + "_shots.csv"
+    qpu_pdf = to_pdf(qpu_cfg)
+    qpu_pdf["model"] = model
+    # Every number of shots reuses the exact probabilities of the emulator
+    emulator = ShotEmulator(select_qpu(qpu_cfg), seed=kwargs.get("seed"))
+    qpu_selected = SelectableQPU()
+    # Players
+    if kwargs.get("test"):
+        players = [("Elias", 16, 198)]
+    else:
+        players = list(zip(
+            ["Elias" , "Blas", "Luis", "Juan", "Raul", "Cholo"],
+            [16, 17, 17, 15, 18, 18],
+            [198, 193, 188, 203, 176, 186]
+        ))
+    rows = []
+    for shots in shots_list:
+        for realisation in range(realisations):
+            for name_, throw, height in players:
+                player = basquet_qrbs(
+                    throw, height, qpu_selected, type_qpu=emulator,
+                    shots=shots, model=model)
+                rows.append([
+                    shots, realisation, name_, throw, height,
+                    player["final_score"]])
+    pdf = pd.DataFrame(
+        rows,
+        columns=["shots", "realisation", "Name", "Throws", "Height", "Final_Score"]
+    )
+    qpu_pdf = pd.concat([qpu_pdf] * len(pdf))
+    qpu_pdf.reset_index(drop=True, inplace=True)
+    pdf = pd.concat([qpu_pdf, pdf], axis = 1)
+    save(save_, file_name, pdf, "w")
+    return pdf
+
 if __name__ == "__main__":
     import json
     import argparse
@@ -149,6 +291,28 @@ if __name__ == "__main__":
         help="For executing only one element of the list",
         default=0,
     )
+    parser.add_argument(
+        "-shots_list",
+        dest="shots_list",
+        type=int,
+        nargs="+",
+        help="Numbers of shots drawn from a single simulation, with -id",
+        default=None,
+    )
+    parser.add_argument(
+        "-realisations",
+        dest="realisations",
+        type=int,
+        help="Realisations of the shot noise for each number of shots",
+        default=1,
+    )
+    parser.add_argument(
+        "-seed",
+        dest="seed",
+        type=int,
+        help="Seed of the shots drawn for -shots_list or analytic sweeps",
+        default=None,
+    )
     parser.add_argument(
         "-name",
         dest="base_name",
@@ -191,6 +355,20 @@ if __name__ == "__main__":
         action="store_true",
         help="Only one player will be evaluated."
     )
+    parser.add_argument(
+        "--sweep",
+        dest="sweep",
+        default=False,
+        action="store_true",
+        help="For executing every element of the list in one process, compiling the circuits once."
+    )
+    parser.add_argument(
+        "--analytic",
+        dest="analytic",
+        default=False,
+        action="store_true",
+        help="For propagating the noise analytically when sweeping, instead of simulating it."
+    )
     parser.add_argument(
         "-folder",
         dest="folder_path",
@@ -220,7 +398,17 @@ if __name__ == "__main__":
             print("Provide -id or --all")
 
     if args.execution:
-        if args.id is not None:
+        if args.sweep:
+            cfg = vars(args)
+            cfg.update({"qpu_list": qpu_list})
+            final_pdf = run_sweep(**cfg)
+            print(final_pdf)
+        elif args.id is not None and args.shots_list:
+            cfg = vars(args)
+            cfg.update({"qpu_cfg": qpu_list[args.id]})
+            final_pdf = run_shots(**cfg)
+            print(final_pdf)
+        elif args.id is not None:
             cfg = vars(args)
             configuration = qpu_list[args.id]
             cfg.update({"qpu_cfg":configuration})
@@ -32,6 +32,10 @@ string that should take some of the following values:
         in a QLM.
 """
 
+import sys
+sys.path.append("../")
+from neasqc_qrbs.backends import tag_qpu
+
 def get_qpu(qpu=None):
     """
     Function for selecting solver.
@@ -45,7 +49,8 @@ def get_qpu(qpu=None):
     Returns
     ----------
 
-    linal_qpu : solver for quantum jobs
+    linal_qpu : solver for quantum jobs, tagged with its backend
+        descriptor from neasqc_qrbs.backends
     """
 
     if qpu is None:
@@ -81,4 +86,4 @@ def get_qpu(qpu=None):
     elif qpu == "mps":
         from qat.qpus import MPS
         linalg_qpu = MPS()
-    return linalg_qpu
+    return tag_qpu(linalg_qpu, qpu)
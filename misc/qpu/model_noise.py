@@ -7,8 +7,13 @@ and when the user is locally in a QLM. The Qaptiva Access library **CAN
 NOT BE** used with these functions.
 """
 
+import os
+import sys
 import numpy as np
 import functools
+import warnings
+sys.path.append("../")
+from neasqc_qrbs.backends import config_key, pooled, tag_qpu
 
 # Obtenido de ibm_brisbane: 2024/04/04
 # error_gate_1qb = 2.27e-4
@@ -153,6 +158,94 @@ def noisy_hw_model(hw_cfg):
         my_hw_model.gates_specification.meas = meas_prep
     return my_hw_model
 
+def qaptiva_noisy():
+    """
+    Checks whether the noisy QPUs of the Qaptiva Appliance can be
+    imported.
+
+    Return
+    ------
+
+    available : bool
+        True if NoisyQProc can be imported
+    """
+    try:
+        from qat.qpus import NoisyQProc
+    except ImportError:
+        return False
+    return True
+
+def backend_name(hw_cfg):
+    """
+    Code of the backend descriptor, from neasqc_qrbs.backends, of the
+    QPU created by create_qpu for a hardware configuration.
+
+    Parameters
+    ----------
+
+    hw_cfg :  dict
+        Python dictionary with parameters for configuring the QPU
+
+    Return
+    ------
+
+    name : str
+        code of the backend: ideal, noisy_deterministic, noisy_stochastic,
+        noisy_mpo, noisy_local or noisy_local_stochastic
+    """
+    if hw_cfg["qpu_type"] != "noisy":
+        return "ideal"
+    sim_method = hw_cfg["sim_method"]["sim_method"]
+    if sim_method == "local_stochastic":
+        return "noisy_local_stochastic"
+    if sim_method == "local":
+        return "noisy_local"
+    if not qaptiva_noisy():
+        substitute = "local_stochastic" if sim_method == "stochastic" else "local"
+        warnings.warn(
+            "Noisy QPUs of the Qaptiva Appliance are not available: sim_method "
+            "{} is simulated by {} instead".format(sim_method, substitute))
+        return "noisy_" + substitute
+    if sim_method in ["deterministic", "deterministic-vectorized"]:
+        return "noisy_deterministic"
+    return "noisy_" + sim_method
+
+def create_plugins(kak_compiler):
+    """
+    Create the plugin stack rewriting the circuits for a QPU: a KAK
+    compression of the rotation gates followed by a PatternManager
+    rewriting the Toffolis using CNOTS and local gates.
+
+    Parameters
+    ----------
+
+    kak_compiler : str
+        KaK decomposition: ions, ZXZ, XZX, ZYZ or rx+
+
+    Return
+    ------
+
+    my_plugin : Qaptiva Plugin
+        stack of the KAK and expansion plugins
+    """
+    # First: Rewriter of Rotation Gates
+    from qat.plugins import KAKCompression
+    from qat.pbo.kak import list_decompositions
+
+    # It can be: ['ions', 'ZXZ', 'XZX', 'ZYZ', 'u3', 'ibm', 'rx+']
+    kak_decomposition = list_decompositions()[
+        list_decompositions().index(kak_compiler)]
+    if kak_decomposition in ["u3", "ibm"]:
+        raise ValueError("u3 or ibm can not be used!")
+    kak_plugin = KAKCompression(decomposition=kak_decomposition)
+
+    # Second: Use Patter Manager: Rewrite Toffolis
+    from qat.synthopline.compiler import EXPANSION_COLLECTION
+    from qat.pbo import PatternManager
+    expansion_plugin = PatternManager(collections=[EXPANSION_COLLECTION])
+
+    return kak_plugin | expansion_plugin
+
 def create_qpu(hw_cfg):
     """
     Create QPU. Using an input hardware configuration this function creates
@@ -173,39 +266,49 @@ def create_qpu(hw_cfg):
         * t1 : T1 time in nanoseconds (Amplitude Damping and Dephasing channels)
         * t2 : T2 time in nanoseconds (Dephasing channel)
         * kak_compiler : KaK compilation
+        * sim_method : local for simulating the noisy QPU with the density
+          matrix simulator of neasqc_qrbs.noise, also used when the
+          Qaptiva Appliance is not available, or local_stochastic for
+          simulating it with the trajectory simulator, also used for
+          stochastic when the Qaptiva Appliance is not available
+        * n_samples : number of trajectories of stochastic simulations
+        * workers : number of processes drawing the trajectories of local
+          stochastic simulations. The number of cores if not specified
     Return
     ------
 
     my_qpu : Qaptiva QPU
-        generated QPU (can be a noisy one)
+        generated QPU (can be a noisy one), tagged with its backend
+        descriptor
     """
 
-    from qat.qpus import NoisyQProc, LinAlg, MPO
-
-    # First: Rewriter of Rotation Gates 
-    from qat.plugins import KAKCompression
-    from qat.pbo.kak import list_decompositions
-
-    # It can be: ['ions', 'ZXZ', 'XZX', 'ZYZ', 'u3', 'ibm', 'rx+']
-    kak_decomposition = list_decompositions()[
-        list_decompositions().index(hw_cfg["kak_compiler"])]
-    if kak_decomposition in ["u3", "ibm"]:
-        raise ValueError("u3 or ibm can not be used!")
-    kak_plugin = KAKCompression(decomposition=kak_decomposition)
-    
-    # Second: Use Patter Manager: Rewrite Toffolis
-    from qat.synthopline.compiler import EXPANSION_COLLECTION
-    from qat.pbo import PatternManager
-    expansion_plugin = PatternManager(collections=[EXPANSION_COLLECTION])
-    
-    my_plugin = kak_plugin | expansion_plugin
+    # Plugins only depend on the KAK decomposition: pooled to build them once
+    my_plugin = pooled(
+        config_key({"kak_compiler": hw_cfg["kak_compiler"]}),
+        lambda: create_plugins(hw_cfg["kak_compiler"])
+    )
 
+    name = backend_name(hw_cfg)
     # Added QPU
-    if hw_cfg["qpu_type"] == "noisy":
+    if hw_cfg["qpu_type"] == "noisy" and name == "noisy_local":
+        # Local density matrix simulation, without the Qaptiva Appliance
+        from neasqc_qrbs.noise import DensityMatrixSimulator, NoiseModel
+        my_qpu = DensityMatrixSimulator(NoiseModel.from_config(hw_cfg))
+    elif hw_cfg["qpu_type"] == "noisy" and name == "noisy_local_stochastic":
+        # Local trajectories, split among the cores of the machine
+        from neasqc_qrbs.noise import NoiseModel, TrajectorySimulator
+        qpu_cfg = hw_cfg["sim_method"]
+        my_qpu = TrajectorySimulator(
+            NoiseModel.from_config(hw_cfg),
+            n_samples=qpu_cfg.get("n_samples") or 1000,
+            workers=qpu_cfg.get("workers") or os.cpu_count()
+        )
+    elif hw_cfg["qpu_type"] == "noisy":
+        from qat.qpus import NoisyQProc, LinAlg, MPO
         model_noisy = noisy_hw_model(hw_cfg)
         qpu_cfg = hw_cfg["sim_method"]
         if qpu_cfg["sim_method"] not in ["stochastic", "deterministic", "deterministic-vectorized", "mpo"]:
-            raise ValueError("sim_method MUST BE stochastic, deterministic, deterministic-vectorized")
+            raise ValueError("sim_method MUST BE stochastic, deterministic, deterministic-vectorized, mpo or local")
         if qpu_cfg["sim_method"] == "stochastic":
             my_qpu= NoisyQProc(
                 hardware_model=model_noisy,
@@ -226,6 +329,7 @@ def create_qpu(hw_cfg):
             )
         
     else:
+        from qat.qpus import LinAlg
         my_qpu = LinAlg()
     my_plugin = my_plugin | my_qpu
-    return my_plugin
+    return tag_qpu(my_plugin, name)
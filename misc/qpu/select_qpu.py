@@ -49,10 +49,13 @@ with the following keys:
 
 import sys
 sys.path.append("../")
+from neasqc_qrbs.backends import config_key, pooled
 
 def select_qpu(hw_cfg):
     """
     This function allows to select a QPU (a ideal or a noisy one).
+    QPUs are pooled by a hash of the configuration, so the same QPU is
+    reused for every configuration with the same content in a process.
 
     Parameters
     ----------
@@ -67,10 +70,13 @@ def select_qpu(hw_cfg):
 
     if hw_cfg["qpu_type"] in ["noisy", "ideal"]:
         from qpu.model_noise import create_qpu
-        qpu = create_qpu(hw_cfg)
+        qpu = pooled(config_key(hw_cfg), lambda: create_qpu(hw_cfg))
     else:
         from qpu.get_qpu import get_qpu
-        qpu = get_qpu(hw_cfg["qpu_type"])
+        qpu = pooled(
+            config_key({"qpu_type": hw_cfg["qpu_type"]}),
+            lambda: get_qpu(hw_cfg["qpu_type"])
+        )
     return qpu
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 import sys
 from abc import ABC, abstractmethod
-from qat.lang.AQASM import Program
 sys.path.append("../")
+from neasqc_qrbs.backends import describe
+from neasqc_qrbs.compiler import cut_island
+from neasqc_qrbs.qrbs import execute_batches
+from neasqc_qrbs.sampling import sampling_strategy
 from neasqc_qrbs.knowledge_rep import BuilderImpl, BuilderFuzzy, BuilderBayes
 
 class QPU(ABC): # pragma: no cover
@@ -30,9 +33,10 @@ class QPU(ABC): # pragma: no cover
 
 class SelectableQPU(QPU):
     """Implementation of a backend-selectable QPU.
+
+    Its capacity is that of the :obj:`~neasqc_qrbs.backends.Backend` describing the selected backend.
     """
     
-    MAX_ARITY = 34
     BUILDERS = {
         'cf': BuilderImpl,
         'fuzzy': BuilderFuzzy,
@@ -40,17 +44,18 @@ class SelectableQPU(QPU):
     }
 
     @staticmethod
-    def evaluate(qrbs, eval_islands=None, model='cf', qpu='python') -> bool:
+    def evaluate(qrbs, eval_islands=None, model='cf', qpu='python', cut=False) -> bool:
         """Evaluates whether a QRBS can be executed on this QPU.
 
         Args:
             qrbs (:obj:`QRBS`): The QRBS to be evaluated.
             eval_islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be evaluated.
             model (str, optional): The code of the model indicated.
-            qpu (str, optional): The code of the backend QPU.
+            qpu (optional): The backend QPU, as returned by ``select_qpu``, or the code of its backend.
+            cut (bool, optional): Whether knowledge islands requiring more qubits than supported can be cut.
 
         Raises:
-            ValueError: In case a specified knowledge island is not part of the QRBS or an evaluated knowledge island requires more qubits than supported.
+            ValueError: In case a specified knowledge island is not part of the QRBS, the backend is unknown or an evaluated knowledge island requires more qubits than supported and cannot be cut.
         """
         if eval_islands is None:
             eval_islands = []
@@ -64,25 +69,38 @@ class SelectableQPU(QPU):
                     raise ValueError('A specified KnowledgeIsland is not part of the QRBS', island)
         # Build each island
         builder = SelectableQPU.BUILDERS[model]
-        eval_islands = [builder.build_island(island) for island in eval_islands]
+        built_islands = [builder.build_island(island) for island in eval_islands]
+        backend = describe(qpu)
         # Check their arity is compatible with the QPU
-        for island in eval_islands:
-            routine, _ = island
-            if routine.arity > SelectableQPU.MAX_ARITY:
+        for island, (routine, _) in zip(eval_islands, built_islands):
+            if not backend.fits(routine.arity):
+                if cut:
+                    cut_island(island, builder, backend.max_arity)
+                    continue
                 evaluation = False
                 raise ValueError('A KnowledgeIsland surpasses capacity of QPU ({} qubits)'.format(
-                    SelectableQPU.MAX_ARITY), qrbs._engine._islands[eval_islands.index(island)])
+                    backend.max_arity), island)
         return evaluation
 
     @staticmethod
-    def execute(qrbs, islands=None, model='cf', qpu=None, shots=None) -> None:
+    def execute(qrbs, islands=None, model='cf', qpu=None, shots=None, passes=None, cut=False, pack=False) -> list:
         """Executes the QRBS on this QPU.
 
         Args:
             qrbs (:obj:`QRBS`): The QRBS to be executed.
             islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
             model (str, optional): The code of the model indicated.
-            qpu (str, optional): The code of the backend QPU.
+            qpu (optional): The backend QPU, as returned by ``select_qpu``.
+            shots (int or :obj:`~neasqc_qrbs.sampling.Sampling`): The number of shots of each circuit, computing exact probabilities if 0, or the strategy sampling them.
+            passes (List[str], optional): The codes of the compilation passes to apply.
+            cut (bool, optional): Whether knowledge islands requiring more qubits than supported are cut into sub-islands executed in order.
+            pack (bool, optional): Whether knowledge islands are packed side by side into as few circuits as possible.
+
+        Returns:
+            List[Dict]: The compilation report of each executed knowledge island. The report of a cut knowledge island adds the report of the cut, under ``'cut'``, and the compilation report of each of its sub-islands, under ``'subcircuits'``. When packed, each compilation report adds the job it was executed in and the index of its first qubit in it, under ``'pack'``. When sampled in rounds or from a budget, each compilation report adds the shots and rounds of its circuit and the estimated probability and interval of each of its consequents, by attribute, under ``'shots'``.
+
+        Raises:
+            ValueError: In case the QPU or the shots are not provided, or the shot budget does not cover the pilots.
         """
         # Select builder
         if islands is None:
@@ -91,32 +109,14 @@ class SelectableQPU(QPU):
         # Initiate islands in case of specified evaluation
         if not islands:
             islands = qrbs._engine._islands
+        reports = []
+        if qpu is None:
+            raise ValueError("QPU must be provided!!")
         # If evaluation is successful, continue with execution
-        if SelectableQPU.evaluate(qrbs, islands, model, qpu):
-            if qpu is None:
-                raise ValueError("QPU must be provided!!")
-            else:
-                backend = qpu
+        if SelectableQPU.evaluate(qrbs, islands, model, qpu, cut):
             if shots is None:
                 raise ValueError("Number of shots MUST BE provided")
-
-            for island in islands:
-                routine, elements = builder.build_island(island)
-
-                prog = Program()
-                qbits = prog.qalloc(routine.arity)
-                prog.apply(routine, qbits)
-
-                circ = prog.to_circ()
-                job = circ.to_job(nbshots=shots)
-                result = backend.submit(job)
-
-                for element, index in elements.items():
-                    if element in [rule.right_hand_side for rule in qrbs._engine._rules]:
-                        temp = 0
-                        for sample in result:
-                            if sample.state.bitstring[index] == '1':
-                                temp += sample.probability
-                        temp = min(1.0, temp)
-                        temp = max(0.0, temp)
-                        element.precision = temp
+            # The probability of each consequent is its precision
+            reports = execute_batches(qrbs, islands, builder, describe(qpu), qpu, sampling_strategy(shots), passes, cut, pack,
+                                      precision=lambda probability: probability)
+        return reports
@@ -0,0 +1,241 @@
+# -*- coding : utf-8 -*
+
+import hashlib
+import importlib
+import json
+from typing import Dict, List
+
+
+class Backend:
+    """Class representing the capabilities of a backend executing knowledge islands.
+
+    Attributes:
+        name (str): Code of the backend, as used by ``get_qpu`` and ``select_qpu``.
+        max_arity (int): Maximum number of qubits of the circuits the backend can execute, or None if the backend does not simulate circuits.
+        exact (bool): Whether the backend gives the exact probabilities of the outcomes, instead of sampling or truncating them.
+        batch (bool): Whether the backend evaluates a batch of scenarios of precisions and certainties in a single call.
+        noisy (bool): Whether the backend supports a noisy hardware model.
+        method (str): Simulation method of the backend, which gives how its cost scales, as modelled by :obj:`~neasqc_qrbs.planner.COST_MODEL`.
+        cost (float): Cost of an elementary operation of its simulation method, relative to the update of an amplitude by a gate in the ``python`` backend.
+        qpu_class (str): Name of the class of the myQLM QPU of the backend, if any.
+        factory (Callable): Function creating the QPU of the backend, importing it only when needed.
+    """
+
+    def __init__(self, name, max_arity=None, exact=True, batch=False, noisy=False, method='statevector', cost=1.0, qpu_class=None, factory=None) -> None:
+        super().__init__()
+        self.name = name
+        self.max_arity = max_arity
+        self.exact = exact
+        self.batch = batch
+        self.noisy = noisy
+        self.method = method
+        self.cost = cost
+        self.qpu_class = qpu_class
+        self.factory = factory
+
+    def fits(self, arity) -> bool:
+        """Checks whether a circuit fits in the capacity of the backend.
+
+        Args:
+            arity (int): The number of qubits of the circuit.
+
+        Returns:
+            bool: Whether the circuit fits in the capacity of the backend.
+        """
+        return self.max_arity is None or arity <= self.max_arity
+
+    def available(self) -> bool:
+        """Checks whether the backend can create its QPU in this environment.
+
+        Returns:
+            bool: Whether the backend has a factory whose QPU can be imported.
+        """
+        return self.factory is not None and getattr(self.factory, 'available', lambda: True)()
+
+    def create(self):
+        """Creates the QPU of the backend, tagged with this backend.
+
+        Returns:
+            The QPU of the backend.
+
+        Raises:
+            ValueError: In case the backend has no factory.
+        """
+        if self.factory is None:
+            raise ValueError('The backend cannot create a QPU', self)
+        return tag_qpu(self.factory(), self)
+
+    def shared(self):
+        """Gets the QPU of the backend from the pool, creating it only the first time.
+
+        Returns:
+            The pooled QPU of the backend.
+
+        Raises:
+            ValueError: In case the backend has no factory.
+        """
+        return pooled(config_key({'backend': self.name}), self.create)
+
+    def __repr__(self) -> str:
+        return 'Backend({}, {}, exact={}, batch={}, noisy={}, method={}, cost={})'.format(self.name, self.max_arity, self.exact, self.batch, self.noisy, self.method, self.cost)
+
+
+BACKENDS: Dict[str, Backend] = {}
+
+
+def register_backend(backend) -> Backend:
+    """Registers a backend, replacing any other with its code.
+
+    Args:
+        backend (:obj:`Backend`): The backend being registered.
+
+    Returns:
+        :obj:`Backend`: The registered backend.
+    """
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(name) -> Backend:
+    """Gets a registered backend from its code.
+
+    Args:
+        name (str): The code of the backend.
+
+    Returns:
+        :obj:`Backend`: The backend with that code.
+
+    Raises:
+        ValueError: In case no backend is registered with that code.
+    """
+    if name not in BACKENDS:
+        raise ValueError('Unknown backend', name)
+    return BACKENDS[name]
+
+
+def list_backends(noisy=None, exact=None) -> List[Backend]:
+    """Lists the registered backends, optionally filtered by their capabilities.
+
+    Args:
+        noisy (bool, optional): Whether the listed backends must support noise, or not. Any if not specified.
+        exact (bool, optional): Whether the listed backends must be exact, or not. Any if not specified.
+
+    Returns:
+        List[:obj:`Backend`]: The registered backends, from the cheapest.
+    """
+    return sorted([backend for backend in BACKENDS.values()
+                   if (noisy is None or backend.noisy == noisy) and (exact is None or backend.exact == exact)],
+                  key=lambda backend: backend.cost)
+
+
+def tag_qpu(qpu, backend):
+    """Attaches a backend to a QPU, including plugin stacks, so it can be described later.
+
+    Args:
+        qpu: The QPU being tagged.
+        backend (:obj:`Backend` or str): The backend of the QPU, or its code.
+
+    Returns:
+        The tagged QPU.
+    """
+    qpu.backend = backend if isinstance(backend, Backend) else get_backend(backend)
+    return qpu
+
+
+def describe(qpu) -> Backend:
+    """Gets the backend describing a QPU.
+
+    Args:
+        qpu: A QPU tagged by :obj:`tag_qpu`, a myQLM QPU of a registered class, a :obj:`Backend` or the code of a backend.
+
+    Returns:
+        :obj:`Backend`: The backend of the QPU.
+
+    Raises:
+        ValueError: In case the QPU does not match any registered backend.
+    """
+    if isinstance(qpu, Backend):
+        return qpu
+    if isinstance(qpu, str):
+        return get_backend(qpu)
+    if isinstance(getattr(qpu, 'backend', None), Backend):
+        return qpu.backend
+    for backend in BACKENDS.values():
+        if backend.qpu_class is not None and backend.qpu_class == type(qpu).__name__:
+            return backend
+    raise ValueError('Unknown backend', qpu)
+
+
+QPU_POOL: Dict[str, object] = {}
+
+
+def config_key(config) -> str:
+    """Computes the key of a configuration, a hash of its canonical representation.
+
+    Configurations with the same content have the same key, regardless of the order of their keys.
+
+    Args:
+        config (Dict): The configuration, like the ``hw_cfg`` of ``select_qpu``.
+
+    Returns:
+        str: The key of the configuration.
+    """
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def pooled(key, factory):
+    """Gets an object from the pool, like a QPU or a plugin stack, constructing it only the first time its key is requested.
+
+    Args:
+        key (str): The key of the object, as computed by :obj:`config_key`.
+        factory (Callable): Function constructing the object when it is not in the pool.
+
+    Returns:
+        The pooled object.
+    """
+    if key not in QPU_POOL:
+        QPU_POOL[key] = factory()
+    return QPU_POOL[key]
+
+
+def clear_pool() -> None:
+    """Removes every object from the pool, so they are constructed again when requested.
+    """
+    QPU_POOL.clear()
+
+
+class _Factory:
+    # Factory importing a QPU class only when the QPU is created
+
+    def __init__(self, module, name) -> None:
+        super().__init__()
+        self.module = module
+        self.name = name
+
+    def available(self) -> bool:
+        try:
+            return hasattr(importlib.import_module(self.module), self.name)
+        except (ImportError, OSError):
+            return False
+
+    def __call__(self):
+        return getattr(importlib.import_module(self.module), self.name)()
+
+
+# Costs calibrated against PyLinalg, taking about 8.5e-8 seconds per amplitude and gate
+register_backend(Backend('python', 20, cost=1.0, qpu_class='PyLinalg', factory=_Factory('qat.pylinalg', 'PyLinalg')))
+register_backend(Backend('c', 28, cost=0.25, qpu_class='CLinalg', factory=_Factory('qat.qpus', 'CLinalg')))
+register_backend(Backend('linalg', 34, cost=0.1, qpu_class='LinAlg', factory=_Factory('qat.qpus', 'LinAlg')))
+register_backend(Backend('mps', 64, exact=False, method='mps', cost=1.0, qpu_class='MPS', factory=_Factory('qat.qpus', 'MPS')))
+register_backend(Backend('qlmass_linalg', 34, cost=0.5, factory=_Factory('qlmaas.qpus', 'LinAlg')))
+register_backend(Backend('qlmass_mps', 64, exact=False, method='mps', cost=2.0, factory=_Factory('qlmaas.qpus', 'MPS')))
+register_backend(Backend('ideal', 34, cost=0.1))
+register_backend(Backend('noisy_deterministic', 17, noisy=True, method='density_matrix', cost=0.1))
+register_backend(Backend('noisy_stochastic', 34, exact=False, noisy=True, method='trajectories', cost=0.1))
+register_backend(Backend('noisy_mpo', 64, exact=False, noisy=True, method='mps', cost=1.0, qpu_class='MPO'))
+register_backend(Backend('noisy_local', 12, noisy=True, method='density_matrix', cost=0.4, qpu_class='DensityMatrixSimulator'))
+register_backend(Backend('noisy_local_stochastic', 20, exact=False, noisy=True, method='trajectories', cost=0.9, qpu_class='TrajectorySimulator'))
+register_backend(Backend('bdd', method='bdd', cost=2.0, factory=_Factory('neasqc_qrbs.classical', 'BddQPU')))
+register_backend(Backend('tensor_network', batch=True, method='tensor_network', cost=140.0, factory=_Factory('neasqc_qrbs.classical', 'TensorNetworkQPU')))
+register_backend(Backend('monte_carlo', exact=False, method='monte_carlo', cost=0.012, factory=_Factory('neasqc_qrbs.classical', 'MonteCarloQPU')))
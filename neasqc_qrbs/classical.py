@@ -0,0 +1,745 @@
+# -*- coding : utf-8 -*
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .knowledge_rep import AndOperator, Fact, IslandPlan, LeftHandSide, NotOperator, OrOperator
+from .qrbs import QPU
+from .sampling import wilson_interval
+
+
+class BDD:
+    """Class representing a manager of reduced ordered binary decision diagrams (BDD).
+
+    Every diagram of the manager shares the same variable order and node table, so equal functions are represented by the same node. Each variable is a random boolean with its own probability of being true, which allows the weighted model counting of any diagram.
+
+    Attributes:
+        weights (List[float]): Probability of each variable being true, indexed by level.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.weights = []
+        self._nodes = [None, None]
+        self._unique = {}
+        self._cache = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _node(self, level, low, high) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        if key not in self._unique:
+            self._nodes.append(key)
+            self._unique[key] = len(self._nodes) - 1
+        return self._unique[key]
+
+    def _level(self, node) -> int:
+        return self._nodes[node][0] if node > BDD.TRUE else len(self.weights)
+
+    def variable(self, weight) -> int:
+        """Creates a new variable, placed after the rest in the order of the manager.
+
+        Args:
+            weight (float): The probability of the variable being true.
+
+        Returns:
+            int: The node of the diagram of the variable.
+        """
+        self.weights.append(weight)
+        return self._node(len(self.weights) - 1, BDD.FALSE, BDD.TRUE)
+
+    def apply(self, operator, first, second) -> int:
+        """Combines two diagrams with a boolean operator.
+
+        Args:
+            operator (str): The boolean operator, one of ``'and'``, ``'or'`` and ``'xor'``.
+            first (int): The node of the first diagram.
+            second (int): The node of the second diagram.
+
+        Returns:
+            int: The node of the resulting diagram.
+        """
+        if first <= BDD.TRUE and second <= BDD.TRUE:
+            if operator == 'and':
+                return first & second
+            if operator == 'or':
+                return first | second
+            return first ^ second
+        if operator != 'xor' and first == second:
+            return first
+        if operator == 'and' and BDD.FALSE in (first, second):
+            return BDD.FALSE
+        if operator == 'or' and BDD.TRUE in (first, second):
+            return BDD.TRUE
+        if operator != 'and' and BDD.FALSE in (first, second):
+            return first if second == BDD.FALSE else second
+        if operator == 'and' and BDD.TRUE in (first, second):
+            return first if second == BDD.TRUE else second
+        if first > second:
+            first, second = second, first
+        key = (operator, first, second)
+        if key not in self._cache:
+            level = min(self._level(first), self._level(second))
+            first_low, first_high = self._cofactors(first, level)
+            second_low, second_high = self._cofactors(second, level)
+            self._cache[key] = self._node(level, self.apply(operator, first_low, second_low), self.apply(operator, first_high, second_high))
+        return self._cache[key]
+
+    def _cofactors(self, node, level) -> Tuple[int, int]:
+        if self._level(node) != level:
+            return node, node
+        _, low, high = self._nodes[node]
+        return low, high
+
+    def negate(self, node) -> int:
+        """Negates a diagram.
+
+        Args:
+            node (int): The node of the diagram.
+
+        Returns:
+            int: The node of the negated diagram.
+        """
+        return self.apply('xor', node, BDD.TRUE)
+
+    def probability(self, node) -> float:
+        """Computes the probability of a diagram being true by weighted model counting.
+
+        Args:
+            node (int): The node of the diagram.
+
+        Returns:
+            float: The probability of the diagram being true, given the weights of its variables.
+        """
+        probabilities = {BDD.FALSE: 0.0, BDD.TRUE: 1.0}
+        pending = [node]
+        while pending:
+            current = pending[-1]
+            if current in probabilities:
+                pending.pop()
+                continue
+            level, low, high = self._nodes[current]
+            children = [child for child in (low, high) if child not in probabilities]
+            if children:
+                pending.extend(children)
+                continue
+            pending.pop()
+            probabilities[current] = (1 - self.weights[level]) * probabilities[low] + self.weights[level] * probabilities[high]
+        return probabilities[node]
+
+
+def island_bdd(island, model='cf') -> Tuple[BDD, Dict[LeftHandSide, int]]:
+    """Compiles a knowledge island into binary decision diagrams, following the circuits of each model.
+
+    The variables of the diagrams are the input facts of the island, true with the probability their preparation gives, and the certainty of each rule. Operators compute the boolean function of their operands, and each implication toggles its consequent when both its left hand side and its certainty are true, as the circuits of :obj:`~neasqc_qrbs.knowledge_rep.BuilderImpl` and :obj:`~neasqc_qrbs.knowledge_rep.BuilderFuzzy` do. The controlled rotations of :obj:`~neasqc_qrbs.knowledge_rep.BuilderBayes` only match them when each consequent is the target of a single rule.
+
+    Args:
+        island (:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`): The knowledge island to be compiled.
+        model (str, optional): The code of the model indicated.
+
+    Returns:
+        Tuple[:obj:`BDD`, Dict[:obj:`~neasqc_qrbs.knowledge_rep.LeftHandSide`, int]]: A tuple containing the manager of the diagrams and the node of the diagram of each LeftHandSide element.
+
+    Raises:
+        ValueError: In case the knowledge island has a consequent targeted by several rules in the bayesian model.
+    """
+    plan = IslandPlan.from_island(island)
+    if model == 'bayes':
+        consequents = [rule.right_hand_side for rule in plan.rules]
+        if any(consequents.count(consequent) > 1 for consequent in consequents):
+            raise ValueError('A KnowledgeIsland has a consequent targeted by several rules, which cannot be represented classically in the bayesian model', island)
+    bdd = BDD()
+    nodes = [BDD.FALSE] * len(plan.nodes)
+    for index in plan.order:
+        kind, element, operands, target = plan.steps[index]
+        if kind == 'fact':
+            nodes[target] = bdd.variable(np.sin(element.precision * np.pi / 2) ** 2)
+        elif kind == 'operator':
+            if isinstance(element, NotOperator):
+                nodes[target] = bdd.negate(nodes[operands[0]])
+            elif isinstance(element, AndOperator):
+                nodes[target] = bdd.apply('and', nodes[operands[0]], nodes[operands[1]])
+            elif isinstance(element, OrOperator):
+                nodes[target] = bdd.apply('or', nodes[operands[0]], nodes[operands[1]])
+        elif kind == 'implication':
+            certainty = bdd.variable(np.sin(element.certainty * np.pi / 2) ** 2)
+            nodes[target] = bdd.apply('xor', nodes[target], bdd.apply('and', nodes[operands[0]], certainty))
+    return bdd, {node: diagram for node, diagram in zip(plan.nodes, nodes)}
+
+
+class IslandPolynomial:
+    """Class representing the closed form of the probabilities of the consequents of a knowledge island.
+
+    The probability of each consequent is a multilinear polynomial in the probabilities of its variables being true, that is, in the probability given by the preparation of each input fact and the certainty of each rule. The polynomials are stored as arrays, so they can be evaluated for any number of input vectors at once without any circuit.
+
+    Attributes:
+        facts (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact`]): Input facts of the knowledge island.
+        rules (List[:obj:`~neasqc_qrbs.knowledge_rep.Rule`]): Rules of the knowledge island.
+        consequents (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact`]): Consequents of the knowledge island, without repetitions.
+        monomials (np.ndarray): Boolean array with a row per monomial, indicating the variables it multiplies. Variables are the facts followed by the rules.
+        coefficients (np.ndarray): Array with the coefficient of each monomial, with a row per consequent.
+    """
+
+    def __init__(self, facts, rules, consequents, monomials, coefficients) -> None:
+        super().__init__()
+        self.facts = facts
+        self.rules = rules
+        self.consequents = consequents
+        self.monomials = monomials
+        self.coefficients = coefficients
+
+    def evaluate(self, precisions=None, certainties=None) -> np.ndarray:
+        """Evaluates the probability of each consequent.
+
+        Args:
+            precisions (np.ndarray, optional): Precision of each input fact, with an optional leading batch dimension. The current precisions are used if not specified.
+            certainties (np.ndarray, optional): Certainty of each rule, with an optional leading batch dimension. The current certainties are used if not specified.
+
+        Returns:
+            np.ndarray: The probability of each consequent, with the batch dimension of the inputs if any.
+        """
+        if precisions is None:
+            precisions = [fact.precision for fact in self.facts]
+        if certainties is None:
+            certainties = [rule.certainty for rule in self.rules]
+        precisions, certainties = np.asarray(precisions, dtype=float), np.asarray(certainties, dtype=float)
+        batch = max(precisions.ndim, certainties.ndim) > 1
+        precisions, certainties = np.atleast_2d(precisions), np.atleast_2d(certainties)
+        size = max(precisions.shape[0], certainties.shape[0])
+        weights = np.sin(np.concatenate([
+            np.broadcast_to(precisions, (size, len(self.facts))),
+            np.broadcast_to(certainties, (size, len(self.rules)))
+        ], axis=1) * np.pi / 2) ** 2
+        # Products of the weights of each monomial, as sums of logarithms, with the null weights counted apart
+        monomials = self.monomials.T.astype(float)
+        terms = np.exp(np.log(np.where(weights > 0, weights, 1.0)) @ monomials)
+        terms[((weights == 0) @ monomials) > 0] = 0.0
+        probabilities = np.einsum('bt,ct->bc', terms, self.coefficients)
+        return probabilities if batch else probabilities[0]
+
+
+def island_polynomial(island, model='cf') -> IslandPolynomial:
+    """Compiles a knowledge island into the polynomials of the probabilities of its consequents.
+
+    The polynomials are expanded from the diagrams built by :obj:`island_bdd`, so they give the same probabilities.
+
+    Args:
+        island (:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`): The knowledge island to be compiled.
+        model (str, optional): The code of the model indicated.
+
+    Returns:
+        :obj:`IslandPolynomial`: The polynomials of the knowledge island.
+
+    Raises:
+        ValueError: In case the knowledge island has a consequent targeted by several rules in the bayesian model.
+    """
+    bdd, diagrams = island_bdd(island, model)
+    plan = IslandPlan.from_island(island)
+    # Variables of the diagrams, in the order they were created
+    variables = [plan.steps[index][1] for index in plan.order if plan.steps[index][0] in ('fact', 'implication')]
+    facts = [variable for variable in variables if isinstance(variable, Fact)]
+    rules = [variable for variable in variables if not isinstance(variable, Fact)]
+    positions = [(facts.index(variable) if isinstance(variable, Fact) else len(facts) + rules.index(variable)) for variable in variables]
+
+    expansions = {BDD.FALSE: {}, BDD.TRUE: {(): 1}}
+
+    def expand(node):
+        # Coefficient of each monomial, by Shannon expansion: P = P(low) + w * (P(high) - P(low))
+        if node not in expansions:
+            level, low, high = bdd._nodes[node]
+            low, high = expand(low), expand(high)
+            expansion = dict(low)
+            for monomial, coefficient in high.items():
+                shifted = tuple(sorted(monomial + (positions[level],)))
+                expansion[shifted] = expansion.get(shifted, 0) + coefficient
+            for monomial, coefficient in low.items():
+                shifted = tuple(sorted(monomial + (positions[level],)))
+                expansion[shifted] = expansion.get(shifted, 0) - coefficient
+            expansions[node] = {monomial: coefficient for monomial, coefficient in expansion.items() if coefficient}
+        return expansions[node]
+
+    consequents = []
+    for rule in plan.rules:
+        if rule.right_hand_side not in consequents:
+            consequents.append(rule.right_hand_side)
+    polynomials = [expand(diagrams[consequent]) for consequent in consequents]
+    terms = sorted({monomial for polynomial in polynomials for monomial in polynomial}, key=lambda monomial: (len(monomial), monomial))
+    monomials = np.zeros((len(terms), len(variables)), dtype=bool)
+    for row, monomial in enumerate(terms):
+        monomials[row, list(monomial)] = True
+    coefficients = np.array([[polynomial.get(monomial, 0) for monomial in terms] for polynomial in polynomials], dtype=float).reshape(len(consequents), len(terms))
+    return IslandPolynomial(facts, rules, consequents, monomials, coefficients)
+
+
+def _subscripts(*groups) -> str:
+    # Subscripts of numpy.einsum for groups of labels, mapping each label to a letter
+    letters = {}
+    for group in groups:
+        for label in group:
+            if label not in letters:
+                letters[label] = chr(ord('a') + len(letters)) if len(letters) < 26 else chr(ord('A') + len(letters) - 26)
+    return ','.join(''.join(letters[label] for label in group) for group in groups[:-1]) + '->' + ''.join(letters[label] for label in groups[-1])
+
+
+def _elimination(groups, output):
+    # Eliminates the labels of a network one at a time, always the one leaving the fewest labels, yielding the label, the keys of the groups joined and the key and labels of the new group
+    groups = dict(enumerate(groups))
+    owners = {}
+    for key, labels in groups.items():
+        for label in labels:
+            if label not in output:
+                owners.setdefault(label, set()).add(key)
+    identifier = len(groups)
+    while owners:
+        best = None
+        for label, keys in owners.items():
+            degree = len(set().union(*[groups[key] for key in keys])) - 1
+            if best is None or degree < best[0]:
+                best = (degree, label)
+        keys = sorted(owners.pop(best[1]))
+        kept = tuple(label for label in dict.fromkeys(label for key in keys for label in groups.pop(key)) if label != best[1])
+        groups[identifier] = kept
+        for label in kept:
+            if label in owners:
+                owners[label] = (owners[label] - set(keys)) | {identifier}
+        yield best[1], keys, identifier, kept
+        identifier += 1
+
+
+def _contract(tensors, output) -> np.ndarray:
+    # Contracts a network of (array, labels) pairs following its elimination order
+    arrays = dict(enumerate(tensors))
+    for label, keys, identifier, kept in _elimination([labels for _, labels in tensors], output):
+        group = [arrays.pop(key) for key in keys]
+        array, labels = group[0]
+        for other, others in group[1:]:
+            joined = tuple(dict.fromkeys(labels + others))
+            array, labels = np.einsum(_subscripts(labels, others, joined), array, other), joined
+        arrays[identifier] = (np.einsum(_subscripts(labels, kept), array), kept)
+    array, labels = np.ones(()), ()
+    for other, others in arrays.values():
+        joined = tuple(dict.fromkeys(labels + others))
+        array, labels = np.einsum(_subscripts(labels, others, joined), array, other), joined
+    return np.einsum(_subscripts(labels, output), array)
+
+
+class IslandNetwork:
+    """Class representing a knowledge island as a network of stochastic tensors.
+
+    Every wire value of the circuit of the island is an index of dimension 2. Each fact preparation is a vector with the probabilities of its two values, each operator a deterministic tensor and each implication a conditional tensor from the previous value of its consequent to the next one. The bayesian controlled rotations acting on a consequent before it is used are joined into a single tensor, so their angles add up as in the circuit. All tensors share a batch index over scenarios.
+
+    The marginal of each consequent is obtained by contracting only the tensors it depends on, in a greedy order, with ``numpy.einsum``.
+
+    Attributes:
+        facts (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact`]): Input facts of the knowledge island.
+        rules (List[:obj:`~neasqc_qrbs.knowledge_rep.Rule`]): Rules of the knowledge island.
+        consequents (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact`]): Consequents of the knowledge island, without repetitions.
+    """
+
+    def __init__(self, island, model='cf') -> None:
+        super().__init__()
+        plan = IslandPlan.from_island(island)
+        self.facts = [element for kind, element, _, _ in plan.steps if kind == 'fact']
+        self.rules = [element for kind, element, _, _ in plan.steps if kind == 'implication']
+        self.consequents = []
+        # Each tensor is a tuple (kind, parameters, labels), where the last label is its output
+        self._tensors = []
+        labels = [None] * len(plan.nodes)
+        pending = {}
+        # Node holding each consequent, which is the last one when several rules target it
+        nodes = {}
+
+        def new_label():
+            return len(self._tensors)
+
+        def value(node):
+            # Joins the rotations pending on a consequent, giving the label of its current value
+            if pending.get(node):
+                rules, operands = zip(*pending[node])
+                self._tensors.append(('implication', rules, (labels[node],) + operands + (new_label(),)))
+                labels[node] = self._tensors[-1][2][-1]
+                pending[node] = []
+            return labels[node]
+
+        for index in plan.order:
+            kind, element, operands, target = plan.steps[index]
+            if kind == 'fact':
+                self._tensors.append(('fact', self.facts.index(element), (new_label(),)))
+                labels[target] = self._tensors[-1][2][-1]
+            elif kind == 'consequent':
+                self._tensors.append(('consequent', None, (new_label(),)))
+                labels[target] = self._tensors[-1][2][-1]
+                pending[target] = []
+                nodes[element] = target
+                if element not in self.consequents:
+                    self.consequents.append(element)
+            elif kind == 'operator':
+                inputs = tuple(value(operand) for operand in operands)
+                self._tensors.append((type(element).__name__, None, inputs + (new_label(),)))
+                labels[target] = self._tensors[-1][2][-1]
+            elif kind == 'implication':
+                pending[target].append((self.rules.index(element), value(operands[0])))
+                if model != 'bayes':
+                    value(target)
+        self._outputs = [value(nodes[consequent]) for consequent in self.consequents]
+
+    def _array(self, kind, parameters, weights, size) -> np.ndarray:
+        # Array of a tensor, with the batch as first dimension
+        if kind == 'fact':
+            probability = weights[0][:, parameters]
+            return np.stack([1 - probability, probability], axis=1)
+        if kind == 'consequent':
+            return np.broadcast_to(np.array([1.0, 0.0]), (size, 2))
+        if kind == 'implication':
+            angles = weights[1][:, list(parameters)]
+            # Rotation angle for every value of the previous consequent and of each left hand side
+            grids = np.indices((2,) * (len(parameters) + 1))
+            total = grids[0][None] * np.pi + np.tensordot(angles, grids[1:], axes=(1, 0))
+            ones = np.sin(total / 2) ** 2
+            return np.stack([1 - ones, ones], axis=-1)
+        gates = {
+            'NotOperator': lambda values: ~values[0] & 1,
+            'AndOperator': lambda values: values[0] & values[1],
+            'OrOperator': lambda values: values[0] | values[1]
+        }
+        grids = np.indices((2,) * (2 if kind == 'NotOperator' else 3))
+        return (grids[-1] == gates[kind](grids[:-1])).astype(float)
+
+    def _cone(self, output) -> List[int]:
+        # Labels of the tensors an output depends on, as the rest add up to one
+        needed, frontier = set(), [output]
+        while frontier:
+            label = frontier.pop()
+            if label not in needed:
+                needed.add(label)
+                frontier.extend(self._tensors[label][2][:-1])
+        return sorted(needed)
+
+    def width(self) -> int:
+        """Computes the width of the network, which bounds the cost of its contraction.
+
+        Returns:
+            int: The largest number of indices, other than the batch one, of the tensors joined when contracting the marginal of any consequent.
+        """
+        width = 1
+        for output in self._outputs:
+            groups = [self._tensors[label][2] for label in self._cone(output)]
+            for label, _, _, kept in _elimination(groups, (output,)):
+                width = max(width, len(kept) + 1)
+        return width
+
+    def evaluate(self, precisions=None, certainties=None) -> np.ndarray:
+        """Evaluates the probability of each consequent.
+
+        Args:
+            precisions (np.ndarray, optional): Precision of each input fact, with an optional leading batch dimension. The current precisions are used if not specified.
+            certainties (np.ndarray, optional): Certainty of each rule, with an optional leading batch dimension. The current certainties are used if not specified.
+
+        Returns:
+            np.ndarray: The probability of each consequent, with the batch dimension of the inputs if any.
+        """
+        if precisions is None:
+            precisions = [fact.precision for fact in self.facts]
+        if certainties is None:
+            certainties = [rule.certainty for rule in self.rules]
+        precisions, certainties = np.asarray(precisions, dtype=float), np.asarray(certainties, dtype=float)
+        batch = max(precisions.ndim, certainties.ndim) > 1
+        precisions, certainties = np.atleast_2d(precisions), np.atleast_2d(certainties)
+        size = max(precisions.shape[0], certainties.shape[0])
+        weights = (np.sin(np.broadcast_to(precisions, (size, len(self.facts))) * np.pi / 2) ** 2,
+                   np.broadcast_to(certainties, (size, len(self.rules))) * np.pi)
+
+        probabilities = np.zeros((size, len(self.consequents)))
+        for position, output in enumerate(self._outputs):
+            network = []
+            for label in self._cone(output):
+                kind, parameters, labels = self._tensors[label]
+                array = self._array(kind, parameters, weights, size)
+                if kind in ('fact', 'consequent', 'implication'):
+                    network.append((array, ('batch',) + labels))
+                else:
+                    network.append((array, labels))
+            probabilities[:, position] = _contract(network, ('batch', output))[:, 1]
+        return probabilities if batch else probabilities[0]
+
+
+class BddQPU(QPU):
+    """Exact classical implementation of a Quantum Processing Unit (QPU), by weighted model counting on binary decision diagrams.
+
+    It computes the same probabilities the circuits of each model give in a noise-free simulation, in time linear in the size of the diagrams instead of exponential in the number of qubits.
+    """
+
+    MODELS = ['cf', 'fuzzy', 'bayes']
+
+    @staticmethod
+    def evaluate(qrbs, eval_islands=None, model='cf') -> bool:
+        """Evaluates whether a QRBS can be executed on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be evaluated.
+            eval_islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be evaluated.
+            model (str, optional): The code of the model indicated.
+
+        Raises:
+            ValueError: In case a specified knowledge island is not part of the QRBS, the model is not known or an evaluated knowledge island cannot be represented classically in the model.
+        """
+        if eval_islands is None:
+            eval_islands = []
+        if model not in BddQPU.MODELS:
+            raise ValueError('Unknown model', model)
+        # Initiate islands in case of specified evaluation
+        if not eval_islands:
+            eval_islands = qrbs._engine._islands
+        else:
+            for island in eval_islands:
+                if island not in qrbs._engine._islands:
+                    raise ValueError('A specified KnowledgeIsland is not part of the QRBS', island)
+        if model == 'bayes':
+            for island in eval_islands:
+                consequents = [rule.right_hand_side for rule in island.rules]
+                if any(consequents.count(consequent) > 1 for consequent in consequents):
+                    raise ValueError('A KnowledgeIsland has a consequent targeted by several rules, which cannot be represented classically in the bayesian model', island)
+        return True
+
+    @staticmethod
+    def execute(qrbs, islands=None, model='cf') -> List[Dict]:
+        """Executes the QRBS on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be executed.
+            islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
+            model (str, optional): The code of the model indicated.
+
+        Returns:
+            List[Dict]: The report of each executed knowledge island, with the number of variables and nodes of its diagrams.
+        """
+        if islands is None:
+            islands = []
+        # Initiate islands in case of specified evaluation
+        if not islands:
+            islands = qrbs._engine._islands
+        reports = []
+        # If evaluation is successful, continue with execution
+        if BddQPU.evaluate(qrbs, islands, model):
+            for island in islands:
+                bdd, diagrams = island_bdd(island, model)
+                for element, diagram in diagrams.items():
+                    if element in [rule.right_hand_side for rule in island.rules]:
+                        element.precision = 2*np.arcsin(np.sqrt(min(bdd.probability(diagram), 1.0))) / np.pi
+                reports.append({
+                    'variables': len(bdd.weights),
+                    'nodes': len(bdd)
+                })
+        return reports
+
+
+class TensorNetworkQPU(QPU):
+    """Exact classical implementation of a Quantum Processing Unit (QPU), by contraction of stochastic tensor networks.
+
+    It computes the same probabilities the circuits of each model give in a noise-free simulation, including bayesian consequents targeted by several rules, in time governed by the largest intermediate tensor instead of the number of qubits.
+    """
+
+    MODELS = ['cf', 'fuzzy', 'bayes']
+
+    @staticmethod
+    def evaluate(qrbs, eval_islands=None, model='cf') -> bool:
+        """Evaluates whether a QRBS can be executed on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be evaluated.
+            eval_islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be evaluated.
+            model (str, optional): The code of the model indicated.
+
+        Raises:
+            ValueError: In case a specified knowledge island is not part of the QRBS or the model is not known.
+        """
+        if eval_islands is None:
+            eval_islands = []
+        if model not in TensorNetworkQPU.MODELS:
+            raise ValueError('Unknown model', model)
+        # Initiate islands in case of specified evaluation
+        if eval_islands:
+            for island in eval_islands:
+                if island not in qrbs._engine._islands:
+                    raise ValueError('A specified KnowledgeIsland is not part of the QRBS', island)
+        return True
+
+    @staticmethod
+    def execute(qrbs, islands=None, model='cf') -> List[Dict]:
+        """Executes the QRBS on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be executed.
+            islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
+            model (str, optional): The code of the model indicated.
+
+        Returns:
+            List[Dict]: The report of each executed knowledge island, with the number of tensors of its network.
+        """
+        if islands is None:
+            islands = []
+        # Initiate islands in case of specified evaluation
+        if not islands:
+            islands = qrbs._engine._islands
+        reports = []
+        # If evaluation is successful, continue with execution
+        if TensorNetworkQPU.evaluate(qrbs, islands, model):
+            for island in islands:
+                network = IslandNetwork(island, model)
+                for consequent, probability in zip(network.consequents, network.evaluate()):
+                    consequent.precision = 2*np.arcsin(np.sqrt(min(probability, 1.0))) / np.pi
+                reports.append({
+                    'tensors': len(network._tensors)
+                })
+        return reports
+
+
+def _sample_counts(island, model, samples, seed, chunk) -> List[int]:
+    # Number of samples where each consequent of the island is true, drawn in chunks of at most chunk samples
+    plan = IslandPlan.from_island(island)
+    consequents = [index for index, step in enumerate(plan.steps) if step[0] == 'consequent']
+    counts = [0] * len(consequents)
+    rng = np.random.default_rng(seed)
+    while samples > 0:
+        size = min(samples, chunk)
+        samples -= size
+        values = [None] * len(plan.nodes)
+        # Rotation angle of each consequent in the bayesian model, sampled into a bit when used
+        angles = {}
+
+        def value(node):
+            if node in angles:
+                values[node] = rng.random(size) < np.sin(angles[node] / 2) ** 2
+                angles[node] = values[node] * np.pi
+            return values[node]
+
+        for index in plan.order:
+            kind, element, operands, target = plan.steps[index]
+            if kind == 'fact':
+                values[target] = rng.random(size) < np.sin(element.precision * np.pi / 2) ** 2
+            elif kind == 'consequent':
+                values[target] = np.zeros(size, dtype=bool)
+                if model == 'bayes':
+                    angles[target] = np.zeros(size)
+            elif kind == 'operator':
+                if isinstance(element, NotOperator):
+                    values[target] = ~value(operands[0])
+                elif isinstance(element, AndOperator):
+                    values[target] = value(operands[0]) & value(operands[1])
+                elif isinstance(element, OrOperator):
+                    values[target] = value(operands[0]) | value(operands[1])
+            elif kind == 'implication':
+                if model == 'bayes':
+                    angles[target] = angles[target] + element.certainty * np.pi * value(operands[0])
+                else:
+                    certainty = rng.random(size) < np.sin(element.certainty * np.pi / 2) ** 2
+                    values[target] = values[target] ^ (value(operands[0]) & certainty)
+        for position, index in enumerate(consequents):
+            counts[position] += int(np.count_nonzero(value(plan.steps[index][3])))
+    return counts
+
+
+def monte_carlo(island, model='cf', samples=100000, confidence=0.95, workers=1, seed=None, chunk=65536) -> Dict[Fact, Tuple[float, float, float]]:
+    """Estimates the probability of each consequent of a knowledge island by sampling.
+
+    Each sample draws the bits of the input facts and of the certainty of each rule with the probability their preparation gives, and propagates them through the reversible logic of the island as boolean arrays. The controlled rotations of the bayesian model are accumulated as angles on each consequent, and only sampled into a bit when the consequent is used, so every model is followed exactly. Memory grows with the number of samples of a chunk times the number of elements of the island, and the samples are split among processes.
+
+    Args:
+        island (:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`): The knowledge island to be sampled.
+        model (str, optional): The code of the model indicated.
+        samples (int, optional): The number of samples to draw.
+        confidence (float, optional): The confidence level of the intervals.
+        workers (int, optional): The number of processes drawing samples.
+        seed (int, optional): The seed of the random number generators.
+        chunk (int, optional): The maximum number of samples propagated at once by each process.
+
+    Returns:
+        Dict[:obj:`~neasqc_qrbs.knowledge_rep.Fact`, Tuple[float, float, float]]: The estimated probability of each consequent, along with the bounds of its Wilson score interval.
+    """
+    plan = IslandPlan.from_island(island)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [samples // workers + (1 if worker < samples % workers else 0) for worker in range(workers)]
+    if workers == 1:
+        counts = _sample_counts(island, model, shares[0], seeds[0], chunk)
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_sample_counts, [island] * workers, [model] * workers, shares, seeds, [chunk] * workers))
+        counts = [sum(result) for result in zip(*results)]
+
+    estimates = {}
+    for step, count in zip([step for step in plan.steps if step[0] == 'consequent'], counts):
+        estimates[step[1]] = wilson_interval(count, samples, confidence)
+    return estimates
+
+
+class MonteCarloQPU(QPU):
+    """Approximate classical implementation of a Quantum Processing Unit (QPU), by sampling the logic of the circuits of each model.
+
+    It has no limit on the number of qubits, so it can execute the knowledge islands other QPUs reject, like :obj:`~neasqc_qrbs.qrbs.MyQlmQPU` does when given it as fallback.
+    """
+
+    MODELS = ['cf', 'fuzzy', 'bayes']
+
+    @staticmethod
+    def evaluate(qrbs, eval_islands=None, model='cf') -> bool:
+        """Evaluates whether a QRBS can be executed on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be evaluated.
+            eval_islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be evaluated.
+            model (str, optional): The code of the model indicated.
+
+        Raises:
+            ValueError: In case a specified knowledge island is not part of the QRBS or the model is not known.
+        """
+        if eval_islands is None:
+            eval_islands = []
+        if model not in MonteCarloQPU.MODELS:
+            raise ValueError('Unknown model', model)
+        for island in eval_islands:
+            if island not in qrbs._engine._islands:
+                raise ValueError('A specified KnowledgeIsland is not part of the QRBS', island)
+        return True
+
+    @staticmethod
+    def execute(qrbs, islands=None, model='cf', samples=100000, confidence=0.95, workers=1, seed=None) -> List[Dict]:
+        """Executes the QRBS on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be executed.
+            islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
+            model (str, optional): The code of the model indicated.
+            samples (int, optional): The number of samples drawn for each knowledge island.
+            confidence (float, optional): The confidence level of the intervals.
+            workers (int, optional): The number of processes drawing samples.
+            seed (int, optional): The seed of the random number generators.
+
+        Returns:
+            List[Dict]: The report of each executed knowledge island, with the number of samples and the estimated probability and interval of each consequent, indexed by its attribute.
+        """
+        if islands is None:
+            islands = []
+        # Initiate islands in case of specified evaluation
+        if not islands:
+            islands = qrbs._engine._islands
+        reports = []
+        # If evaluation is successful, continue with execution
+        if MonteCarloQPU.evaluate(qrbs, islands, model):
+            for island in islands:
+                estimates = monte_carlo(island, model, samples, confidence, workers, seed)
+                for consequent, (estimate, _, _) in estimates.items():
+                    consequent.precision = 2*np.arcsin(np.sqrt(estimate)) / np.pi
+                reports.append({
+                    'samples': samples,
+                    'probabilities': {consequent.attribute: estimate for consequent, (estimate, _, _) in estimates.items()},
+                    'intervals': {consequent.attribute: (low, high) for consequent, (_, low, high) in estimates.items()}
+                })
+        return reports
@@ -0,0 +1,821 @@
+# -*- coding : utf-8 -*
+
+import copy
+import functools
+import heapq
+import itertools
+import operator
+from typing import Dict, List, Tuple
+
+import numpy as np
+from qat.comm.datamodel.ttypes import Op
+from qat.core import Batch
+from qat.core.qpu import CompositeQPU
+from qat.lang import AQASM
+from qat.lang.AQASM import Program
+
+from .knowledge_rep import AndOperator, BuilderImpl, Fact, IslandPlan, KnowledgeIsland, LeftHandSide, NotOperator, OrOperator, Rule
+
+
+def routine_depth(routine) -> int:
+    """Computes the depth of a quantum routine, considering each of its operations exclusive on its wires.
+
+    Args:
+        routine (:obj:`QRoutine`): The routine whose depth is being computed.
+
+    Returns:
+        int: The depth of the routine.
+    """
+    levels = {}
+    for op in routine.op_list:
+        level = 1 + max([levels.get(wire, 0) for wire in op.args], default=0)
+        for wire in op.args:
+            levels[wire] = level
+    return max(levels.values(), default=0)
+
+
+def circuit_depth(circuit) -> int:
+    """Computes the depth of a circuit, considering each of its operations exclusive on its qubits.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit whose depth is being computed.
+
+    Returns:
+        int: The depth of the circuit.
+    """
+    levels = [0] * circuit.nbqbits
+    for op in circuit.ops:
+        level = 1 + max([levels[qbit] for qbit in op.qbits], default=0)
+        for qbit in op.qbits:
+            levels[qbit] = level
+    return max(levels, default=0)
+
+
+def _rebalance(element, builder, durations) -> Tuple[LeftHandSide, int]:
+    # Regroups the chains of associative operators under element, returning the new element and the depth of its gates
+    if isinstance(element, Fact):
+        return element, 0
+    if isinstance(element, NotOperator):
+        child, height = _rebalance(element.child, builder, durations)
+        return (element if child is element.child else NotOperator(child)), height + durations[NotOperator]
+    kind = type(element)
+    if kind not in builder.ASSOCIATIVE_OPERATORS:
+        left, left_height = _rebalance(element.left_child, builder, durations)
+        right, right_height = _rebalance(element.right_child, builder, durations)
+        if left is element.left_child and right is element.right_child:
+            return element, max(left_height, right_height) + durations[kind]
+        return kind(left, right), max(left_height, right_height) + durations[kind]
+
+    chain = []
+
+    def regroup(node):
+        # Rebuilds the chain with its original grouping, collecting its rebalanced operands
+        if type(node) is not kind:
+            operand, height = _rebalance(node, builder, durations)
+            chain.append((height, len(chain), operand))
+            return operand, height
+        left, left_height = regroup(node.left_child)
+        right, right_height = regroup(node.right_child)
+        if left is node.left_child and right is node.right_child:
+            return node, max(left_height, right_height) + durations[kind]
+        return kind(left, right), max(left_height, right_height) + durations[kind]
+
+    original, original_height = regroup(element)
+    # Joining the two shallowest operands first, wherever they are in the chain, gives the minimum depth
+    heap = list(chain)
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        first, second = heapq.heappop(heap), heapq.heappop(heap)
+        left, right = sorted([first, second], key=lambda operand: operand[1])
+        heapq.heappush(heap, (max(left[0], right[0]) + durations[kind], left[1], kind(left[2], right[2])))
+    height, _, node = heap[0]
+    if height < original_height:
+        return node, height
+    return original, original_height
+
+
+def rebalance(rules, builder) -> List[Rule]:
+    """Regroups the chains of associative operators of the rules into balanced trees.
+
+    A left-deep chain like ``OrOperator(OrOperator(OrOperator(a, b), c), d)`` is lowered one operator after the other, so its depth grows linearly with its length. Since the operands of a chain can be grouped and reordered in any way, the two shallowest operands are joined first, wherever they are in the chain, into a tree of minimum depth given the depth of the gates of each operator, which reduces the depth to logarithmic. Only the operators declared associative and commutative by the builder, in ``ASSOCIATIVE_OPERATORS``, are regrouped.
+
+    Args:
+        rules (List[:obj:`~neasqc_qrbs.knowledge_rep.Rule`]): The rules to be rebalanced, in lowering order.
+        builder (:obj:`~neasqc_qrbs.knowledge_rep.Builder`): The builder of the model used.
+
+    Returns:
+        List[:obj:`~neasqc_qrbs.knowledge_rep.Rule`]: The rules with their left hand sides rebalanced. Rules which do not change are returned as they are.
+    """
+    durations = {
+        AndOperator: routine_depth(builder.build_and()),
+        OrOperator: routine_depth(builder.build_or()),
+        NotOperator: routine_depth(builder.build_not())
+    }
+    rebalanced = []
+    for rule in rules:
+        left_hand_side, _ = _rebalance(rule.left_hand_side, builder, durations)
+        if left_hand_side is not rule.left_hand_side:
+            rule = Rule(left_hand_side, rule.right_hand_side, rule.certainty)
+        rebalanced.append(rule)
+    return rebalanced
+
+
+TREE_PASSES = {
+    'rebalance': rebalance
+}
+
+
+def schedule(plan, builder=None) -> IslandPlan:
+    """Reorders the blocks of a plan into minimum-depth layers.
+
+    Blocks that only share the wires they read from commute, so they can be emitted in any order, while a block writing a wire keeps its position with respect to every other block using that wire. The blocks are list scheduled by critical path, each one as soon as its dependencies are done and its wires are free.
+
+    Args:
+        plan (:obj:`~neasqc_qrbs.knowledge_rep.IslandPlan`): The plan to be scheduled.
+        builder (:obj:`~neasqc_qrbs.knowledge_rep.Builder`, optional): The builder whose gates give the duration of each block. Every block lasts one layer if not specified.
+
+    Returns:
+        :obj:`~neasqc_qrbs.knowledge_rep.IslandPlan`: A copy of the plan with its blocks reordered and grouped in ``layers``.
+    """
+    blocks = [index for index in plan.order if plan.steps[index][0] != 'consequent']
+    reads = {index: set(plan.steps[index][2]) for index in blocks}
+    writes = {index: {plan.steps[index][3]} for index in blocks}
+    durations = {index: 1 for index in blocks}
+    if builder is not None:
+        for index in blocks:
+            kind, element, _, _ = plan.steps[index]
+            routine = builder.build_implication(element) if kind == 'implication' else element.build(builder)
+            durations[index] = routine_depth(routine)
+
+    def commute(first, second):
+        if plan.steps[first][0] == plan.steps[second][0] == 'implication':
+            # Implications accumulate on their consequent, so they commute among them
+            return not (writes[first] & reads[second] or reads[first] & writes[second])
+        return not (writes[first] & (reads[second] | writes[second]) or reads[first] & writes[second])
+
+    predecessors = {index: [] for index in blocks}
+    successors = {index: [] for index in blocks}
+    for position, index in enumerate(blocks):
+        for previous in blocks[:position]:
+            if not commute(previous, index):
+                predecessors[index].append(previous)
+                successors[previous].append(index)
+
+    # Length of the longest path from each block to the end of the circuit
+    priority = {}
+    for index in reversed(blocks):
+        priority[index] = durations[index] + max([priority[successor] for successor in successors[index]], default=0)
+
+    position = {index: order for order, index in enumerate(blocks)}
+    pending = {index: len(predecessors[index]) for index in blocks}
+    ready = [(-priority[index], position[index], index) for index in blocks if not pending[index]]
+    heapq.heapify(ready)
+    busy = {}
+    start, end = {}, {}
+    while ready:
+        _, _, index = heapq.heappop(ready)
+        time = max([end[previous] for previous in predecessors[index]], default=0)
+        wires = reads[index] | writes[index]
+        conflict = True
+        while conflict:
+            conflict = False
+            for wire in wires:
+                for (begin, finish) in busy.get(wire, []):
+                    if begin < time + durations[index] and time < finish:
+                        time, conflict = finish, True
+        start[index], end[index] = time, time + durations[index]
+        for wire in wires:
+            busy.setdefault(wire, []).append((start[index], end[index]))
+        for successor in successors[index]:
+            pending[successor] -= 1
+            if not pending[successor]:
+                heapq.heappush(ready, (-priority[successor], position[successor], successor))
+
+    def asap(sequence):
+        # Start of each block when emitted in the given sequence
+        free, times = {}, {}
+        for index in sequence:
+            wires = reads[index] | writes[index]
+            times[index] = max([free.get(wire, 0) for wire in wires], default=0)
+            for wire in wires:
+                free[wire] = times[index] + durations[index]
+        return times
+
+    sequence = sorted(blocks, key=lambda index: (start[index], position[index]))
+    start = asap(sequence)
+    original = asap(blocks)
+    if max([original[index] + durations[index] for index in blocks], default=0) <= max([start[index] + durations[index] for index in blocks], default=0):
+        sequence, start = blocks, original
+
+    scheduled = copy.copy(plan)
+    times = sorted(set(start.values()))
+    scheduled.layers = [[index for index in sequence if start[index] == time] for time in times]
+    scheduled.order = [index for index in plan.order if plan.steps[index][0] == 'consequent'] + sequence
+    return scheduled
+
+
+PLAN_PASSES = {
+    'schedule': schedule
+}
+
+
+def _controls(name) -> int:
+    # Number of control qubits of a gate, which are always its first qubits
+    if name == 'CNOT':
+        return 1
+    if name == 'CCNOT':
+        return 2
+    controls = 0
+    while name.startswith('C-'):
+        name = name[2:]
+        controls += 1
+    return controls
+
+
+def _cancel(gates) -> List:
+    # Removes pairs of equal self-inverse gates with nothing in between on their qubits
+    stacks = {}
+    kept = []
+    for gate in gates:
+        name, op = gate
+        previous = stacks.get(op.qbits[0], [])
+        if name in ('X', 'CNOT', 'CCNOT') and previous:
+            candidate = previous[-1]
+            other_name, other_op = kept[candidate]
+            if other_name == name and other_op.qbits[-1] == op.qbits[-1] and set(other_op.qbits) == set(op.qbits) \
+                    and all(stacks.get(qbit, [None])[-1] == candidate for qbit in op.qbits):
+                kept[candidate] = None
+                for qbit in op.qbits:
+                    stacks[qbit].pop()
+                continue
+        kept.append(gate)
+        for qbit in op.qbits:
+            stacks.setdefault(qbit, []).append(len(kept) - 1)
+    return [gate for gate in kept if gate is not None]
+
+
+def _fold(gates, position) -> List:
+    # Replaces the copy of a wire made by the CNOT at position by negative or positive controls on its source
+    name, op = gates[position]
+    source, copy_wire = op.qbits
+    if any(copy_wire in other.qbits for _, other in gates[:position]):
+        return None
+    folded = gates[:position]
+    source_flips, copy_flips = 0, 0
+    for name, other in gates[position + 1:]:
+        if copy_wire not in other.qbits and source not in other.qbits:
+            folded.append((name, other))
+            continue
+        controls = other.qbits[:_controls(name)]
+        if name == 'X':
+            if other.qbits[0] == copy_wire:
+                copy_flips ^= 1
+            else:
+                source_flips ^= 1
+                folded.append((name, other))
+            continue
+        if copy_wire in other.qbits[len(controls):] or source in other.qbits[len(controls):]:
+            return None
+        if copy_wire not in controls:
+            folded.append((name, other))
+            continue
+        if source in controls:
+            return None
+        # The copy holds the value of the source wire, up to the flips applied on each of them
+        negative = source_flips ^ copy_flips
+        flip = (('X', Op(gate='X', qbits=[source], type=0)),)
+        replaced = copy.copy(other)
+        replaced.qbits = [source if qbit == copy_wire else qbit for qbit in other.qbits]
+        folded.extend(flip * negative + ((name, replaced),) + flip * negative)
+    return folded
+
+
+def peephole(circuit, elements) -> Tuple[object, Dict[LeftHandSide, int], Dict]:
+    """Removes redundant gates from the circuit of a knowledge island.
+
+    Adjacent pairs of equal self-inverse gates (``X``, ``CNOT`` and ``CCNOT``), like the ``X`` conjugations of chained or operators, are cancelled. Wires which are only a copy of another wire, up to ``X`` gates, and are only used as controls, like the output of a ``NotOperator``, are folded into their source as negative or positive controls whenever it does not increase the number of gates. Folded wires are left idle and removed from the elements.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit to be optimised.
+        elements (Dict[:obj:`~neasqc_qrbs.knowledge_rep.LeftHandSide`, int]): The index of which qubit corresponds to each LeftHandSide element.
+
+    Returns:
+        Tuple[:obj:`Circuit`, Dict[:obj:`~neasqc_qrbs.knowledge_rep.LeftHandSide`, int], Dict]: A tuple containing the optimised circuit, the elements whose qubit still holds their value and a report of the gates removed and wires folded.
+    """
+    gates = _cancel([(name, op) for (name, _, _), op in zip(circuit.iterate_simple(), circuit.ops)])
+    folded_wires = []
+    position = 0
+    while position < len(gates):
+        name, op = gates[position]
+        if name == 'CNOT':
+            folded = _fold(gates, position)
+            if folded is not None:
+                folded = _cancel(folded)
+                if len(folded) <= len(gates):
+                    folded_wires.append(op.qbits[1])
+                    gates = folded
+                    continue
+        position += 1
+
+    optimised = copy.copy(circuit)
+    optimised.ops = [op for _, op in gates]
+    elements = {element: wire for element, wire in elements.items() if wire not in folded_wires}
+    report = {
+        'gates_removed': len(circuit.ops) - len(optimised.ops),
+        'folded_wires': sorted(folded_wires)
+    }
+    return optimised, elements, report
+
+
+def circuit_cutwidth(circuit) -> int:
+    """Computes the cutwidth of a circuit, the largest number of multi-qubit gates spanning any cut between consecutive qubits.
+
+    The bond dimension an MPS or MPO simulation needs grows exponentially with the number of gates spanning a cut.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit whose cutwidth is being computed.
+
+    Returns:
+        int: The cutwidth of the circuit.
+    """
+    crossings = [0] * circuit.nbqbits
+    for op in circuit.ops:
+        for cut in range(min(op.qbits), max(op.qbits)):
+            crossings[cut] += 1
+    return max(crossings, default=0)
+
+
+def _span(weights, position) -> int:
+    # Sum of the distances between interacting qubits, weighted by their number of interactions
+    return sum(weight * abs(position[first] - position[second]) for (first, second), weight in weights.items())
+
+
+def _arrangement(nbqbits, weights) -> List[int]:
+    # Order of the qubits by spectral seriation of each connected component of the interaction graph, refined with adjacent swaps
+    neighbours = [dict() for _ in range(nbqbits)]
+    for (first, second), weight in weights.items():
+        neighbours[first][second] = weight
+        neighbours[second][first] = weight
+    order, seen = [], set()
+    for start in sorted(range(nbqbits), key=lambda qbit: not neighbours[qbit]):
+        if start in seen:
+            continue
+        component, frontier = [], [start]
+        seen.add(start)
+        while frontier:
+            qbit = frontier.pop()
+            component.append(qbit)
+            for other in neighbours[qbit]:
+                if other not in seen:
+                    seen.add(other)
+                    frontier.append(other)
+        component.sort()
+        if len(component) > 2:
+            index = {qbit: number for number, qbit in enumerate(component)}
+            laplacian = np.zeros((len(component), len(component)))
+            for qbit in component:
+                for other, weight in neighbours[qbit].items():
+                    laplacian[index[qbit], index[other]] -= weight
+                    laplacian[index[qbit], index[qbit]] += weight
+            fiedler = np.linalg.eigh(laplacian)[1][:, 1]
+            component = [component[number] for number in np.argsort(fiedler, kind='stable')]
+        order.extend(component)
+
+    position = {qbit: number for number, qbit in enumerate(order)}
+
+    def cost(qbit, place):
+        return sum(weight * abs(place - position[other]) for other, weight in neighbours[qbit].items())
+
+    improved = True
+    while improved:
+        improved = False
+        for number in range(nbqbits - 1):
+            first, second = order[number], order[number + 1]
+            delta = cost(first, number + 1) + cost(second, number) - cost(first, number) - cost(second, number + 1)
+            # The interaction between the swapped qubits keeps its distance, but the costs above count it as vanished
+            delta += 2 * neighbours[first].get(second, 0)
+            if delta < 0:
+                order[number], order[number + 1] = second, first
+                position[first], position[second] = number + 1, number
+                improved = True
+    return order
+
+
+def reorder(circuit, elements) -> Tuple[object, Dict[LeftHandSide, int], Dict]:
+    """Permutes the qubits of the circuit of a knowledge island, placing the operands of each gate close together.
+
+    Builders assign qubits in discovery order, so gates may span long distances, which is costly for MPS and MPO simulators. The permutation minimises heuristically the linear arrangement of the interaction graph of the qubits, by spectral seriation refined with swaps of adjacent qubits, and is only applied when it does not increase it.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit to be reordered.
+        elements (Dict[:obj:`~neasqc_qrbs.knowledge_rep.LeftHandSide`, int]): The index of which qubit corresponds to each LeftHandSide element.
+
+    Returns:
+        Tuple[:obj:`Circuit`, Dict[:obj:`~neasqc_qrbs.knowledge_rep.LeftHandSide`, int], Dict]: A tuple containing the reordered circuit, the new index of the qubit of each element and a report of the new index of each qubit and of the span and cutwidth before and after.
+    """
+    weights = {}
+    for op in circuit.ops:
+        for first, second in itertools.combinations(sorted(set(op.qbits)), 2):
+            weights[(first, second)] = weights.get((first, second), 0) + 1
+    identity = list(range(circuit.nbqbits))
+    order = _arrangement(circuit.nbqbits, weights)
+    permutation = [0] * circuit.nbqbits
+    for number, qbit in enumerate(order):
+        permutation[qbit] = number
+    if _span(weights, permutation) > _span(weights, identity):
+        permutation = identity
+
+    reordered = copy.copy(circuit)
+    reordered.ops = []
+    for op in circuit.ops:
+        moved = copy.copy(op)
+        moved.qbits = [permutation[qbit] for qbit in op.qbits]
+        reordered.ops.append(moved)
+    report = {
+        'permutation': permutation,
+        'span_before': _span(weights, identity),
+        'span_after': _span(weights, permutation),
+        'cutwidth_before': circuit_cutwidth(circuit),
+        'cutwidth_after': circuit_cutwidth(reordered)
+    }
+    return reordered, {element: permutation[wire] for element, wire in elements.items()}, report
+
+
+CIRCUIT_PASSES = {
+    'peephole': peephole,
+    'reorder': reorder
+}
+
+
+def _arity(rules, builder) -> int:
+    # Number of qubits of the circuit of the rules, computed from their plan without building any gate
+    plan = IslandPlan(rules)
+    ancillas = builder.build_implication(rules[0]).arity - 2
+    return len(plan.nodes) + ancillas * len(rules)
+
+
+def _dependencies(units) -> List:
+    # Sorts the units so that every consequent is produced before it is used
+    ordered = []
+    pending = list(units)
+    while pending:
+        for unit in pending:
+            consequent = unit[0].right_hand_side
+            if not any(consequent != other[0].right_hand_side and other[0].right_hand_side in rule.left_hand_side
+                       for other in pending for rule in unit):
+                break
+        pending.remove(unit)
+        ordered.append(unit)
+    return ordered
+
+
+def cut_island(island, builder, max_arity) -> Tuple[List[KnowledgeIsland], Dict]:
+    """Cuts a knowledge island into sub-islands whose circuits fit in the given number of qubits.
+
+    The rules of the island are packed, in dependency order, into as few sub-islands as possible, keeping the rules of each consequent together. The consequents produced by a sub-island and used by a later one are intermediate facts: once the former is executed, their measured precision is fed forward as a prepared input of the latter. A rule too wide to fit by itself is cut at its subexpressions, each of them becoming the left hand side of an auxiliary rule with certainty 1 whose consequent replaces it.
+
+    Feeding an intermediate fact forward keeps its marginal, but not its correlation with the other inputs of the sub-island using it. Whenever both depend on a same input of the island the result is an approximation, which is reported.
+
+    Args:
+        island (:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`): The knowledge island to be cut.
+        builder (:obj:`~neasqc_qrbs.knowledge_rep.Builder`): The builder of the model used.
+        max_arity (int): The maximum number of qubits of each sub-island.
+
+    Returns:
+        Tuple[List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], Dict]: A tuple containing the sub-islands, in execution order, and a report of the cut with the number of sub-islands, the intermediate facts fed forward and the intermediate facts whose correlation with other inputs is lost, along with the inputs of the island they share.
+
+    Raises:
+        ValueError: In case the knowledge island cannot be cut to fit in the given number of qubits.
+    """
+    auxiliary = []
+
+    def fits(rules):
+        return _arity(rules, builder) <= max_arity
+
+    def cut(rule, element):
+        # Replaces element by the consequent of an auxiliary rule, returning the auxiliary rules and the new fact
+        fact = Fact('cut_{}'.format(len(auxiliary)), 'Subexpression of {}'.format(rule.right_hand_side.attribute))
+        auxiliary.append(fact)
+        return split(Rule(element, fact, 1.0)), fact
+
+    def split(rule):
+        # Cuts the widest subexpressions of a rule until it fits by itself
+        rules = []
+        while not fits([rule]):
+            left_hand_side = rule.left_hand_side
+            children = [left_hand_side.child] if isinstance(left_hand_side, NotOperator) else \
+                [left_hand_side.left_child, left_hand_side.right_child] if not isinstance(left_hand_side, Fact) else []
+            compound = [child for child in children if not isinstance(child, Fact)]
+            if not compound:
+                raise ValueError('A KnowledgeIsland cannot be cut to fit the capacity of QPU ({} qubits)'.format(max_arity), island)
+            widest = max(compound, key=lambda child: len(list(child)))
+            cut_rules, fact = cut(rule, widest)
+            rules.extend(cut_rules)
+            children = [fact if child is widest else child for child in children]
+            rule = Rule(type(left_hand_side)(*children), rule.right_hand_side, rule.certainty)
+        return rules + [rule]
+
+    units = []
+    for rule in IslandPlan.from_island(island).rules:
+        for unit in units:
+            if unit[0].right_hand_side == rule.right_hand_side:
+                unit.append(rule)
+                break
+        else:
+            units.append([rule])
+
+    groups = []
+    for unit in _dependencies(units):
+        if not fits(unit):
+            rules = [split(rule) for rule in unit]
+            unit = [rule_list[-1] for rule_list in rules]
+            for position, rule in enumerate(unit):
+                if fits(unit):
+                    break
+                if not isinstance(rule.left_hand_side, Fact):
+                    cut_rules, fact = cut(rule, rule.left_hand_side)
+                    unit[position] = Rule(fact, rule.right_hand_side, rule.certainty)
+                    rules[position] = rules[position][:-1] + cut_rules + unit[position:position + 1]
+            if not fits(unit):
+                raise ValueError('A KnowledgeIsland cannot be cut to fit the capacity of QPU ({} qubits)'.format(max_arity), island)
+            previous = [[rule] for rule_list in rules for rule in rule_list[:-1]] + [unit]
+        else:
+            previous = [unit]
+        for unit in previous:
+            if groups and fits(groups[-1] + unit):
+                groups[-1].extend(unit)
+            else:
+                groups.append(list(unit))
+
+    # Inputs of the island each fact depends on
+    rules = [rule for group in groups for rule in group]
+    ancestors = {}
+    for rule in rules:
+        dependencies = set()
+        for fact in rule.left_hand_side:
+            dependencies |= ancestors.get(fact.attribute, {fact.attribute})
+        ancestors[rule.right_hand_side.attribute] = ancestors.get(rule.right_hand_side.attribute, set()) | dependencies
+
+    intermediates, correlated = [], []
+    for position, group in enumerate(groups):
+        produced = [rule.right_hand_side for rule in group]
+        earlier = [rule.right_hand_side for other in groups[:position] for rule in other]
+        inputs = []
+        for rule in group:
+            for fact in rule.left_hand_side:
+                if fact not in produced and fact not in inputs:
+                    inputs.append(fact)
+        for fact in inputs:
+            if fact in earlier:
+                if fact.attribute not in intermediates:
+                    intermediates.append(fact.attribute)
+                shared = set()
+                for other in inputs:
+                    if other is not fact:
+                        shared |= ancestors[fact.attribute] & ancestors.get(other.attribute, {other.attribute})
+                if shared:
+                    correlated.append({'fact': fact.attribute, 'shared': sorted(shared)})
+
+    report = {
+        'islands': len(groups),
+        'intermediates': intermediates,
+        'correlated': correlated
+    }
+    return [KnowledgeIsland(group) for group in groups], report
+
+
+def pack_islands(islands, builder, max_arity) -> List[List[KnowledgeIsland]]:
+    """Groups knowledge islands into batches to be executed side by side, on separate wires of one circuit.
+
+    Each knowledge island is placed, in order, in the first batch with enough free qubits where it sees the same facts it would see executed after the islands before it: any batch after those producing one of its inputs, and not before those using or producing one of its consequents. Knowledge islands requiring more qubits than available get a batch of their own.
+
+    Args:
+        islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`]): The knowledge islands to be packed, in execution order.
+        builder (:obj:`~neasqc_qrbs.knowledge_rep.Builder`): The builder of the model used.
+        max_arity (int): The maximum number of qubits of each batch.
+
+    Returns:
+        List[List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`]]: The batches of knowledge islands, in execution order.
+    """
+    batches, widths, placed = [], [], []
+    for island in islands:
+        width = _arity(island.rules, builder)
+        consequents = [rule.right_hand_side for rule in island.rules]
+        lowest = 0
+        for other, batch in placed:
+            other_consequents = [rule.right_hand_side for rule in other.rules]
+            if any(consequent in rule.left_hand_side for consequent in other_consequents for rule in island.rules):
+                lowest = max(lowest, batch + 1)
+            elif any(consequent in other_consequents or consequent in rule.left_hand_side for consequent in consequents for rule in other.rules):
+                lowest = max(lowest, batch)
+        for batch in range(lowest, len(batches) + 1):
+            if batch == len(batches):
+                batches.append([])
+                widths.append(0)
+            if not batches[batch] or widths[batch] + width <= max_arity:
+                break
+        batches[batch].append(island)
+        widths[batch] += width
+        placed.append((island, batch))
+    return batches
+
+
+def join_circuits(circuits) -> Tuple[object, List[int]]:
+    """Joins circuits side by side into a single circuit.
+
+    Args:
+        circuits (List[:obj:`Circuit`]): The circuits to be joined.
+
+    Returns:
+        Tuple[:obj:`Circuit`, List[int]]: A tuple containing the joint circuit and the index of the first qubit of each circuit in it.
+    """
+    offsets = [0]
+    for circuit in circuits[:-1]:
+        offsets.append(offsets[-1] + circuit.nbqbits)
+    return functools.reduce(operator.mul, circuits), offsets
+
+
+def compile_island(island, builder, passes=None) -> Tuple[object, Dict[LeftHandSide, int], Dict]:
+    """Compiles a knowledge island into a circuit, applying the given optimisation passes.
+
+    Passes are applied by stage: passes on the rules of the island (:obj:`TREE_PASSES`), on its plan (:obj:`PLAN_PASSES`) and on the resulting circuit (:obj:`CIRCUIT_PASSES`). Within a stage, passes are applied in the given order.
+
+    Args:
+        island (:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`): The knowledge island to be compiled.
+        builder (:obj:`~neasqc_qrbs.knowledge_rep.Builder`): The builder of the model used.
+        passes (List[str], optional): Codes of the passes to apply, in order.
+
+    Returns:
+        Tuple[:obj:`Circuit`, Dict[:obj:`~neasqc_qrbs.knowledge_rep.LeftHandSide`, int], Dict]: A tuple containing the circuit, the index of which qubit corresponds to each LeftHandSide element and a report of the compilation.
+
+    Raises:
+        ValueError: In case a pass is not known.
+    """
+    if passes is None:
+        passes = []
+    for code in passes:
+        if code not in TREE_PASSES and code not in PLAN_PASSES and code not in CIRCUIT_PASSES:
+            raise ValueError('Unknown compilation pass', code)
+    plan = IslandPlan.from_island(island)
+    if any(code in TREE_PASSES for code in passes):
+        rules = plan.rules
+        for code in passes:
+            if code in TREE_PASSES:
+                rules = TREE_PASSES[code](rules, builder)
+        plan = IslandPlan(rules)
+    for code in passes:
+        if code in PLAN_PASSES:
+            plan = PLAN_PASSES[code](plan, builder)
+    routine, elements = builder.build_island(island, plan)
+
+    prog = Program()
+    qbits = prog.qalloc(routine.arity)
+    prog.apply(routine, qbits)
+    circuit = prog.to_circ()
+
+    report = {}
+    for code in passes:
+        if code in CIRCUIT_PASSES:
+            circuit, elements, report[code] = CIRCUIT_PASSES[code](circuit, elements)
+    report.update({
+        'qubits': circuit.nbqbits,
+        'gates': len(circuit.ops),
+        'depth': circuit_depth(circuit)
+    })
+    return circuit, elements, report
+
+
+# Rotations whose angle becomes a variable of the parametrized circuit
+ROTATIONS = ('RX', 'RY', 'RZ', 'PH')
+
+
+def parametrize(circuit) -> Tuple[object, Tuple, Dict[str, float]]:
+    """Replaces the angle of each rotation of a circuit by a variable, separating its structure from the precisions and certainties of the knowledge island.
+
+    The ``M`` gate of :obj:`~neasqc_qrbs.knowledge_rep.BuilderImpl` is rewritten as a Z gate followed by a Y rotation, its exact decomposition, so compilers without its matrix can handle it.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit being parametrized.
+
+    Returns:
+        Tuple[:obj:`Circuit`, Tuple, Dict[str, float]]: A tuple containing the parametrized circuit, a key identifying its structure and the value of each variable.
+
+    Raises:
+        ValueError: In case the circuit has a gate which is not part of the AQASM library.
+    """
+    prog = Program()
+    qbits = prog.qalloc(circuit.nbqbits)
+    structure, values = [], {}
+
+    def variable(angle):
+        name = 'theta_{}'.format(len(values))
+        values[name] = angle
+        return prog.new_var(float, name)
+
+    for name, params, wires in circuit.iterate_simple():
+        modifiers = name.split('-')
+        base = modifiers.pop()
+        if base == BuilderImpl.M.name:
+            # M(x) is the product of a Y rotation of angle pi x and a Z gate, both real and self-adjoint
+            gates = [AQASM.Z, AQASM.RY(variable(params[0] * np.pi))]
+            modifiers = [modifier for modifier in modifiers if modifier != 'D']
+            structure.append((name, tuple(wires)))
+        elif base in ROTATIONS:
+            gates = [getattr(AQASM, base)(variable(params[0]))]
+            structure.append((name, tuple(wires)))
+        elif hasattr(AQASM, base) and isinstance(getattr(AQASM, base), AQASM.gates.Gate):
+            gates = [getattr(AQASM, base)(*params) if params else getattr(AQASM, base)]
+            structure.append((name, tuple(wires), tuple(params)))
+        else:
+            raise ValueError('Gate cannot be parametrized', name)
+        for gate in gates:
+            for modifier in reversed(modifiers):
+                gate = gate.ctrl() if modifier == 'C' else gate.dag()
+            prog.apply(gate, *[qbits[wire] for wire in wires])
+    return prog.to_circ(), (circuit.nbqbits, tuple(structure)), values
+
+
+class PluginCache:
+    """Class caching the circuits compiled by the plugins of a QPU, like the KAK compression and Toffoli expansion of noisy QPUs.
+
+    Circuits are compiled once per structure, with their rotation angles as variables (see :obj:`parametrize`), and later executions only bind the angles of their precisions and certainties.
+
+    Attributes:
+        hits (int): Number of compilations served from the cache.
+        misses (int): Number of compilations executed by the plugins.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, plugin, job, specs=None):
+        """Compiles a job with a plugin, reusing the compiled circuit of any previous job with the same structure.
+
+        Args:
+            plugin: The plugin compiling the job.
+            job (:obj:`Job`): The job being compiled.
+            specs (:obj:`HardwareSpecs`, optional): The specifications of the QPU after the plugin.
+
+        Returns:
+            :obj:`Job`: The compiled job.
+
+        Raises:
+            ValueError: In case the circuit of the job cannot be parametrized.
+        """
+        circuit, structure, values = parametrize(job.circuit)
+        # Plugins are identified by instance, as pooled by neasqc_qrbs.backends, and kept alive by the cache
+        key = (id(plugin), structure, job.nbshots)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not plugin:
+            abstract = copy.copy(job)
+            abstract.circuit = circuit
+            entry = [plugin, plugin.compile(Batch(jobs=[abstract]), specs).jobs[0], float]
+            self._entries[key] = entry
+            self.misses += 1
+        else:
+            self.hits += 1
+        # Symbolic decompositions may take real powers of negative determinants, which are only defined for complex angles
+        for kind in (entry[2], complex if entry[2] is float else float):
+            try:
+                with np.errstate(invalid='ignore'):
+                    bound = entry[1].circuit.bind_variables({name: kind(value) for name, value in values.items()})
+            except TypeError:
+                continue
+            if all(np.isreal(param) and np.isfinite(param) for _, params, _ in bound.iterate_simple() for param in params):
+                entry[2] = kind
+                compiled = copy.copy(entry[1])
+                compiled.circuit = bound
+                return compiled
+        return plugin.compile(Batch(jobs=[job]), specs).jobs[0]
+
+    def submit(self, qpu, job):
+        """Submits a job to a QPU, compiling it through the cache when the QPU is a stack of plugins.
+
+        Args:
+            qpu: The QPU the job is submitted to.
+            job (:obj:`Job`): The job being submitted.
+
+        Returns:
+            :obj:`Result`: The result of the job.
+        """
+        if not isinstance(qpu, CompositeQPU):
+            return qpu.submit(job)
+        try:
+            compiled = self.compile(qpu.plugin, job, qpu.qpu.get_specs())
+        except ValueError:
+            return qpu.submit(job)
+        return qpu.plugin.post_process(qpu.qpu.submit(Batch(jobs=[compiled])))[0]
+
+    def clear(self) -> None:
+        """Removes every compiled circuit from the cache.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+PLUGIN_CACHE = PluginCache()
+"""PluginCache: Cache of compiled circuits shared by the QPUs of the package."""
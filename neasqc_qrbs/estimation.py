@@ -0,0 +1,237 @@
+# -*- coding : utf-8 -*
+
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+
+import numpy as np
+from qat.lang.AQASM import Program, X, Z
+
+from .backends import describe
+from .qrbs import MyQlmQPU, QPU
+
+
+def grover_circuit(routine, target, power=0):
+    """Builds the circuit applying a power of the Grover operator of a quantum routine to the state it prepares.
+
+    The routine :math:`A` prepares the state whose probability of measuring the target qubit as 1 is estimated, :math:`a = \\sin^2 \\theta`. The Grover operator :math:`Q = A S_0 A^\\dagger S_1` reflects about the states with the target qubit as 1 and then about the state :math:`A` prepares, so measuring :math:`Q^k A |0\\rangle` gives 1 with probability :math:`\\sin^2 ((2k+1) \\theta)`.
+
+    Args:
+        routine (:obj:`QRoutine`): The routine preparing the state, like that of a knowledge island.
+        target (int): The qubit of the routine whose probability of being measured as 1 is estimated.
+        power (int, optional): The number of times the Grover operator is applied.
+
+    Returns:
+        :obj:`Circuit`: The circuit, applying the routine :math:`2k+1` times.
+    """
+    program = Program()
+    qubits = program.qalloc(routine.arity)
+    program.apply(routine, qubits)
+    for _ in range(power):
+        program.apply(Z, qubits[target])
+        program.apply(routine.dag(), qubits)
+        # Reflection about the all-zero state, up to a global phase
+        for qubit in qubits:
+            program.apply(X, qubit)
+        program.apply(Z.ctrl(routine.arity - 1), *qubits)
+        for qubit in qubits:
+            program.apply(X, qubit)
+        program.apply(routine, qubits)
+    return program.to_circ()
+
+
+def _sample_grover(qpu, routine, target, power, shots) -> int:
+    # Number of shots measuring the target qubit as 1 after a power of the Grover operator
+    job = grover_circuit(routine, target, power).to_job(nbshots=shots, qubits=[target])
+    return int(round(sum(sample.probability for sample in qpu.submit(job) if sample.state.bitstring == '1') * shots))
+
+
+def _next_power(power, upper, interval, min_ratio=2.0) -> Tuple[int, bool]:
+    # Largest power whose scaled interval of the angle lies in a half circle, or the previous one if none grows enough
+    low, high = interval
+    previous = 4 * power + 2
+    scaling = int(1 / (2 * (high - low)))
+    scaling -= (scaling - 2) % 4
+    while scaling >= min_ratio * previous:
+        scaled_low = scaling * low - int(scaling * low)
+        scaled_high = scaling * high - int(scaling * high)
+        if scaled_low <= scaled_high <= 0.5:
+            return (scaling - 2) // 4, True
+        if 0.5 <= scaled_low <= scaled_high:
+            return (scaling - 2) // 4, False
+        scaling -= 4
+    return power, upper
+
+
+def iterative_amplitude_estimation(qpu, routine, target, epsilon=0.01, alpha=0.05, shots=100, min_ratio=2.0) -> Tuple[float, Tuple[float, float], Dict]:
+    """Estimates the probability of measuring a qubit as 1 by iterative amplitude estimation, sampling ever higher powers of the Grover operator.
+
+    Each round samples the power whose angle interval, scaled by it, lies in a single half circle, so the outcome tells the angle apart without ambiguity, and narrows the interval with a Chernoff bound on the rounds of that power. Rounds continue until the interval of the probability is at most twice ``epsilon`` wide, which takes a number of applications of the routine proportional to ``1 / epsilon``, instead of ``1 / epsilon ** 2`` when sampling the routine alone.
+
+    Args:
+        qpu: The QPU sampling the circuits.
+        routine (:obj:`QRoutine`): The routine preparing the state, like that of a knowledge island.
+        target (int): The qubit of the routine whose probability of being measured as 1 is estimated.
+        epsilon (float, optional): The maximum half-width of the interval of the probability.
+        alpha (float, optional): The probability of the interval not containing the probability, one minus its confidence level.
+        shots (int, optional): The number of shots of each round.
+        min_ratio (float, optional): The minimum ratio between the scalings of the angle of consecutive powers.
+
+    Returns:
+        Tuple[float, Tuple[float, float], Dict]: The estimated probability, its interval, and a report with the powers of each round, the shots and the number of applications of the routine or its inverse, under ``'oracle_calls'``.
+    """
+    rounds = int(np.log(min_ratio * np.pi / 8 / epsilon) / np.log(min_ratio)) + 1
+    powers, ones = [], []
+    power, upper = 0, True
+    # Interval of the angle divided by 2 pi, so the probability is its squared sine times 2 pi
+    interval = (0.0, 0.25)
+    while interval[1] - interval[0] > epsilon / np.pi:
+        power, upper = _next_power(power, upper, interval, min_ratio)
+        powers.append(power)
+        ones.append(_sample_grover(qpu, routine, target, power, shots))
+        # Consecutive rounds with the same power are pooled
+        same = 1
+        while same < len(powers) and powers[-1 - same] == power:
+            same += 1
+        estimate = sum(ones[-same:]) / (same * shots)
+        width = np.sqrt(3 * np.log(2 * rounds / alpha) / (same * shots))
+        low, high = max(0.0, estimate - width), min(1.0, estimate + width)
+        if upper:
+            angle_low, angle_high = np.arccos(1 - 2 * low) / 2 / np.pi, np.arccos(1 - 2 * high) / 2 / np.pi
+        else:
+            angle_low, angle_high = 1 - np.arccos(1 - 2 * high) / 2 / np.pi, 1 - np.arccos(1 - 2 * low) / 2 / np.pi
+        # The scaled interval lies in a single half circle, so both bounds share the turns of the lower one
+        scaling = 4 * power + 2
+        turns = int(scaling * interval[0])
+        interval = (max(interval[0], (turns + angle_low) / scaling), min(interval[1], (turns + angle_high) / scaling))
+    bounds = (float(np.sin(2 * np.pi * interval[0]) ** 2), float(np.sin(2 * np.pi * interval[1]) ** 2))
+    return (bounds[0] + bounds[1]) / 2, bounds, {
+        'powers': powers,
+        'shots': shots * len(powers),
+        'oracle_calls': shots * sum(2 * power + 1 for power in powers)
+    }
+
+
+def _log_likelihood(angles, powers, ones, shots) -> np.ndarray:
+    # Log-likelihood of each angle, from the shots measuring the target qubit as 1 after each power
+    total = np.zeros_like(angles)
+    for power, count in zip(powers, ones):
+        probability = np.clip(np.sin((2 * power + 1) * angles) ** 2, 1e-300, 1 - 1e-16)
+        total += count * np.log(probability) + (shots - count) * np.log(1 - probability)
+    return total
+
+
+def maximum_likelihood_amplitude_estimation(qpu, routine, target, epsilon=0.01, alpha=0.05, shots=100, max_power=256) -> Tuple[float, Tuple[float, float], Dict]:
+    """Estimates the probability of measuring a qubit as 1 by maximum likelihood amplitude estimation, sampling the powers 0, 1, 2, 4... of the Grover operator.
+
+    After each power, the angle maximizing the likelihood of every outcome is searched on a grid finer than the period of the highest power, and the interval holds the angles whose likelihood ratio is within the quantile of the confidence level. Powers are added until the interval of the probability is at most twice ``epsilon`` wide, or ``max_power`` is reached.
+
+    Args:
+        qpu: The QPU sampling the circuits.
+        routine (:obj:`QRoutine`): The routine preparing the state, like that of a knowledge island.
+        target (int): The qubit of the routine whose probability of being measured as 1 is estimated.
+        epsilon (float, optional): The maximum half-width of the interval of the probability.
+        alpha (float, optional): The probability of the interval not containing the probability, one minus its confidence level.
+        shots (int, optional): The number of shots of each power.
+        max_power (int, optional): The highest power sampled.
+
+    Returns:
+        Tuple[float, Tuple[float, float], Dict]: The estimated probability, its interval, and a report with the powers sampled, the shots and the number of applications of the routine or its inverse, under ``'oracle_calls'``.
+    """
+    # Squared quantile of the normal distribution, that of the chi-squared distribution with one degree of freedom
+    threshold = NormalDist().inv_cdf(1 - alpha / 2) ** 2
+    powers, ones = [], []
+    power = 0
+    while True:
+        powers.append(power)
+        ones.append(_sample_grover(qpu, routine, target, power, shots))
+        angles = np.linspace(0, np.pi / 2, max(1000, 100 * (2 * power + 1), int(10 / epsilon)) + 1)
+        likelihood = _log_likelihood(angles, powers, ones, shots)
+        best = np.argmax(likelihood)
+        inside = np.sin(angles[2 * (likelihood[best] - likelihood) <= threshold]) ** 2
+        bounds = (float(inside.min()), float(inside.max()))
+        if bounds[1] - bounds[0] <= 2 * epsilon or 2 * power > max_power:
+            break
+        power = 1 if power == 0 else 2 * power
+    return float(np.sin(angles[best]) ** 2), bounds, {
+        'powers': powers,
+        'shots': shots * len(powers),
+        'oracle_calls': shots * sum(2 * power + 1 for power in powers)
+    }
+
+
+class AmplitudeEstimationQPU(QPU):
+    """Implementation of a Quantum Processing Unit (QPU) estimating the precision of each consequent by amplitude estimation on the circuit of its knowledge island.
+
+    For a requested half-width of the probability of each consequent, amplitude estimation applies the circuit a number of times proportional to its inverse, quadratically fewer than the shots :obj:`~neasqc_qrbs.qrbs.MyQlmQPU` would take.
+    """
+
+    METHODS = {
+        'iterative': iterative_amplitude_estimation,
+        'maximum_likelihood': maximum_likelihood_amplitude_estimation
+    }
+
+    @staticmethod
+    def evaluate(qrbs, eval_islands=None, model='cf', qpu=None, method='iterative') -> bool:
+        """Evaluates whether a QRBS can be executed on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be evaluated.
+            eval_islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be evaluated.
+            model (str, optional): The code of the model indicated.
+            qpu (optional): The myQLM QPU sampling the circuits, or the code of its :obj:`~neasqc_qrbs.backends.Backend`. The backend :obj:`~neasqc_qrbs.qrbs.MyQlmQPU.BACKEND` if not specified.
+            method (str, optional): The amplitude estimation method, ``'iterative'`` or ``'maximum_likelihood'``.
+
+        Raises:
+            ValueError: In case the method is not known, a specified knowledge island is not part of the QRBS, or an evaluated knowledge island requires more qubits than supported.
+        """
+        if method not in AmplitudeEstimationQPU.METHODS:
+            raise ValueError('Unknown amplitude estimation method', method)
+        return MyQlmQPU.evaluate(qrbs, eval_islands, model, qpu=qpu)
+
+    @staticmethod
+    def execute(qrbs, islands=None, model='cf', qpu=None, method='iterative', epsilon=0.01, confidence=0.95, shots=100) -> List[Dict]:
+        """Executes the QRBS on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be executed.
+            islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
+            model (str, optional): The code of the model indicated.
+            qpu (optional): The myQLM QPU sampling the circuits, or the code of its :obj:`~neasqc_qrbs.backends.Backend`. The backend :obj:`~neasqc_qrbs.qrbs.MyQlmQPU.BACKEND` if not specified.
+            method (str, optional): The amplitude estimation method, ``'iterative'`` (:obj:`iterative_amplitude_estimation`) or ``'maximum_likelihood'`` (:obj:`maximum_likelihood_amplitude_estimation`).
+            epsilon (float, optional): The maximum half-width of the interval of the probability of each consequent.
+            confidence (float, optional): The confidence level of the intervals.
+            shots (int, optional): The number of shots of each round of amplitude estimation.
+
+        Returns:
+            List[Dict]: The report of each executed knowledge island, with the estimated probability, interval and precision interval of each consequent, indexed by its attribute, and the powers of the Grover operator sampled for it, its shots and its applications of the circuit, under ``'oracle_calls'``.
+        """
+        if islands is None:
+            islands = []
+        # Initiate islands in case of specified evaluation
+        if not islands:
+            islands = qrbs._engine._islands
+        reports = []
+        # If evaluation is successful, continue with execution
+        if AmplitudeEstimationQPU.evaluate(qrbs, islands, model, qpu, method):
+            backend = describe(MyQlmQPU.BACKEND if qpu is None else qpu)
+            linalgqpu = backend.shared() if qpu is None or isinstance(qpu, str) else qpu
+            estimate = AmplitudeEstimationQPU.METHODS[method]
+            for island in islands:
+                # The routine is built before any consequent is updated, so each one is estimated from the same inputs
+                routine, elements = MyQlmQPU.BUILDERS[model].build_island(island)
+                consequents = [rule.right_hand_side for rule in island.rules]
+                report = {'probabilities': {}, 'intervals': {}, 'precisions': {}, 'powers': {}, 'shots': 0, 'oracle_calls': 0}
+                results = []
+                for element, index in elements.items():
+                    if element in consequents:
+                        results.append((element, estimate(linalgqpu, routine, index, epsilon, 1 - confidence, shots)))
+                for element, (probability, (low, high), sampling) in results:
+                    element.precision = 2*np.arcsin(np.sqrt(min(probability, 1.0))) / np.pi
+                    report['probabilities'][element.attribute] = probability
+                    report['intervals'][element.attribute] = (low, high)
+                    report['precisions'][element.attribute] = tuple(2*np.arcsin(np.sqrt(min(bound, 1.0))) / np.pi for bound in (low, high))
+                    report['powers'][element.attribute] = sampling['powers']
+                    report['shots'] += sampling['shots']
+                    report['oracle_calls'] += sampling['oracle_calls']
+                reports.append(report)
+        return reports
@@ -1,7 +1,7 @@
 # -*- coding : utf-8 -*
 
 from abc import ABC, abstractmethod
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 import numpy as np
 from qat.lang.AQASM import QRoutine, CNOT, CCNOT, X, AbstractGate, RY
 
@@ -232,6 +232,7 @@ class KnowledgeIsland(Buildable):
     def __init__(self, rules) -> None:
         super().__init__()
         self.rules = rules
+        self._plan = None
 
     def __eq__(self, other) -> bool:
         return isinstance(other, self.__class__) and self.rules == other.rules
@@ -244,10 +245,135 @@ class KnowledgeIsland(Buildable):
         return routine
 
 
+class IslandPlan:
+    """Class representing the structural plan of a Knowledge Island.
+
+    An IslandPlan is the model-agnostic result of analysing the structure of a knowledge island: the order in which its rules are lowered, which elements get a wire of their own and the blocks applied on those wires. Every Builder instantiates the same plan with its own gate set, so the structural analysis is only done once per island.
+
+    Attributes:
+        rules (List[:obj:`Rule`]): Rules of the knowledge island, in lowering order.
+        nodes (List[:obj:`LeftHandSide`]): Elements which own a wire, in allocation order.
+        steps (List[Tuple[str, object, Tuple[int], int]]): Blocks of the plan, in allocation order. Each step is a tuple ``(kind, element, operands, target)`` where ``kind`` is one of ``'fact'``, ``'consequent'``, ``'operator'`` or ``'implication'`` and ``operands`` and ``target`` are indexes of ``nodes``.
+        order (List[int]): Indexes of ``steps`` in the order their gates are emitted.
+        layers (List[List[int]]): Indexes of ``steps`` grouped in layers that can be applied in parallel, if the plan has been scheduled.
+    """
+
+    def __init__(self, rules) -> None:
+        super().__init__()
+        self.rules = rules
+        self.nodes = []
+        self.steps = []
+        self.order = []
+        self.layers = None
+        self._key = None
+        index = {}
+
+        def new_node(element):
+            self.nodes.append(element)
+            index[element] = len(self.nodes) - 1
+            return index[element]
+
+        def plan_precedent(precedent):
+            if isinstance(precedent, Fact):
+                return
+            if isinstance(precedent, NotOperator):
+                children = [precedent.child]
+            else:  # isinstance(precedent, AndOperator or OrOperator)
+                children = [precedent.left_child, precedent.right_child]
+            for child in children:
+                if child not in index:
+                    plan_precedent(child)
+            operands = tuple(index[child] for child in children)
+            self.steps.append(('operator', precedent, operands, new_node(precedent)))
+
+        consequents = [rule.right_hand_side for rule in rules]
+        for rule in rules:
+            for fact in rule.left_hand_side:
+                if fact not in consequents and fact not in index:
+                    self.steps.append(('fact', fact, (), new_node(fact)))
+        for rule in rules:
+            self.steps.append(('consequent', rule.right_hand_side, (), new_node(rule.right_hand_side)))
+        for rule in rules:
+            plan_precedent(rule.left_hand_side)
+            self.steps.append(('implication', rule, (index[rule.left_hand_side],), index[rule.right_hand_side]))
+        self.order = list(range(len(self.steps)))
+
+    @staticmethod
+    def structure_key(island) -> Tuple:
+        """Computes a key identifying the structure of a knowledge island.
+
+        The key only depends on the identity of the rules and elements of the island, not on their precision or certainty, so it remains valid while the facts of the system are updated.
+
+        Args:
+            island (:obj:`KnowledgeIsland`): The KnowledgeIsland whose key is being computed.
+
+        Returns:
+            Tuple: The structural key of the knowledge island.
+        """
+        def element_key(element):
+            if isinstance(element, NotOperator):
+                return (id(element), element_key(element.child))
+            if isinstance(element, (AndOperator, OrOperator)):
+                return (id(element), element_key(element.left_child), element_key(element.right_child))
+            return id(element)
+
+        return tuple((id(rule), element_key(rule.left_hand_side), id(rule.right_hand_side)) for rule in island.rules)
+
+    @staticmethod
+    def from_island(island) -> 'IslandPlan':
+        """Returns the plan of a knowledge island, reusing the last one computed while its structure is unchanged.
+
+        Args:
+            island (:obj:`KnowledgeIsland`): The KnowledgeIsland whose plan is being computed.
+
+        Returns:
+            :obj:`IslandPlan`: The plan of the knowledge island.
+        """
+        plan = getattr(island, '_plan', None)
+        if plan is not None and plan._key == IslandPlan.structure_key(island):
+            return plan
+        rules = island.rules
+        rules.sort()
+        plan = IslandPlan(rules)
+        plan._key = IslandPlan.structure_key(island)
+        island._plan = plan
+        return plan
+
+    def layout(self, ancillas=None) -> Tuple[List[int], Dict[int, List[int]]]:
+        """Assigns a wire to every node of the plan.
+
+        Args:
+            ancillas (Dict[int, int], optional): Number of ancilla wires required by each implication step, indexed by step.
+
+        Returns:
+            Tuple[List[int], Dict[int, List[int]]]: A tuple containing the wire of each node and the ancilla wires of each implication step.
+        """
+        if ancillas is None:
+            ancillas = {}
+        wires = [None] * len(self.nodes)
+        ancilla_wires = {}
+        width = 0
+        for index, (kind, _, _, target) in enumerate(self.steps):
+            if kind == 'implication':
+                ancilla_wires[index] = list(range(width, width + ancillas.get(index, 0)))
+                width += ancillas.get(index, 0)
+            else:
+                wires[target] = width
+                width += 1
+        return wires, ancilla_wires
+
+
 class Builder(ABC):  # pragma: no cover
     """Interface for building the corresponding quantum routine from a Buildable element.
+
+    Builders only define the gates of each element; the structure of a knowledge island is analysed once by :obj:`IslandPlan` and instantiated by ``build_island``.
+
+    Attributes:
+        ASSOCIATIVE_OPERATORS (Tuple[type]): Operators whose routine is associative and commutative in the model, so chains of them can be regrouped and their operands reordered. Those computing the exact boolean function of their operands, like the conjunction and disjunction of every builder here, are.
     """
 
+    ASSOCIATIVE_OPERATORS = ()
+
     @staticmethod
     @abstractmethod
     def build_fact(fact) -> QRoutine:
@@ -293,7 +419,21 @@ class Builder(ABC):  # pragma: no cover
 
     @staticmethod
     @abstractmethod
-    def build_rule(rule) -> QRoutine:
+    def build_implication(rule) -> QRoutine:
+        """Builds the quantum routine of the implication of a rule.
+
+        The routine acts on the wire of the left hand side first and on the wire of the right hand side last. Any wire in between is an ancilla allocated for the implication.
+
+        Args:
+            rule (:obj:`Rule`): The Rule whose implication is being built. 
+        
+        Returns:
+            :obj:`QRoutine`: The corresponding quantum routine.
+        """
+        pass
+
+    @classmethod
+    def build_rule(cls, rule) -> QRoutine:
         """Builds the quantum routine of a rule.
 
         Args:
@@ -302,26 +442,42 @@ class Builder(ABC):  # pragma: no cover
         Returns:
             :obj:`QRoutine`: The corresponding quantum routine.
         """
-        pass
+        routine, _ = cls.build_island(KnowledgeIsland([rule]))
+        return routine
 
-    @staticmethod
-    @abstractmethod
-    def build_island(island) -> Tuple[QRoutine, Dict[LeftHandSide, int]]:
+    @classmethod
+    def build_island(cls, island, plan=None) -> Tuple[QRoutine, Dict[LeftHandSide, int]]:
         """Builds the quantum routine of a knowledge island.
 
         Args:
             island (:obj:`KnowledgeIsland`): The KnowledgeIsland whose quantum routine is being built. 
+            plan (:obj:`IslandPlan`, optional): The plan to instantiate. The plan of the island is used if not specified.
         
         Returns:
             Tuple[:obj:`QRoutine`, Dict[:obj:`LeftHandSide`, int]]: A tuple containing the corresponding quantum routine and the index of which qubit corresponds to each LeftHandSide element.
         """
-        pass
+        if plan is None:
+            plan = IslandPlan.from_island(island)
+        implications = {index: cls.build_implication(element) for index, (kind, element, _, _) in enumerate(plan.steps) if kind == 'implication'}
+        wires, ancillas = plan.layout({index: implication.arity - 2 for index, implication in implications.items()})
+        routine = QRoutine()
+        routine.new_wires(len(plan.nodes) + sum(len(wires) for wires in ancillas.values()))
+        for index in plan.order:
+            kind, element, operands, target = plan.steps[index]
+            if kind == 'implication':
+                routine.apply(implications[index], wires[operands[0]], *ancillas[index], wires[target])
+            elif kind != 'consequent':
+                routine.apply(element.build(cls), *[wires[operand] for operand in operands], wires[target])
+        elements = {node: wire for node, wire in zip(plan.nodes, wires)}
+        return routine, elements
 
 
 class BuilderImpl(Builder):
     """Implementation of Builder interface.
     """
 
+    ASSOCIATIVE_OPERATORS = (AndOperator, OrOperator)
+
     def _matrix_gen(inaccuracy):
         theta = inaccuracy * np.pi / 2
         return np.array([
@@ -383,76 +539,27 @@ class BuilderImpl(Builder):
         return routine
 
     @staticmethod
-    def build_rule(rule) -> QRoutine:
-        """Builds the quantum routine of a rule.
+    def build_implication(rule) -> QRoutine:
+        """Builds the quantum routine of the implication of a rule.
 
         Args:
-            rule (:obj:`Rule`): The Rule whose quantum routine is being built. 
+            rule (:obj:`Rule`): The Rule whose implication is being built. 
         
         Returns:
             :obj:`QRoutine`: The corresponding quantum routine.
         """
-        routine, _ = BuilderImpl.build_island(KnowledgeIsland([rule]))
-        return routine
-
-    @staticmethod
-    def build_island(island) -> Tuple[QRoutine, Dict[LeftHandSide, int]]:
-        """Builds the quantum routine of a knowledge island.
-
-        Args:
-            island (:obj:`KnowledgeIsland`): The KnowledgeIsland whose quantum routine is being built. 
-        
-        Returns:
-            Tuple[:obj:`QRoutine`, Dict[:obj:`LeftHandSide`, int]]: A tuple containing the corresponding quantum routine and the index of which qubit corresponds to each LeftHandSide element.
-        """
-
-        def build_precedent_routine(precedent, routine, elements):
-            if isinstance(precedent, Fact):
-                return
-            else:
-                qbits = []
-                if isinstance(precedent, NotOperator):
-                    if precedent.child not in elements:
-                        build_precedent_routine(precedent.child, routine, elements)
-                    qbits.extend([elements[precedent.child]])
-                else:  # isinstance(precedent, AndOperator or OrOperator)
-                    if precedent.left_child not in elements:
-                        build_precedent_routine(precedent.left_child, routine, elements)
-                    if precedent.right_child not in elements:
-                        build_precedent_routine(precedent.right_child, routine, elements)
-                    qbits.extend([elements[precedent.left_child], elements[precedent.right_child]])
-                qbits.extend([routine.new_wires(1)])
-                routine.apply(precedent.build(BuilderImpl), qbits)
-                elements[precedent] = routine.max_wire
-
-        def build_implication_routine(rule, routine, elements):
-            routine.new_wires(1)
-            routine.apply(BuilderImpl.M(rule.certainty), routine.max_wire)
-            routine.apply(CCNOT, elements[rule.left_hand_side], routine.max_wire, elements[rule.right_hand_side])
-
-        rules = island.rules
-        rules.sort()
-        elements = {}
         routine = QRoutine()
-        for rule in rules:
-            for fact in rule.left_hand_side:
-                if fact not in [rule.right_hand_side for rule in rules] and fact not in elements.keys():
-                    routine.new_wires(1)
-                    elements[fact] = routine.max_wire
-                    routine.apply(fact.build(BuilderImpl), elements[fact])
-        for rule in rules:
-            routine.new_wires(1)
-            elements[rule.right_hand_side] = routine.max_wire
-        for rule in rules:
-            build_precedent_routine(rule.left_hand_side, routine, elements)
-            build_implication_routine(rule, routine, elements)
-        return routine, elements
+        routine.apply(BuilderImpl.M(rule.certainty), 1)
+        routine.apply(CCNOT, 0, 1, 2)
+        return routine
 
 
 class BuilderFuzzy(Builder):
     """Implementation of Builder interface for the fuzzy logic model.
     """
 
+    ASSOCIATIVE_OPERATORS = (AndOperator, OrOperator)
+
     @staticmethod
     def build_fact(fact) -> QRoutine:
         """Builds the quantum routine of a fact.
@@ -508,76 +615,27 @@ class BuilderFuzzy(Builder):
         return routine
 
     @staticmethod
-    def build_rule(rule) -> QRoutine:
-        """Builds the quantum routine of a rule.
+    def build_implication(rule) -> QRoutine:
+        """Builds the quantum routine of the implication of a rule.
 
         Args:
-            rule (:obj:`Rule`): The Rule whose quantum routine is being built. 
+            rule (:obj:`Rule`): The Rule whose implication is being built. 
         
         Returns:
             :obj:`QRoutine`: The corresponding quantum routine.
         """
-        routine, _ = BuilderFuzzy.build_island(KnowledgeIsland([rule]))
-        return routine
-
-    @staticmethod
-    def build_island(island) -> Tuple[QRoutine, Dict[LeftHandSide, int]]:
-        """Builds the quantum routine of a knowledge island.
-
-        Args:
-            island (:obj:`KnowledgeIsland`): The KnowledgeIsland whose quantum routine is being built. 
-        
-        Returns:
-            Tuple[:obj:`QRoutine`, Dict[:obj:`LeftHandSide`, int]]: A tuple containing the corresponding quantum routine and the index of which qubit corresponds to each LeftHandSide element.
-        """
-
-        def build_precedent_routine(precedent, routine, elements):
-            if isinstance(precedent, Fact):
-                return
-            else:
-                qbits = []
-                if isinstance(precedent, NotOperator):
-                    if precedent.child not in elements:
-                        build_precedent_routine(precedent.child, routine, elements)
-                    qbits.extend([elements[precedent.child]])
-                else:  # isinstance(precedent, AndOperator or OrOperator)
-                    if precedent.left_child not in elements:
-                        build_precedent_routine(precedent.left_child, routine, elements)
-                    if precedent.right_child not in elements:
-                        build_precedent_routine(precedent.right_child, routine, elements)
-                    qbits.extend([elements[precedent.left_child], elements[precedent.right_child]])
-                qbits.extend([routine.new_wires(1)])
-                routine.apply(precedent.build(BuilderFuzzy), qbits)
-                elements[precedent] = routine.max_wire
-
-        def build_implication_routine(rule, routine, elements):
-            routine.new_wires(1)
-            routine.apply(RY(rule.certainty * np.pi), routine.max_wire)
-            routine.apply(CCNOT, elements[rule.left_hand_side], routine.max_wire, elements[rule.right_hand_side])
-
-        rules = island.rules
-        rules.sort()
-        elements = {}
         routine = QRoutine()
-        for rule in rules:
-            for fact in rule.left_hand_side:
-                if fact not in [rule.right_hand_side for rule in rules] and fact not in elements.keys():
-                    routine.new_wires(1)
-                    elements[fact] = routine.max_wire
-                    routine.apply(fact.build(BuilderFuzzy), elements[fact])
-        for rule in rules:
-            routine.new_wires(1)
-            elements[rule.right_hand_side] = routine.max_wire
-        for rule in rules:
-            build_precedent_routine(rule.left_hand_side, routine, elements)
-            build_implication_routine(rule, routine, elements)
-        return routine, elements
+        routine.apply(RY(rule.certainty * np.pi), 1)
+        routine.apply(CCNOT, 0, 1, 2)
+        return routine
 
 
 class BuilderBayes(Builder):
     """Implementation of Builder interface for the bayesian model.
     """
 
+    ASSOCIATIVE_OPERATORS = (AndOperator, OrOperator)
+
     def _matrix_gen(inaccuracy):
         theta = (inaccuracy * np.pi) / 2
         return np.array([
@@ -645,66 +703,16 @@ class BuilderBayes(Builder):
         return routine
 
     @staticmethod
-    def build_rule(rule) -> QRoutine:
-        """Builds the quantum routine of a rule.
+    def build_implication(rule) -> QRoutine:
+        """Builds the quantum routine of the implication of a rule.
 
         Args:
-            rule (:obj:`Rule`): The Rule whose quantum routine is being built. 
+            rule (:obj:`Rule`): The Rule whose implication is being built. 
         
         Returns:
             :obj:`QRoutine`: The corresponding quantum routine.
         """
-        routine, _ = BuilderBayes.build_island(KnowledgeIsland([rule]))
-        return routine
-
-    @staticmethod
-    def build_island(island) -> Tuple[QRoutine, Dict[LeftHandSide, int]]:
-        """Builds the quantum routine of a knowledge island.
-
-        Args:
-            island (:obj:`KnowledgeIsland`): The KnowledgeIsland whose quantum routine is being built. 
-        
-        Returns:
-            Tuple[:obj:`QRoutine`, Dict[:obj:`LeftHandSide`, int]]: A tuple containing the corresponding quantum routine and the index of which qubit corresponds to each LeftHandSide element.
-        """
-
-        def build_precedent_routine(precedent, routine, elements):
-            if isinstance(precedent, Fact):
-                return
-            else:
-                qbits = []
-                if isinstance(precedent, NotOperator):
-                    if precedent.child not in elements:
-                        build_precedent_routine(precedent.child, routine, elements)
-                    qbits.extend([elements[precedent.child]])
-                else:  # isinstance(precedent, AndOperator or OrOperator)
-                    if precedent.left_child not in elements:
-                        build_precedent_routine(precedent.left_child, routine, elements)
-                    if precedent.right_child not in elements:
-                        build_precedent_routine(precedent.right_child, routine, elements)
-                    qbits.extend([elements[precedent.left_child], elements[precedent.right_child]])
-                qbits.extend([routine.new_wires(1)])
-                routine.apply(precedent.build(BuilderBayes), qbits)
-                elements[precedent] = routine.max_wire
-
-        def build_implication_routine(rule, routine, elements):
-            #routine.apply(BuilderBayes.CRY(rule.certainty), elements[rule.left_hand_side], elements[rule.right_hand_side])
-            routine.apply(RY(np.pi * rule.certainty).ctrl(1), elements[rule.left_hand_side], elements[rule.right_hand_side])
-
-        rules = island.rules
-        rules.sort()
-        elements = {}
         routine = QRoutine()
-        for rule in rules:
-            for fact in rule.left_hand_side:
-                if fact not in [rule.right_hand_side for rule in rules] and fact not in elements.keys():
-                    routine.new_wires(1)
-                    elements[fact] = routine.max_wire
-                    routine.apply(fact.build(BuilderBayes), elements[fact])
-        for rule in rules:
-            routine.new_wires(1)
-            elements[rule.right_hand_side] = routine.max_wire
-        for rule in rules:
-            build_precedent_routine(rule.left_hand_side, routine, elements)
-            build_implication_routine(rule, routine, elements)
-        return routine, elements
+        #routine.apply(BuilderBayes.CRY(rule.certainty), 0, 1)
+        routine.apply(RY(np.pi * rule.certainty).ctrl(1), 0, 1)
+        return routine
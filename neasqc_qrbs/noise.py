@@ -0,0 +1,623 @@
+# -*- coding : utf-8 -*
+
+import functools
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+from qat.core import Result
+from qat.core.qpu import CompositeQPU, QPUHandler
+
+from .compiler import PLUGIN_CACHE, compile_island
+from .knowledge_rep import Fact, IslandPlan
+from .qrbs import MyQlmQPU
+
+
+class NoiseModel:
+    """Class representing the noise of a hardware, read from the same configuration as the noisy hardware models of myQLM.
+
+    Gates are followed by a depolarizing channel, idle qubits decay by amplitude damping and pure dephasing and each measured qubit is flipped with the readout error.
+
+    Attributes:
+        error_gate_1qb (float): Error rate of 1-qubit gates, as measured by randomized benchmarking.
+        error_gate_2qbs (float): Error rate of gates of 2 or more qubits, as measured by randomized benchmarking.
+        t_gate_1qb (float): Duration of 1-qubit gates, in nanoseconds.
+        t_gate_2qbs (float): Duration of gates of 2 or more qubits, in nanoseconds.
+        t_readout (float): Duration of the measurement, in nanoseconds.
+        t1 (float): Time T1 of the qubits, in nanoseconds, or None if idle qubits do not decay.
+        t2 (float): Time T2 of the qubits, in nanoseconds, or None if idle qubits do not dephase.
+        readout_error (float): Probability of measuring each qubit flipped.
+    """
+
+    def __init__(self, error_gate_1qb=0.0, error_gate_2qbs=0.0, t_gate_1qb=35, t_gate_2qbs=660, t_readout=4000, t1=None, t2=None, readout_error=0.0) -> None:
+        super().__init__()
+        self.error_gate_1qb = error_gate_1qb
+        self.error_gate_2qbs = error_gate_2qbs
+        self.t_gate_1qb = t_gate_1qb
+        self.t_gate_2qbs = t_gate_2qbs
+        self.t_readout = t_readout
+        self.t1 = t1
+        self.t2 = t2
+        self.readout_error = readout_error
+
+    @staticmethod
+    def from_config(hw_cfg) -> 'NoiseModel':
+        """Creates the noise model of a hardware configuration, as used by ``noisy_hw_model``.
+
+        Missing or null values take the defaults of ``noisy_hw_model``, and inactive channels are not modelled.
+
+        Args:
+            hw_cfg (Dict): The hardware configuration.
+
+        Returns:
+            :obj:`NoiseModel`: The noise model of the hardware.
+        """
+        def value(config, key, default):
+            return default if config.get(key) is None else config[key]
+
+        depol_channel = hw_cfg.get('depol_channel') or {}
+        idle = hw_cfg.get('idle') or {}
+        meas = hw_cfg.get('meas') or {}
+        model = NoiseModel(t_gate_1qb=value(hw_cfg, 't_gate_1qb', 35), t_gate_2qbs=value(hw_cfg, 't_gate_2qbs', 660), t_readout=value(hw_cfg, 't_readout', 4000))
+        if depol_channel.get('active'):
+            model.error_gate_1qb = value(depol_channel, 'error_gate_1qb', 2.27e-4)
+            model.error_gate_2qbs = value(depol_channel, 'error_gate_2qbs', 7.741e-3)
+        if idle.get('amplitude_damping'):
+            model.t1 = value(idle, 't1', 231.94e3)
+            if idle.get('dephasing_channel'):
+                model.t2 = value(idle, 't2', 132.71e3)
+        if meas.get('active'):
+            model.readout_error = value(meas, 'readout_error', 0.0)
+        return model
+
+    def duration(self, arity) -> float:
+        """Duration of a gate.
+
+        Args:
+            arity (int): The number of qubits of the gate.
+
+        Returns:
+            float: The duration of the gate, in nanoseconds.
+        """
+        return self.t_gate_1qb if arity == 1 else self.t_gate_2qbs
+
+    def depolarization(self, arity) -> float:
+        """Fraction of the state of the qubits of a gate replaced by the maximally mixed state after it.
+
+        Args:
+            arity (int): The number of qubits of the gate.
+
+        Returns:
+            float: The depolarizing fraction, from the randomized benchmarking error rate of the gate.
+        """
+        dimension = 2 ** arity
+        error = self.error_gate_1qb if arity == 1 else self.error_gate_2qbs
+        return min(error * dimension / (dimension - 1), 1.0)
+
+    def decays(self) -> bool:
+        """Whether idle qubits decay, by amplitude damping or pure dephasing.
+
+        Returns:
+            bool: True if either time T1 or T2 is set.
+        """
+        return self.t1 is not None or self.t2 is not None
+
+    def idle_decay(self, time) -> Tuple[float, float]:
+        """Decay of a qubit idle for some time.
+
+        Args:
+            time (float): The time the qubit is idle, in nanoseconds.
+
+        Returns:
+            Tuple[float, float]: A tuple containing the probability of the qubit decaying from 1 to 0 by amplitude damping, and the factor of its coherences kept by pure dephasing.
+        """
+        damping = 0.0 if self.t1 is None else 1.0 - np.exp(-time / self.t1)
+        coherence = 1.0
+        if self.t2 is not None:
+            # Pure dephasing time, without the dephasing due to amplitude damping, if any
+            coherence = np.exp(-time * (1.0 / self.t2 - (0.0 if self.t1 is None else 1.0 / (2 * self.t1))))
+        return damping, coherence
+
+    def idle_kraus(self, time) -> List[np.ndarray]:
+        """Kraus operators of the decay of a qubit idle for some time.
+
+        Args:
+            time (float): The time the qubit is idle, in nanoseconds.
+
+        Returns:
+            List[np.ndarray]: The Kraus operators keeping the qubit, dephasing it and decaying it from 1 to 0.
+        """
+        damping, coherence = self.idle_decay(time)
+        keep = np.diag([1.0, np.sqrt(1.0 - damping)])
+        return [np.sqrt((1.0 + coherence) / 2) * keep, np.sqrt((1.0 - coherence) / 2) * np.diag([1.0, -1.0]) @ keep, np.array([[0.0, np.sqrt(damping)], [0.0, 0.0]])]
+
+    def readout_matrix(self) -> np.ndarray:
+        """Probability of measuring each outcome of a qubit from each of its states.
+
+        Returns:
+            np.ndarray: The matrix of the probability of measuring the row from the column.
+        """
+        return np.array([[1.0 - self.readout_error, self.readout_error], [self.readout_error, 1.0 - self.readout_error]])
+
+
+def gate_matrix(circuit, op) -> np.ndarray:
+    """Gets the matrix of a gate of a circuit.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit of the gate.
+        op (:obj:`Op`): The operation applying the gate.
+
+    Returns:
+        np.ndarray: The matrix of the gate.
+
+    Raises:
+        ValueError: In case the operation is not a gate or the matrix of the gate is not known.
+    """
+    gate = circuit.gateDic.get(op.gate) if op.type == 0 else None
+    if gate is None or gate.matrix is None:
+        raise ValueError('Operation cannot be simulated', op)
+    return np.array([number.re + 1j * number.im for number in gate.matrix.data]).reshape(gate.matrix.nRows, gate.matrix.nCols)
+
+
+def superoperator(kraus) -> np.ndarray:
+    """Computes the superoperator of a channel, acting on the pairs of row and column indices of a density matrix.
+
+    Args:
+        kraus (List[np.ndarray]): The Kraus operators of the channel.
+
+    Returns:
+        np.ndarray: The superoperator of the channel.
+    """
+    return sum(np.kron(operator, operator.conj()) for operator in kraus)
+
+
+def _decay(damping, coherence) -> np.ndarray:
+    # Superoperator of the amplitude damping and pure dephasing of a qubit
+    channel = np.diag([1.0, np.sqrt(1.0 - damping) * coherence, np.sqrt(1.0 - damping) * coherence, 1.0 - damping])
+    channel[0, 3] = damping
+    return channel
+
+
+def _permute(channel, arity) -> np.ndarray:
+    # Reorders a tensor product of single qubit superoperators, indexed by the (row, column) of each qubit, into (rows, columns)
+    order = [2 * qbit for qbit in range(arity)] + [2 * qbit + 1 for qbit in range(arity)]
+    order = order + [2 * arity + axis for axis in order]
+    return channel.reshape([2] * 4 * arity).transpose(order).reshape(4 ** arity, 4 ** arity)
+
+
+def gate_channel(matrix, noise, idle) -> np.ndarray:
+    """Computes the superoperator of a noisy gate: the decay of its qubits while idle before it, the gate and its depolarizing channel.
+
+    Args:
+        matrix (np.ndarray): The matrix of the gate.
+        noise (:obj:`NoiseModel`): The noise model of the hardware.
+        idle (List[float]): The time each qubit of the gate has been idle before it, in nanoseconds.
+
+    Returns:
+        np.ndarray: The superoperator of the noisy gate.
+    """
+    arity = len(idle)
+    dimension = 2 ** arity
+    channel = superoperator([matrix])
+    if noise.decays():
+        channel = channel @ _permute(functools.reduce(np.kron, [_decay(*noise.idle_decay(time)) for time in idle]), arity)
+    fraction = noise.depolarization(arity)
+    if fraction > 0.0:
+        # Replaces a fraction of the state of the qubits by the identity times its trace
+        identity = np.eye(dimension).reshape(-1)
+        channel = (1.0 - fraction) * channel + fraction / dimension * np.outer(identity, identity) @ channel
+    return channel
+
+
+def _blocks(rho, axes) -> Tuple[np.ndarray, List[int], List[Tuple]]:
+    # View of a tensor merging consecutive axes not given, with the position of the given axes in it and the index of its block for each of their values, in the order of their bitstrings
+    shape, positions = [], {}
+    for axis in range(rho.ndim):
+        if axis in axes:
+            positions[axis] = len(shape)
+            shape.append(2)
+        elif shape and len(shape) - 1 not in positions.values():
+            shape[-1] *= 2
+        else:
+            shape.append(2)
+    blocks = []
+    for bits in itertools.product((0, 1), repeat=len(axes)):
+        index = [slice(None)] * len(shape)
+        for axis, bit in zip(axes, bits):
+            index[positions[axis]] = slice(bit, bit + 1)
+        blocks.append(tuple(index))
+    return rho.reshape(shape), [positions[axis] for axis in axes], blocks
+
+
+def apply_channel(rho, channel, qbits, out=None, scratch=None) -> np.ndarray:
+    """Applies a channel to some qubits of a density matrix.
+
+    Sparse superoperators, like those of permutation gates, update the density matrix by blocks, one per value of the rows and columns of the qubits, skipping their zeros. Dense superoperators are contracted with the density matrix in a single product.
+
+    Args:
+        rho (np.ndarray): The density matrix, as a tensor with an axis for the row of each qubit followed by an axis for the column of each qubit.
+        channel (np.ndarray): The superoperator of the channel.
+        qbits (List[int]): The qubits the channel is applied to.
+        out (np.ndarray, optional): Array of the shape of the density matrix where the result is stored, other than the density matrix.
+        scratch (np.ndarray, optional): Flat array of at least a quarter of the size of the density matrix, used for intermediate products.
+
+    Returns:
+        np.ndarray: The density matrix after the channel.
+    """
+    nbqbits = rho.ndim // 2
+    axes = list(qbits) + [nbqbits + qbit for qbit in qbits]
+    view, positions, blocks = _blocks(rho, axes)
+    result = (np.empty_like(rho) if out is None else out).reshape(view.shape)
+    nonzero = np.abs(channel) > 1e-15
+    if nonzero.sum() >= 3 * len(channel):
+        product = np.tensordot(channel.reshape([2] * 2 * len(axes)), view, axes=(list(range(len(axes), 2 * len(axes))), positions))
+        np.copyto(result, np.moveaxis(product, list(range(len(axes))), positions))
+        return result.reshape(rho.shape)
+    if scratch is None:
+        scratch = np.empty(rho.size // 4, dtype=rho.dtype)
+    product = scratch[:view[blocks[0]].size].reshape(view[blocks[0]].shape)
+    for row, target in enumerate(blocks):
+        terms = np.flatnonzero(nonzero[row])
+        if not len(terms):
+            result[target] = 0.0
+        for number, column in enumerate(terms):
+            if number == 0:
+                np.multiply(view[blocks[column]], channel[row, column], out=result[target])
+            elif channel[row, column] == 1.0:
+                result[target] += view[blocks[column]]
+            else:
+                np.multiply(view[blocks[column]], channel[row, column], out=product)
+                result[target] += product
+    return result.reshape(rho.shape)
+
+
+def _schedule(circuit, noise) -> List[Tuple[Tuple[int], np.ndarray, List[float]]]:
+    # Gates scheduled as soon as their qubits are available, with the time each of their qubits has been idle before them, followed by the decay of the qubits idle until the end of the circuit, without a gate
+    steps = []
+    clock = [0.0] * circuit.nbqbits
+    for op in circuit.ops:
+        matrix = gate_matrix(circuit, op)
+        qbits = tuple(op.qbits)
+        start = max(clock[qbit] for qbit in qbits)
+        steps.append((qbits, matrix, [start - clock[qbit] for qbit in qbits]))
+        for qbit in qbits:
+            clock[qbit] = start + noise.duration(len(qbits))
+    if noise.decays():
+        for qbit in range(circuit.nbqbits):
+            if clock[qbit] < max(clock):
+                steps.append(((qbit,), None, [max(clock) - clock[qbit]]))
+    return steps
+
+
+def noisy_channels(circuit, noise) -> List[Tuple[Tuple[int], np.ndarray]]:
+    """Converts a circuit into the noisy channels applied to its qubits.
+
+    Gates are scheduled as soon as their qubits are available, and a qubit decays while it waits for its next gate or the end of the circuit. Consecutive channels on the same qubits are fused into a single channel.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit being converted.
+        noise (:obj:`NoiseModel`): The noise model of the hardware.
+
+    Returns:
+        List[Tuple[Tuple[int], np.ndarray]]: The qubits and superoperator of each channel, in order.
+
+    Raises:
+        ValueError: In case an operation of the circuit cannot be simulated.
+    """
+    channels, last = [], {}
+
+    def append(qbits, channel):
+        # Channels on other qubits commute, so the channel is fused with the last one on its qubits if they are the same
+        previous = {last.get(qbit) for qbit in qbits}
+        if len(previous) == 1 and None not in previous and channels[last[qbits[0]]][0] == qbits:
+            channels[last[qbits[0]]][1] = channel @ channels[last[qbits[0]]][1]
+        else:
+            channels.append([qbits, channel])
+            for qbit in qbits:
+                last[qbit] = len(channels) - 1
+
+    for qbits, matrix, idle in _schedule(circuit, noise):
+        append(qbits, _decay(*noise.idle_decay(idle[0])) if matrix is None else gate_channel(matrix, noise, idle))
+    return [(qbits, channel) for qbits, channel in channels]
+
+
+def _measure(diagonal, qubits, noise) -> np.ndarray:
+    # Probability of each outcome of measuring some qubits, from the probability of each state of every qubit, including the readout error
+    measured = diagonal.sum(axis=tuple(qbit for qbit in range(diagonal.ndim) if qbit not in qubits))
+    # Remaining axes follow the order of the qubits, so they are permuted into the order requested
+    measured = np.transpose(measured, np.argsort(np.argsort(qubits))) if qubits else measured
+    if noise.readout_error > 0.0:
+        for axis in range(len(qubits)):
+            measured = np.moveaxis(np.tensordot(noise.readout_matrix(), measured, axes=([1], [axis])), 0, axis)
+    return np.clip(measured.reshape(-1), 0.0, None)
+
+
+def propagate_noise(circuit, noise, qubits=None) -> np.ndarray:
+    """Predicts the probability of each outcome of measuring some qubits at the end of a noisy circuit, propagating the noise through its classical logic.
+
+    The circuits of knowledge islands prepare their qubits and then apply reversible classical logic, so the probability of each state of the qubits is propagated by the probability each gate takes a state to another, the squared modulus of its matrix. Depolarizing channels randomize the bits of their qubits, amplitude damping flips them from 1 to 0 and the readout error flips the measured ones, so every channel of a :obj:`NoiseModel` is propagated exactly. Only the interference between states is neglected, which only matters for gates creating superpositions on qubits already in one. Its memory grows as 2 to the number of qubits, and its error can be measured with :obj:`analytic_error_report`.
+
+    Args:
+        circuit (:obj:`Circuit`): The circuit being propagated.
+        noise (:obj:`NoiseModel`): The noise model of the hardware.
+        qubits (List[int], optional): The qubits being measured, every qubit if not specified.
+
+    Returns:
+        np.ndarray: The probability of each outcome, indexed by the integer of its bitstring.
+
+    Raises:
+        ValueError: In case an operation of the circuit cannot be simulated.
+    """
+    if qubits is None:
+        qubits = list(range(circuit.nbqbits))
+    nbqbits = circuit.nbqbits
+    diagonal = np.zeros([2] * nbqbits)
+    diagonal[(0,) * nbqbits] = 1.0
+    for qbits, matrix, idle in _schedule(circuit, noise):
+        if noise.decays():
+            for qbit, time in zip(qbits, idle):
+                damping = noise.idle_decay(time)[0]
+                if damping > 0.0:
+                    decayed = np.moveaxis(diagonal, qbit, 0)
+                    decayed[0] += damping * decayed[1]
+                    decayed[1] *= 1.0 - damping
+        if matrix is not None:
+            arity = len(qbits)
+            transition = (np.abs(matrix) ** 2).reshape([2] * 2 * arity)
+            diagonal = np.moveaxis(np.tensordot(transition, diagonal, axes=(list(range(arity, 2 * arity)), list(qbits))), list(range(arity)), list(qbits))
+            fraction = noise.depolarization(arity)
+            if fraction > 0.0:
+                diagonal = (1.0 - fraction) * diagonal + fraction / 2 ** arity * diagonal.sum(axis=tuple(qbits), keepdims=True)
+    return _measure(diagonal, qubits, noise)
+
+
+PAULIS = [np.eye(2), np.array([[0.0, 1.0], [1.0, 0.0]]), np.array([[0.0, -1j], [1j, 0.0]]), np.diag([1.0, -1.0])]
+
+
+def _apply_matrix(states, matrix, qbits) -> np.ndarray:
+    # Applies a matrix to some qubits of a batch of states, with an axis for the batch followed by an axis per qubit
+    arity = len(qbits)
+    axes = [qbit + 1 for qbit in qbits]
+    product = np.tensordot(matrix.reshape([2] * 2 * arity), states, axes=(list(range(arity, 2 * arity)), axes))
+    return np.moveaxis(product, list(range(arity)), axes)
+
+
+def _apply_kraus(states, kraus, qbits, rng) -> np.ndarray:
+    # Applies to each state of a batch one of the Kraus operators of a channel, drawn with the probability it has in that state, and normalizes it
+    branches = [_apply_matrix(states, operator, qbits) for operator in kraus]
+    weights = np.array([np.sum(np.abs(branch.reshape(len(states), -1)) ** 2, axis=1) for branch in branches])
+    cumulative = np.cumsum(weights, axis=0)
+    drawn = np.minimum(np.sum(cumulative < rng.random(len(states)) * cumulative[-1], axis=0), len(kraus) - 1)
+    result = np.empty_like(states)
+    for number, branch in enumerate(branches):
+        chosen = drawn == number
+        if chosen.any():
+            result[chosen] = branch[chosen] / np.sqrt(weights[number, chosen]).reshape([-1] + [1] * (states.ndim - 1))
+    return result
+
+
+def _apply_paulis(states, fraction, qbits, rng) -> np.ndarray:
+    # Depolarizes each state of a batch with some probability, applying a product of Pauli matrices drawn uniformly, identity included
+    arity = len(qbits)
+    drawn = np.where(rng.random(len(states)) < fraction, rng.integers(4 ** arity, size=len(states)), 0)
+    for number in np.unique(drawn[drawn > 0]):
+        digits = [number // 4 ** (arity - 1 - position) % 4 for position in range(arity)]
+        chosen = drawn == number
+        states[chosen] = _apply_matrix(states[chosen], functools.reduce(np.kron, [PAULIS[digit] for digit in digits]), qbits)
+    return states
+
+
+def _trajectories(steps, nbqbits, noise, samples, seed, chunk) -> np.ndarray:
+    # Sum of the probability of each state of the qubits over a number of trajectories, propagated in batches of a chunk of states
+    rng = np.random.default_rng(seed)
+    total = np.zeros(2 ** nbqbits)
+    for start in range(0, samples, chunk):
+        size = min(chunk, samples - start)
+        states = np.zeros([size] + [2] * nbqbits, dtype=complex)
+        states[(slice(None),) + (0,) * nbqbits] = 1.0
+        for qbits, matrix, idle in steps:
+            if noise.decays():
+                for qbit, time in zip(qbits, idle):
+                    if time > 0.0:
+                        states = _apply_kraus(states, noise.idle_kraus(time), [qbit], rng)
+            if matrix is not None:
+                states = _apply_matrix(states, matrix, qbits)
+                fraction = noise.depolarization(len(qbits))
+                if fraction > 0.0:
+                    states = _apply_paulis(states, fraction, qbits, rng)
+        total += np.sum(np.abs(states.reshape(size, -1)) ** 2, axis=0)
+    return total
+
+
+class DensityMatrixSimulator(QPUHandler):
+    """Implementation of a myQLM QPU simulating the density matrix of a circuit under a :obj:`NoiseModel`.
+
+    Its memory grows as 16 to the number of qubits, so it is meant for circuits up to about 12 qubits. It can be composed with plugins, like any other myQLM QPU.
+
+    Attributes:
+        noise (:obj:`NoiseModel`): The noise model of the simulated hardware.
+        seed (int): The seed of the random number generator sampling the shots, if any.
+    """
+
+    def __init__(self, noise=None, seed=None) -> None:
+        super().__init__()
+        self.noise = NoiseModel() if noise is None else noise
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+
+    def probabilities(self, circuit, qubits=None) -> np.ndarray:
+        """Computes the probability of each outcome of measuring some qubits at the end of a circuit, including the readout error.
+
+        Args:
+            circuit (:obj:`Circuit`): The circuit being simulated.
+            qubits (List[int], optional): The qubits being measured, every qubit if not specified.
+
+        Returns:
+            np.ndarray: The probability of each outcome, indexed by the integer of its bitstring.
+
+        Raises:
+            ValueError: In case an operation of the circuit cannot be simulated.
+        """
+        if qubits is None:
+            qubits = list(range(circuit.nbqbits))
+        return _measure(self._diagonal(circuit), qubits, self.noise)
+
+    def _diagonal(self, circuit) -> np.ndarray:
+        # Probability of each state of the qubits at the end of the circuit, as a tensor with an axis per qubit
+        nbqbits = circuit.nbqbits
+        rho = np.zeros([2] * (2 * nbqbits), dtype=complex)
+        rho[(0,) * (2 * nbqbits)] = 1.0
+        # Every channel writes into the other buffer, so no memory is allocated while simulating
+        buffer = np.empty_like(rho)
+        scratch = np.empty(rho.size // 4, dtype=complex)
+        for qbits, channel in noisy_channels(circuit, self.noise):
+            rho, buffer = apply_channel(rho, channel, qbits, buffer, scratch), rho
+        return np.real(np.einsum(rho.reshape(2 ** nbqbits, 2 ** nbqbits), [0, 0], [0])).reshape([2] * nbqbits)
+
+    def submit_job(self, job) -> Result:
+        """Executes a job, giving the exact probabilities if it has no shots and sampling them otherwise.
+
+        Args:
+            job (:obj:`Job`): The job being executed.
+
+        Returns:
+            :obj:`Result`: The result of the job.
+        """
+        probabilities = self.probabilities(job.circuit, list(job.qubits))
+        result = Result(nbqbits=len(job.qubits))
+        if job.nbshots:
+            counts = self._rng.multinomial(job.nbshots, probabilities / probabilities.sum())
+            for state in np.flatnonzero(counts):
+                result.add_sample(int(state), probability=counts[state] / job.nbshots)
+        else:
+            for state in np.flatnonzero(probabilities > 1e-12):
+                result.add_sample(int(state), probability=float(probabilities[state]))
+        return result
+
+
+class TrajectorySimulator(DensityMatrixSimulator):
+    """Implementation of a myQLM QPU simulating a circuit under a :obj:`NoiseModel` by stochastic trajectories of its state vector.
+
+    Each trajectory draws a Kraus operator of every noisy channel with the probability it has in its state, and the probabilities of the outcomes are averaged over the trajectories. Trajectories are split among processes, each one drawing them from an independent stream of random numbers, so its time decreases with the number of cores. Its memory grows as 2 to the number of qubits times the number of trajectories of a chunk.
+
+    Attributes:
+        noise (:obj:`NoiseModel`): The noise model of the simulated hardware.
+        n_samples (int): The number of trajectories of each circuit.
+        workers (int): The number of processes drawing trajectories.
+        seed (int): The seed of the random number generators, if any.
+        chunk (int): The maximum number of trajectories propagated at once by each process.
+    """
+
+    def __init__(self, noise=None, n_samples=1000, workers=1, seed=None, chunk=64) -> None:
+        super().__init__(noise, seed)
+        self.n_samples = n_samples
+        self.workers = workers
+        self.chunk = chunk
+        self._seeds = np.random.SeedSequence(seed)
+
+    def _diagonal(self, circuit) -> np.ndarray:
+        steps = _schedule(circuit, self.noise)
+        # Every circuit draws its trajectories from new streams, split from the seed of the QPU
+        seeds = self._seeds.spawn(self.workers)
+        shares = [self.n_samples // self.workers + (1 if worker < self.n_samples % self.workers else 0) for worker in range(self.workers)]
+        if self.workers == 1:
+            total = _trajectories(steps, circuit.nbqbits, self.noise, shares[0], seeds[0], self.chunk)
+        else:
+            with ProcessPoolExecutor(self.workers) as executor:
+                total = sum(executor.map(_trajectories, [steps] * self.workers, [circuit.nbqbits] * self.workers, [self.noise] * self.workers, shares, seeds, [self.chunk] * self.workers))
+        return (total / self.n_samples).reshape([2] * circuit.nbqbits)
+
+
+def noise_sweep(qrbs, noises, islands=None, model='cf', passes=None, qpu=None, shots=None, analytic=False, seed=None) -> List[Dict]:
+    """Executes a QRBS under each noise model of a sweep, compiling each circuit once.
+
+    A knowledge island is compiled, and transpiled by the plugins of the QPU, once for each distinct precision of its facts, so knowledge islands not fed by other ones are compiled once for the whole sweep. Every noise model is simulated by the same simulator, or predicted by :obj:`propagate_noise` when analytic, and the precisions of the facts are restored after the sweep.
+
+    Args:
+        qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS being executed.
+        noises (List[:obj:`NoiseModel`]): The noise models of the sweep.
+        islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
+        model (str, optional): The code of the model indicated.
+        passes (List[str], optional): The codes of the compilation passes to apply, as defined in :obj:`~neasqc_qrbs.compiler`.
+        qpu (optional): The :obj:`DensityMatrixSimulator` or :obj:`TrajectorySimulator` simulating the circuits, possibly composed with plugins. A new :obj:`DensityMatrixSimulator` if not specified. Not used when analytic.
+        shots (int, optional): The number of shots sampled from each circuit. The exact probabilities if not specified.
+        analytic (bool, optional): Whether the noise is propagated through the classical logic of the circuits before any plugin, instead of simulated.
+        seed (int, optional): The seed of the random number generator sampling the shots when analytic. The simulator samples them with its own generator otherwise.
+
+    Returns:
+        List[Dict]: A row for each noise model and consequent, with the index of the noise model under ``'point'``, its attributes, the index of the knowledge island under ``'island'``, the attribute of the consequent under ``'fact'`` and its precision under ``'precision'``.
+
+    Raises:
+        ValueError: In case the QPU does not simulate a noise model.
+    """
+    if islands is None:
+        islands = []
+    if not islands:
+        islands = qrbs._engine._islands
+    if analytic:
+        qpu = None
+    elif qpu is None:
+        qpu = DensityMatrixSimulator()
+    plugin, simulator = (qpu.plugin, qpu.qpu) if isinstance(qpu, CompositeQPU) else (None, qpu)
+    if not analytic and not isinstance(simulator, DensityMatrixSimulator):
+        raise ValueError('The QPU does not simulate a noise model', qpu)
+    rng = np.random.default_rng(seed) if analytic else simulator._rng
+    builder = MyQlmQPU.BUILDERS[model]
+    inputs = [[node for node in IslandPlan.from_island(island).nodes if isinstance(node, Fact)] for island in islands]
+    facts = list({id(fact): fact for nodes in inputs for fact in nodes}.values())
+    initial = [fact.precision for fact in facts]
+    initial_noise = None if analytic else simulator.noise
+    compiled = {}
+    rows = []
+    try:
+        for point, noise in enumerate(noises):
+            for fact, precision in zip(facts, initial):
+                fact.precision = precision
+            if not analytic:
+                simulator.noise = noise
+            for number, (island, nodes) in enumerate(zip(islands, inputs)):
+                key = (id(island), tuple(fact.precision for fact in nodes))
+                if key not in compiled:
+                    circuit, elements, _ = compile_island(island, builder, passes)
+                    if plugin is not None:
+                        circuit = PLUGIN_CACHE.compile(plugin, circuit.to_job(), simulator.get_specs()).circuit
+                    consequents = [rule.right_hand_side for rule in island.rules]
+                    compiled[key] = (circuit, [(element, index) for element, index in elements.items() if element in consequents])
+                circuit, measured = compiled[key]
+                if analytic:
+                    probabilities = propagate_noise(circuit, noise, [index for _, index in measured])
+                else:
+                    probabilities = simulator.probabilities(circuit, [index for _, index in measured])
+                if shots:
+                    probabilities = rng.multinomial(shots, probabilities / probabilities.sum()) / shots
+                probabilities = probabilities.reshape([2] * len(measured))
+                for axis, (element, _) in enumerate(measured):
+                    probability = np.moveaxis(probabilities, axis, 0).reshape(2, -1)[1].sum()
+                    element.precision = 2 * np.arcsin(np.sqrt(min(probability, 1.0))) / np.pi
+                    rows.append(dict({'point': point}, **vars(noise), island=number, fact=element.attribute, precision=element.precision))
+    finally:
+        for fact, precision in zip(facts, initial):
+            fact.precision = precision
+        if not analytic:
+            simulator.noise = initial_noise
+    return rows
+
+
+def analytic_error_report(qrbs, noises, islands=None, model='cf', passes=None, qpu=None) -> List[Dict]:
+    """Measures the error of the analytic propagation of noise against its simulation, as swept by :obj:`noise_sweep`.
+
+    Args:
+        qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS being executed.
+        noises (List[:obj:`NoiseModel`]): The noise models of the sweep.
+        islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
+        model (str, optional): The code of the model indicated.
+        passes (List[str], optional): The codes of the compilation passes to apply, as defined in :obj:`~neasqc_qrbs.compiler`.
+        qpu (optional): The QPU simulating the circuits, as in :obj:`noise_sweep`.
+
+    Returns:
+        List[Dict]: The rows of the simulated sweep, adding the analytic precision under ``'analytic'`` and its absolute difference with the simulated one under ``'error'``.
+    """
+    simulated = noise_sweep(qrbs, noises, islands, model, passes, qpu)
+    predicted = noise_sweep(qrbs, noises, islands, model, passes, analytic=True)
+    return [dict(row, analytic=other['precision'], error=abs(other['precision'] - row['precision'])) for row, other in zip(simulated, predicted)]
@@ -0,0 +1,224 @@
+# -*- coding : utf-8 -*
+
+from typing import Dict, List, Tuple
+
+from .backends import BACKENDS, get_backend
+from .classical import IslandNetwork, island_bdd
+from .compiler import compile_island
+from .knowledge_rep import IslandPlan
+from .qrbs import MyQlmQPU, QPU
+
+
+# Seconds taken by an elementary operation of unit cost, calibrated with PyLinalg
+SECONDS = 8.5e-8
+
+COST_MODEL = {
+    'statevector': lambda estimate, options: estimate['gates'] * 2 ** estimate['qubits'] + options['shots'] * estimate['qubits'],
+    'density_matrix': lambda estimate, options: estimate['gates'] * 4 ** estimate['qubits'] + options['shots'] * estimate['qubits'],
+    'trajectories': lambda estimate, options: options['trajectories'] * estimate['gates'] * 2 ** estimate['qubits'],
+    'mps': lambda estimate, options: estimate['gates'] * estimate['qubits'] * min(options['bond_dimension'], 2 ** estimate['cutwidth']) ** 3,
+    'bdd': lambda estimate, options: estimate['tensors'] * estimate['nodes'],
+    'tensor_network': lambda estimate, options: estimate['tensors'] * 2 ** estimate['width'],
+    'monte_carlo': lambda estimate, options: estimate['tensors'] * options['samples']
+}
+"""Dict: Number of elementary operations of each simulation method, from the estimate of a knowledge island and the options of the plan."""
+
+CLASSICAL_METHODS = ['bdd', 'tensor_network', 'monte_carlo']
+
+# Knowledge islands with at most this many variables are compiled into diagrams to count their nodes
+BDD_VARIABLES = 64
+
+
+def _diagram_size(island) -> Tuple[int, int]:
+    # Number of variables of the diagrams of a knowledge island and their number of nodes, or a bound of it when it has too many variables
+    plan = IslandPlan.from_island(island)
+    cones = [set() for _ in plan.nodes]
+    variables = 0
+    for index in plan.order:
+        kind, _, operands, target = plan.steps[index]
+        if kind == 'fact':
+            cones[target] = {variables}
+            variables += 1
+        elif kind == 'operator':
+            cones[target] = set().union(*(cones[operand] for operand in operands))
+        elif kind == 'implication':
+            cones[target] = cones[target] | cones[operands[0]] | {variables}
+            variables += 1
+    if variables <= BDD_VARIABLES:
+        bdd, _ = island_bdd(island)
+        return variables, len(bdd)
+    # The diagram of each element has at most a node per assignment of the variables it depends on
+    return variables, sum(2 ** len(cone) for cone in cones)
+
+
+def estimate_island(island, model='cf') -> Dict:
+    """Estimates the resources a knowledge island requires, without executing it.
+
+    Args:
+        island (:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`): The knowledge island being estimated.
+        model (str, optional): The code of the model indicated.
+
+    Returns:
+        Dict: The number of qubits, gates, depth and cutwidth of its circuit, with its qubits reordered, the number of tensors and width of its network, and the number of variables and nodes of its binary decision diagrams. The nodes are counted on the diagrams of knowledge islands with at most :obj:`BDD_VARIABLES` variables, and bounded by the assignments of the variables each element depends on otherwise.
+    """
+    _, _, report = compile_island(island, MyQlmQPU.BUILDERS[model], ['reorder'])
+    network = IslandNetwork(island, model)
+    variables, nodes = _diagram_size(island)
+    return {
+        'qubits': report['qubits'],
+        'gates': report['gates'],
+        'depth': report['depth'],
+        'cutwidth': report['reorder']['cutwidth_after'],
+        'tensors': len(network._tensors),
+        'width': network.width(),
+        'variables': variables,
+        'nodes': nodes
+    }
+
+
+def plan_islands(qrbs, islands=None, model='cf', backends=None, noisy=False, exact=True, qpus=None, shots=1024, samples=100000, trajectories=1000, bond_dimension=64) -> List[Dict]:
+    """Plans the execution of each knowledge island of a QRBS on its cheapest backend.
+
+    A backend is a candidate for a knowledge island if it matches the noise and exactness required, it is available, the circuit of the knowledge island fits in it and, for classical engines, their own evaluation accepts the knowledge island. Its cost is given by :obj:`COST_MODEL` for its simulation method, scaled by the cost of the backend.
+
+    Args:
+        qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS being planned.
+        islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be planned.
+        model (str, optional): The code of the model indicated.
+        backends (List[str], optional): The codes of the candidate backends. Every registered backend if not specified.
+        noisy (bool, optional): Whether the knowledge islands are executed with a noisy hardware model.
+        exact (bool, optional): Whether the probabilities must be exact.
+        qpus (Dict[str, object], optional): The QPUs of backends which cannot create them, like those returned by ``select_qpu``, by code of their backend.
+        shots (int, optional): The number of shots of circuit executions.
+        samples (int, optional): The number of samples of Monte Carlo estimations.
+        trajectories (int, optional): The number of trajectories of stochastic noisy simulations.
+        bond_dimension (int, optional): The bond dimension of matrix product simulations.
+
+    Returns:
+        List[Dict]: The plan of each knowledge island, with the island, its estimate, the chosen backend, its cost in seconds and, for each candidate backend, its cost or the reason it was discarded.
+
+    Raises:
+        ValueError: In case no backend can execute a knowledge island.
+    """
+    if islands is None:
+        islands = []
+    if qpus is None:
+        qpus = {}
+    if not islands:
+        islands = qrbs._engine._islands
+    if backends is None:
+        backends = list(BACKENDS)
+    options = {'shots': shots, 'samples': samples, 'trajectories': trajectories, 'bond_dimension': bond_dimension}
+    plan = []
+    for island in islands:
+        estimate = estimate_island(island, model)
+        candidates = {}
+        for name in backends:
+            backend = get_backend(name)
+            if backend.noisy != noisy:
+                candidates[name] = 'does not support noise' if noisy else 'adds noise'
+            elif exact and not backend.exact:
+                candidates[name] = 'is not exact'
+            elif not backend.available() and name not in qpus:
+                candidates[name] = 'is not available'
+            elif not backend.fits(estimate['qubits']):
+                candidates[name] = 'requires {} qubits, more than {}'.format(estimate['qubits'], backend.max_arity)
+            else:
+                try:
+                    if backend.method in CLASSICAL_METHODS:
+                        backend.shared().evaluate(qrbs, [island], model)
+                    candidates[name] = backend.cost * COST_MODEL[backend.method](estimate, options) * SECONDS
+                except ValueError as error:
+                    candidates[name] = error.args[0]
+        costs = {name: cost for name, cost in candidates.items() if not isinstance(cost, str)}
+        if not costs:
+            raise ValueError('No backend can execute a KnowledgeIsland', island)
+        chosen = min(costs, key=costs.get)
+        plan.append({
+            'island': island,
+            'estimate': estimate,
+            'backend': chosen,
+            'cost': costs[chosen],
+            'candidates': candidates
+        })
+    return plan
+
+
+def explain_plan(plan) -> str:
+    """Explains an execution plan in text, one knowledge island per paragraph.
+
+    Args:
+        plan (List[Dict]): The execution plan, as returned by :obj:`plan_islands`.
+
+    Returns:
+        str: The explanation of the plan.
+    """
+    paragraphs = []
+    for number, entry in enumerate(plan):
+        lines = ['Island {} ({}): {} ({:.3g} s)'.format(number, ', '.join('{} {}'.format(value, key) for key, value in entry['estimate'].items()), entry['backend'], entry['cost'])]
+        for name, cost in sorted(entry['candidates'].items(), key=lambda item: (isinstance(item[1], str), item[1])):
+            lines.append('    {}: {}'.format(name, cost if isinstance(cost, str) else '{:.3g} s'.format(cost)))
+        paragraphs.append('\n'.join(lines))
+    return '\n\n'.join(paragraphs)
+
+
+class PlannedQPU(QPU):
+    """Implementation of a Quantum Processing Unit (QPU) executing each knowledge island on the cheapest backend, as planned by :obj:`plan_islands`.
+    """
+
+    @staticmethod
+    def evaluate(qrbs, eval_islands=None, model='cf', **options) -> bool:
+        """Evaluates whether a QRBS can be executed on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be evaluated.
+            eval_islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be evaluated.
+            model (str, optional): The code of the model indicated.
+            **options: The options of the plan, as in :obj:`plan_islands`.
+
+        Raises:
+            ValueError: In case a specified knowledge island is not part of the QRBS or no backend can execute an evaluated knowledge island.
+        """
+        PlannedQPU._plan(qrbs, eval_islands, model, options)
+        return True
+
+    @staticmethod
+    def _plan(qrbs, islands, model, options) -> List[Dict]:
+        # Plan of the specified knowledge islands, which also evaluates them
+        if islands is None:
+            islands = []
+        for island in islands:
+            if island not in qrbs._engine._islands:
+                raise ValueError('A specified KnowledgeIsland is not part of the QRBS', island)
+        return plan_islands(qrbs, islands, model, **options)
+
+    @staticmethod
+    def execute(qrbs, islands=None, model='cf', **options) -> List[Dict]:
+        """Executes the QRBS on this QPU.
+
+        Args:
+            qrbs (:obj:`~neasqc_qrbs.qrbs.QRBS`): The QRBS to be executed.
+            islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
+            model (str, optional): The code of the model indicated.
+            **options: The options of the plan, as in :obj:`plan_islands`.
+
+        Returns:
+            List[Dict]: The report of each executed knowledge island by its backend, adding its plan under ``'plan'``.
+        """
+        reports = []
+        # Planning evaluates the knowledge islands, so they are planned once
+        plan = PlannedQPU._plan(qrbs, islands, model, options)
+        qpus = options.get('qpus') or {}
+        for entry in plan:
+            backend = get_backend(entry['backend'])
+            if backend.method == 'monte_carlo':
+                report = backend.shared().execute(qrbs, [entry['island']], model, samples=options.get('samples', 100000))[0]
+            elif backend.method in CLASSICAL_METHODS:
+                report = backend.shared().execute(qrbs, [entry['island']], model)[0]
+            else:
+                # Matrix product simulators run the circuits with their qubits reordered
+                passes = ['reorder'] if backend.method == 'mps' else None
+                report = MyQlmQPU.execute(qrbs, [entry['island']], model, passes, qpu=qpus.get(backend.name, backend.name))[0]
+            report['plan'] = {key: entry[key] for key in ('backend', 'cost', 'candidates')}
+            reports.append(report)
+        return reports
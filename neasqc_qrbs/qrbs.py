@@ -1,15 +1,14 @@
 # -*- coding : utf-8 -*
 
 from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
 
 import numpy as np
 
+from .backends import describe
+from .compiler import compile_island, cut_island, join_circuits, pack_islands
 from .knowledge_rep import BuilderBayes, BuilderFuzzy, BuilderImpl, Fact, Rule, KnowledgeIsland
-from qat.lang.AQASM import Program
-try:
-    from qat.pylinalg import PyLinalg
-except ModuleNotFoundError:
-    print("Module Not Found")
+from .sampling import JointDistribution, fed_batches, marginal, sampling_strategy
 
 
 class WorkingMemory:
@@ -261,11 +260,147 @@ class QPU(ABC): # pragma: no cover
         pass
       
 
+def prepared_precision(probability) -> float:
+    """Computes the precision of a fact whose preparation reproduces a probability.
+
+    Args:
+        probability (float): The probability of the fact.
+
+    Returns:
+        float: The precision of the fact.
+    """
+    return 2*np.arcsin(np.sqrt(probability)) / np.pi
+
+
+def execute_batches(qrbs, islands, builder, backend, qpu, sampling, passes=None, cut=False, pack=False, fallback=None, model='cf', joint=False, precision=prepared_precision) -> List[Dict]:
+    """Executes knowledge islands of a QRBS, cut and packed into batches, on a myQLM QPU.
+
+    Intermediate facts of a cut knowledge island are fed forward with their :obj:`prepared_precision` while it is executed.
+
+    Args:
+        qrbs (:obj:`QRBS`): The QRBS to be executed.
+        islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`]): The KnowledgeIsland to be executed.
+        builder (:obj:`~neasqc_qrbs.knowledge_rep.BuilderImpl`): The builder of the circuits.
+        backend (:obj:`~neasqc_qrbs.backends.Backend`): The backend describing the capacity of the QPU.
+        qpu: The myQLM QPU simulating the circuits.
+        sampling (:obj:`~neasqc_qrbs.sampling.Sampling`): The strategy sampling the circuits.
+        passes (List[str], optional): The codes of the compilation passes to apply, as defined in :obj:`~neasqc_qrbs.compiler`.
+        cut (bool, optional): Whether knowledge islands requiring more qubits than supported are cut into sub-islands executed in order.
+        pack (bool, optional): Whether knowledge islands are packed side by side into as few circuits as possible.
+        fallback (:obj:`QPU`, optional): The QPU executing the knowledge islands requiring more qubits than supported, if they are not cut.
+        model (str, optional): The code of the model the fallback QPU executes with.
+        joint (bool, optional): Whether the joint distribution of the consequents of each knowledge island is kept.
+        precision (Callable, optional): The precision written to each measured fact from its probability. Its :obj:`prepared_precision` if not specified.
+
+    Returns:
+        List[Dict]: The compilation report of each executed knowledge island, as described by :obj:`MyQlmQPU.execute`.
+
+    Raises:
+        ValueError: In case the shot budget does not cover the pilots.
+    """
+    parts = []
+    fallen = []
+    for island in islands:
+        sub_islands, cut_report = [island], None
+        if not backend.fits(builder.build_island(island)[0].arity):
+            if cut:
+                sub_islands, cut_report = cut_island(island, builder, backend.max_arity)
+            else:
+                fallen.append(id(island))
+        parts.append((sub_islands, cut_report))
+    sub_islands = [sub_island for part, _ in parts for sub_island in part]
+    if pack:
+        batches = pack_islands(sub_islands, builder, backend.max_arity)
+    else:
+        batches = [[sub_island] for sub_island in sub_islands]
+    executed = [number for number, batch in enumerate(batches) if id(batch[0]) not in fallen]
+    # Sub-islands of cut islands, whose measured facts are fed forward until the end of the execution
+    fed = [id(sub_island) for part, cut_report in parts if cut_report is not None for sub_island in part]
+    probabilities_fed = {}
+
+    if sampling.pilots:
+        pilots = fed_batches([batches[number] for number in executed])
+        for position, number in enumerate(executed):
+            compiled, offsets, circ, measured, consequents = _compile_batch(qrbs, batches[number], builder, passes)
+            probabilities = sampling.pilot(qpu, circ, [qubit for _, qubit, _ in measured], consequents, number, position in pilots)
+            _measure_batch(measured, probabilities, fed, probabilities_fed, precision)
+        sampling.allocate()
+
+    sub_reports = {}
+    for number, batch in enumerate(batches):
+        if id(batch[0]) in fallen:
+            sub_reports[id(batch[0])] = fallback.execute(qrbs, batch, model)[0]
+            continue
+        compiled, offsets, circ, measured, consequents = _compile_batch(qrbs, batch, builder, passes)
+        qubits = [qubit for _, qubit, _ in measured]
+        probabilities, sampled = sampling.sample(qpu, circ, qubits, consequents, number)
+        _measure_batch(measured, probabilities, fed, probabilities_fed, precision)
+
+        for sub_island, (_, elements, report), offset in zip(batch, compiled, offsets):
+            own = [(element, offset + index) for element, index in elements.items() if element in [rule.right_hand_side for rule in sub_island.rules]]
+            if sampled is not None:
+                report['shots'] = {
+                    'shots': sampled['shots'],
+                    'rounds': sampled['rounds'],
+                    'intervals': {element.attribute: sampled['intervals'][qubit] for element, qubit in own}
+                }
+            if joint:
+                report['joint'] = JointDistribution.from_probabilities([element for element, _ in own], [qubits.index(qubit) for _, qubit in own], probabilities)
+            if pack:
+                report['pack'] = {'job': number, 'offset': offset}
+            sub_reports[id(sub_island)] = report
+    for element, probability in probabilities_fed.values():
+        element.precision = precision(probability)
+
+    reports = []
+    for sub_islands, cut_report in parts:
+        report = sub_reports[id(sub_islands[0])]
+        if cut_report is not None:
+            cut_reports = [sub_reports[id(sub_island)] for sub_island in sub_islands]
+            report = {
+                'cut': cut_report,
+                'subcircuits': cut_reports,
+                'qubits': max(sub_report['qubits'] for sub_report in cut_reports),
+                'gates': sum(sub_report['gates'] for sub_report in cut_reports),
+                'depth': sum(sub_report['depth'] for sub_report in cut_reports)
+            }
+        reports.append(report)
+    return reports
+
+
+def _compile_batch(qrbs, batch, builder, passes) -> Tuple:
+    # Joined circuit of a batch of knowledge islands, with the qubit of every consequent measured from it and the attribute of those of the batch
+    # Intermediate facts of a cut island are measured as well, to feed them forward
+    compiled = [compile_island(sub_island, builder, passes) for sub_island in batch]
+    circ, offsets = join_circuits([circuit for circuit, _, _ in compiled])
+    measured, consequents = [], {}
+    for sub_island, (_, elements, _), offset in zip(batch, compiled, offsets):
+        for element, index in elements.items():
+            if element in [rule.right_hand_side for rule in qrbs._engine._rules + sub_island.rules]:
+                measured.append((element, offset + index, id(sub_island)))
+            if element in [rule.right_hand_side for rule in sub_island.rules]:
+                consequents[offset + index] = element.attribute
+    return compiled, offsets, circ, measured, consequents
+
+
+def _measure_batch(measured, probabilities, fed, probabilities_fed, precision) -> None:
+    # Precision of each measured consequent, fed forward with the one whose preparation reproduces its probability
+    for axis, (element, _, island) in enumerate(measured):
+        probability = max(0.0, min(1.0, marginal(probabilities, axis)))
+        if island in fed:
+            probabilities_fed[id(element)] = (element, probability)
+            element.precision = prepared_precision(probability)
+        else:
+            element.precision = precision(probability)
+
+
 class MyQlmQPU(QPU):
     """ myQLM implementation of a Quantum Processing Unit (QPU).
+
+    Its capacity is that of the registered :obj:`~neasqc_qrbs.backends.Backend` it simulates circuits with.
     """
 
-    MAX_ARITY = 20
+    BACKEND = 'python'
     BUILDERS = {
         'cf': BuilderImpl,
         'fuzzy': BuilderFuzzy,
@@ -273,16 +408,19 @@ class MyQlmQPU(QPU):
     }
         
     @staticmethod
-    def evaluate(qrbs, eval_islands=None, model='cf') -> bool:
+    def evaluate(qrbs, eval_islands=None, model='cf', cut=False, fallback=None, qpu=None) -> bool:
         """Evaluates whether a QRBS can be executed on this QPU.
 
         Args:
             qrbs (:obj:`QRBS`): The QRBS to be evaluated.
             eval_islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be evaluated.
             model (str, optional): The code of the model indicated.
+            cut (bool, optional): Whether knowledge islands requiring more qubits than supported can be cut, as done by :obj:`~neasqc_qrbs.compiler.cut_island`.
+            fallback (:obj:`QPU`, optional): The QPU executing the knowledge islands requiring more qubits than supported, if they are not cut.
+            qpu (optional): The myQLM QPU simulating the circuits, or the code of its :obj:`~neasqc_qrbs.backends.Backend`. The backend :obj:`BACKEND` if not specified.
 
         Raises:
-            ValueError: In case a specified knowledge island is not part of the QRBS or an evaluated knowledge island requires more qubits than supported.
+            ValueError: In case a specified knowledge island is not part of the QRBS, the backend is unknown or an evaluated knowledge island requires more qubits than supported and can neither be cut nor executed by the fallback QPU.
         """
         if eval_islands is None:
             eval_islands = []
@@ -296,49 +434,52 @@ class MyQlmQPU(QPU):
                     raise ValueError('A specified KnowledgeIsland is not part of the QRBS', island)
         # Build each island
         builder = MyQlmQPU.BUILDERS[model]
-        eval_islands = [builder.build_island(island) for island in eval_islands]
+        built_islands = [builder.build_island(island) for island in eval_islands]
+        backend = describe(MyQlmQPU.BACKEND if qpu is None else qpu)
         # Check their arity is compatible with the QPU
-        for island in eval_islands:
-            routine, _ = island
-            if routine.arity > MyQlmQPU.MAX_ARITY:
+        for island, (routine, _) in zip(eval_islands, built_islands):
+            if not backend.fits(routine.arity):
+                if cut:
+                    cut_island(island, builder, backend.max_arity)
+                    continue
+                if fallback is not None:
+                    fallback.evaluate(qrbs, [island], model)
+                    continue
                 evaluation = False
-                raise ValueError('A KnowledgeIsland surpasses capacity of QPU ({} qubits)'.format(MyQlmQPU.MAX_ARITY), qrbs._engine._islands[eval_islands.index(island)])
+                raise ValueError('A KnowledgeIsland surpasses capacity of QPU ({} qubits)'.format(backend.max_arity), island)
         return evaluation
 
     @staticmethod
-    def execute(qrbs, islands=None, model='cf') -> None:
+    def execute(qrbs, islands=None, model='cf', passes=None, cut=False, pack=False, fallback=None, qpu=None, shots=1024, joint=False) -> List[Dict]:
         """Executes the QRBS on this QPU.
 
         Args:
             qrbs (:obj:`QRBS`): The QRBS to be executed.
             islands (List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`], optional): A list of specific KnowledgeIsland to be executed.
             model (str, optional): The code of the model indicated.
+            passes (List[str], optional): The codes of the compilation passes to apply, as defined in :obj:`~neasqc_qrbs.compiler`.
+            cut (bool, optional): Whether knowledge islands requiring more qubits than supported are cut into sub-islands executed in order, as done by :obj:`~neasqc_qrbs.compiler.cut_island`.
+            pack (bool, optional): Whether knowledge islands are packed side by side into as few circuits as possible, as done by :obj:`~neasqc_qrbs.compiler.pack_islands`.
+            fallback (:obj:`QPU`, optional): The QPU executing the knowledge islands requiring more qubits than supported, if they are not cut, like :obj:`~neasqc_qrbs.classical.MonteCarloQPU`. Its report replaces the compilation report of those knowledge islands.
+            qpu (optional): The myQLM QPU simulating the circuits, or the code of its :obj:`~neasqc_qrbs.backends.Backend`. The backend :obj:`BACKEND` if not specified. A :obj:`~neasqc_qrbs.sampling.ShotEmulator` draws the shots locally from a single exact simulation of each circuit.
+            shots (int or :obj:`~neasqc_qrbs.sampling.Sampling`, optional): The number of shots of each circuit, computing exact probabilities if 0, or the strategy sampling them, like :obj:`~neasqc_qrbs.sampling.AdaptiveShots` or :obj:`~neasqc_qrbs.sampling.ShotBudget`.
+            joint (bool, optional): Whether the joint distribution of the consequents of each knowledge island is kept, so queries on several of them are answered without executing the circuits again.
+
+        Returns:
+            List[Dict]: The compilation report of each executed knowledge island. The report of a cut knowledge island adds the report of the cut, under ``'cut'``, and the compilation report of each of its sub-islands, under ``'subcircuits'``. When packed, each compilation report adds the job it was executed in and the index of its first qubit in it, under ``'pack'``. When sampled in rounds or from a budget, each compilation report adds the shots and rounds of its circuit and the estimated probability and interval of each of its consequents, by attribute, under ``'shots'``. When joint, each compilation report adds the :obj:`~neasqc_qrbs.sampling.JointDistribution` of its consequents, under ``'joint'``.
+
+        Raises:
+            ValueError: In case the shot budget does not cover the pilots.
         """
-        # Select builder
         if islands is None:
             islands = []
-        builder = MyQlmQPU.BUILDERS[model]
         # Initiate islands in case of specified evaluation
         if not islands:
             islands = qrbs._engine._islands
+        reports = []
         # If evaluation is successful, continue with execution
-        if MyQlmQPU.evaluate(qrbs, islands, model):
-            for island in islands:
-                routine, elements = builder.build_island(island)
-
-                prog = Program()
-                qbits = prog.qalloc(routine.arity)
-                prog.apply(routine, qbits)
-
-                circ = prog.to_circ()
-                job = circ.to_job(nbshots=1024)
-                linalgqpu = PyLinalg()
-                result = linalgqpu.submit(job)
-
-                for element, index in elements.items():
-                    if element in [rule.right_hand_side for rule in qrbs._engine._rules]:
-                        temp = 0
-                        for sample in result:
-                            if sample.state.bitstring[index] == '1':
-                                temp += sample.probability
-                        element.precision = 2*np.arcsin(np.sqrt(temp)) / np.pi
+        if MyQlmQPU.evaluate(qrbs, islands, model, cut, fallback, qpu):
+            backend = describe(MyQlmQPU.BACKEND if qpu is None else qpu)
+            linalgqpu = backend.shared() if qpu is None or isinstance(qpu, str) else qpu
+            reports = execute_batches(qrbs, islands, MyQlmQPU.BUILDERS[model], backend, linalgqpu, sampling_strategy(shots), passes, cut, pack, fallback, model, joint)
+        return reports
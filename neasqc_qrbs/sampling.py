@@ -0,0 +1,539 @@
+# -*- coding : utf-8 -*
+
+from abc import ABC, abstractmethod
+import copy
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+
+import numpy as np
+from qat.core import Result
+from qat.core.qpu import QPUHandler
+
+from .backends import describe
+from .compiler import PLUGIN_CACHE
+from .knowledge_rep import Fact, IslandPlan
+
+
+def wilson_interval(count, samples, confidence=0.95) -> Tuple[float, float, float]:
+    """Estimates a probability from the number of times an outcome was sampled.
+
+    Args:
+        count (int): The number of samples with the outcome.
+        samples (int): The number of samples.
+        confidence (float, optional): The confidence level of the interval.
+
+    Returns:
+        Tuple[float, float, float]: The estimated probability, along with the bounds of its Wilson score interval.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    estimate = count / samples
+    center = (estimate + z ** 2 / (2 * samples)) / (1 + z ** 2 / samples)
+    half = z / (1 + z ** 2 / samples) * np.sqrt(estimate * (1 - estimate) / samples + z ** 2 / (4 * samples ** 2))
+    return estimate, float(max(0.0, center - half)), float(min(1.0, center + half))
+
+
+def adaptive_submit(qpu, job, qubits, tolerance=0.01, budget=8192, confidence=0.95) -> Tuple[Dict[str, float], Dict]:
+    """Submits a job in rounds of shots until the probability of measuring each of some qubits as 1 is known within a tolerance, or a budget of shots is spent.
+
+    The first round has the shots of the job. Each later round has the shots the widest interval still needs, from the normal approximation of its half-width, rounded up to the shots of the job times a power of two, so the plugins of the QPU compile few distinct jobs (see :obj:`~neasqc_qrbs.compiler.PluginCache`). Qubits whose probability is near 0 or 1 need a fraction of the shots of those near 0.5.
+
+    Args:
+        qpu: The QPU the job is submitted to.
+        job (:obj:`Job`): The job being submitted, with the shots of its first round.
+        qubits (List[int]): The qubits whose probability is estimated.
+        tolerance (float, optional): The maximum half-width of the interval of each probability.
+        budget (int, optional): The maximum number of shots.
+        confidence (float, optional): The confidence level of the intervals.
+
+    Returns:
+        Tuple[Dict[str, float], Dict]: A tuple containing the frequency of each sampled bitstring and a report with the number of shots and rounds, under ``'shots'`` and ``'rounds'``, and the estimated probability and Wilson score interval of each qubit, under ``'intervals'``.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    counts = {}
+    total = rounds = 0
+    size = job.nbshots
+    while True:
+        current = copy.copy(job)
+        current.nbshots = size
+        for sample in PLUGIN_CACHE.submit(qpu, current):
+            counts[sample.state.bitstring] = counts.get(sample.state.bitstring, 0) + int(round(sample.probability * size))
+        total += size
+        rounds += 1
+        intervals = {qubit: wilson_interval(sum(count for bits, count in counts.items() if bits[qubit] == '1'), total, confidence) for qubit in qubits}
+        if total >= budget or all((high - low) / 2 <= tolerance for _, low, high in intervals.values()):
+            break
+        needed = max(z ** 2 * max(estimate * (1 - estimate), 1.0 / total) / tolerance ** 2 for estimate, _, _ in intervals.values())
+        size = min(job.nbshots * 2 ** int(np.ceil(np.log2(max(needed - total, job.nbshots) / job.nbshots))), budget - total)
+    return {bits: count / total for bits, count in counts.items()}, {'shots': total, 'rounds': rounds, 'intervals': intervals}
+
+
+def allocate_shots(variances, budget, minimum=None, objective='worst') -> List[int]:
+    """Splits a budget of shots among circuits to minimize the variance of the probabilities estimated from them.
+
+    The variance of a probability estimated from the shots of a circuit is its variance per shot, the binomial variance of the outcome, divided by the shots. The worst variance is minimized by giving each circuit shots in proportion to its largest variance per shot, and the sum of variances by giving them in proportion to the square root of the sum of its variances per shot. Circuits whose share is below their minimum keep their minimum, and the rest of the budget is split again among the others.
+
+    Args:
+        variances (List[List[float]]): The variance per shot of each probability estimated from each circuit, possibly weighted by its importance.
+        budget (int): The number of shots of all the circuits.
+        minimum (List[int], optional): The minimum number of shots of each circuit. None if not specified.
+        objective (str, optional): The variance minimized, either ``'worst'`` or ``'sum'``.
+
+    Returns:
+        List[int]: The number of shots of each circuit.
+
+    Raises:
+        ValueError: In case the objective is unknown or the budget does not cover the minimum number of shots.
+    """
+    if minimum is None:
+        minimum = [0] * len(variances)
+    if objective == 'worst':
+        scores = [max(circuit, default=0.0) for circuit in variances]
+    elif objective == 'sum':
+        scores = [np.sqrt(sum(circuit)) for circuit in variances]
+    else:
+        raise ValueError('Unknown objective', objective)
+    if budget < sum(minimum):
+        raise ValueError('The shot budget does not cover the minimum shots', budget)
+    free = list(range(len(variances)))
+    while True:
+        remaining = budget - sum(minimum[circuit] for circuit in range(len(variances)) if circuit not in free)
+        total = sum(scores[circuit] for circuit in free)
+        shares = {circuit: remaining * scores[circuit] / total if total > 0 else remaining / len(free) for circuit in free}
+        below = [circuit for circuit in free if shares[circuit] < minimum[circuit]]
+        if not below:
+            break
+        free = [circuit for circuit in free if circuit not in below]
+    allocation = [minimum[circuit] if circuit not in free else int(shares[circuit]) for circuit in range(len(variances))]
+    # The shots left by rounding down go to the circuits with the largest remainders
+    for circuit in sorted(free, key=lambda circuit: int(shares[circuit]) - shares[circuit])[:budget - sum(allocation)]:
+        allocation[circuit] += 1
+    return allocation
+
+
+def _tally(frequencies, qubits) -> np.ndarray:
+    # Joint frequencies of some qubits from those of the bitstrings of a circuit, with an axis per qubit
+    probabilities = np.zeros([2] * len(qubits))
+    for bits, frequency in frequencies.items():
+        probabilities[tuple(int(bits[qubit]) for qubit in qubits)] += frequency
+    return probabilities
+
+
+def _submit(qpu, circuit, shots) -> Dict[str, float]:
+    # Frequency of each bitstring sampled from a circuit, its plugin stacks compiling each circuit structure once
+    return {sample.state.bitstring: sample.probability for sample in PLUGIN_CACHE.submit(qpu, circuit.to_job(nbshots=shots))}
+
+
+class Sampling(ABC):
+    """Interface defining the strategies estimating the probabilities of the qubits measured from circuits.
+
+    QPUs submit the circuit of each batch of knowledge islands to ``sample``, in execution order. Strategies needing a first look at every circuit before sampling any of them, marked by ``pilots``, are first given each circuit with its key by ``pilot``, in the same order, and then ``allocate`` is called.
+
+    Attributes:
+        pilots (bool): Whether the circuits are submitted to ``pilot`` before being sampled.
+    """
+
+    pilots = False
+
+    @abstractmethod
+    def sample(self, qpu, circuit, qubits, consequents, key=None) -> Tuple[np.ndarray, Dict]:
+        """Estimates the joint probabilities of the qubits measured from a circuit.
+
+        Args:
+            qpu: The QPU simulating the circuit.
+            circuit (:obj:`Circuit`): The circuit.
+            qubits (List[int]): The measured qubits.
+            consequents (Dict[int, str]): The attribute of the consequent of each qubit whose probability is estimated, a subset of the measured ones.
+            key (optional): The key of the circuit, as given to ``pilot``.
+
+        Returns:
+            Tuple[np.ndarray, Dict]: A tuple containing the probability of each outcome, with an axis per measured qubit in their order, and a report with the number of shots and rounds, under ``'shots'`` and ``'rounds'``, and the estimated probability and interval of each consequent, by qubit, under ``'intervals'``, or None if not sampled in rounds or from a budget.
+        """
+        pass
+
+    def pilot(self, qpu, circuit, qubits, consequents, key, fed=False) -> np.ndarray:
+        """Takes a first look at a circuit, before any circuit is sampled.
+
+        Args:
+            qpu: The QPU simulating the circuit.
+            circuit (:obj:`Circuit`): The circuit.
+            qubits (List[int]): The measured qubits.
+            consequents (Dict[int, str]): The attribute of the consequent of each qubit whose probability is estimated.
+            key: The key of the circuit, given again to ``sample``.
+            fed (bool, optional): Whether the circuit is fed by the consequents of others, so it changes after their pilot.
+
+        Returns:
+            np.ndarray: The probability of each outcome, with an axis per measured qubit in their order.
+        """
+        return self.sample(qpu, circuit, qubits, consequents)[0]
+
+    def allocate(self) -> None:
+        """Plans the sampling of the circuits given to ``pilot``.
+        """
+        pass
+
+
+class FixedShots(Sampling):
+    """Sampling strategy submitting each circuit once with the same number of shots.
+
+    Attributes:
+        shots (int): The number of shots of each circuit.
+    """
+
+    def __init__(self, shots=1024) -> None:
+        super().__init__()
+        self.shots = shots
+
+    def sample(self, qpu, circuit, qubits, consequents, key=None) -> Tuple[np.ndarray, Dict]:
+        return _tally(_submit(qpu, circuit, self.shots), qubits), None
+
+
+class AdaptiveShots(Sampling):
+    """Sampling strategy submitting each circuit in rounds of shots until its consequents are known within a tolerance, as done by :obj:`adaptive_submit`.
+
+    Attributes:
+        shots (int): The number of shots of the first round of each circuit.
+        tolerance (float): The maximum half-width of the interval of the probability of each consequent.
+        budget (int): The maximum number of shots of each circuit.
+        confidence (float): The confidence level of the intervals.
+    """
+
+    def __init__(self, shots=1024, tolerance=0.01, budget=8192, confidence=0.95) -> None:
+        super().__init__()
+        if not shots:
+            raise ValueError('Adaptive shots need a first round of shots', shots)
+        self.shots = shots
+        self.tolerance = tolerance
+        self.budget = budget
+        self.confidence = confidence
+
+    def sample(self, qpu, circuit, qubits, consequents, key=None) -> Tuple[np.ndarray, Dict]:
+        frequencies, report = adaptive_submit(qpu, circuit.to_job(nbshots=self.shots), list(consequents), self.tolerance, self.budget, self.confidence)
+        return _tally(frequencies, qubits), report
+
+
+class ShotBudget(Sampling):
+    """Sampling strategy splitting a budget of shots among the circuits, from the variances estimated by a pilot of shots of each, as done by :obj:`allocate_shots`.
+
+    Circuits fed by the consequents of others change after the pilot, so their pilot shots are discarded, and the rest add the pilot shots to their share.
+
+    Attributes:
+        budget (int): The number of shots of all the circuits, pilots included.
+        shots (int): The number of pilot shots of each circuit.
+        weights (Dict[str, float]): The importance of the variance of each consequent, by attribute. Every consequent weighs 1 if None, and consequents not specified weigh 0 otherwise.
+        objective (str): The variance minimized, either the worst ``'worst'`` or the sum ``'sum'`` of the weighted variances.
+        confidence (float): The confidence level of the intervals.
+    """
+
+    pilots = True
+
+    def __init__(self, budget, shots=1024, weights=None, objective='worst', confidence=0.95) -> None:
+        super().__init__()
+        if not shots:
+            raise ValueError('A shot budget needs pilot shots', shots)
+        self.budget = budget
+        self.shots = shots
+        self.weights = weights
+        self.objective = objective
+        self.confidence = confidence
+        self._pilots = {}
+        self._allocation = {}
+
+    def pilot(self, qpu, circuit, qubits, consequents, key, fed=False) -> np.ndarray:
+        frequencies = _submit(qpu, circuit, self.shots)
+        variances = []
+        for qubit, attribute in consequents.items():
+            # Smoothed, so consequents never sampled as 0 or 1 still get a variance
+            estimate = (sum(frequency for bits, frequency in frequencies.items() if bits[qubit] == '1') * self.shots + 1) / (self.shots + 2)
+            weight = 1.0 if self.weights is None else self.weights.get(attribute, 0.0)
+            variances.append(weight * estimate * (1 - estimate))
+        self._pilots[key] = (frequencies, variances, fed)
+        return _tally(frequencies, qubits)
+
+    def allocate(self) -> None:
+        """Splits the budget among the circuits given to ``pilot``, which are forgotten afterwards.
+
+        Raises:
+            ValueError: In case the objective is unknown or the budget does not cover the pilots.
+        """
+        keys = list(self._pilots)
+        fed = [key for key in keys if self._pilots[key][2]]
+        shares = allocate_shots([self._pilots[key][1] for key in keys], self.budget - self.shots * len(fed), [1 if key in fed else self.shots for key in keys], self.objective)
+        self._allocation = {key: (share, self._pilots[key][0] if key not in fed else None) for key, share in zip(keys, shares)}
+        self._pilots = {}
+
+    def sample(self, qpu, circuit, qubits, consequents, key=None) -> Tuple[np.ndarray, Dict]:
+        total, frequencies = self._allocation.pop(key)
+        rounds = 2 if frequencies is not None and total > self.shots else 1
+        if frequencies is None:
+            frequencies = _submit(qpu, circuit, total)
+        elif total > self.shots:
+            extra = _submit(qpu, circuit, total - self.shots)
+            frequencies = {bits: (frequencies.get(bits, 0.0) * self.shots + extra.get(bits, 0.0) * (total - self.shots)) / total for bits in set(frequencies) | set(extra)}
+        return _tally(frequencies, qubits), {
+            'shots': total,
+            'rounds': rounds,
+            'intervals': {qubit: wilson_interval(round(sum(frequency for bits, frequency in frequencies.items() if bits[qubit] == '1') * total), total, self.confidence)
+                          for qubit in consequents}
+        }
+
+
+class ExactProbabilities(Sampling):
+    """Sampling strategy computing the exact probabilities of the measured qubits, from their marginals given by :obj:`exact_marginals`.
+    """
+
+    def sample(self, qpu, circuit, qubits, consequents, key=None) -> Tuple[np.ndarray, Dict]:
+        return exact_marginals(qpu, circuit, qubits), None
+
+
+def sampling_strategy(shots) -> Sampling:
+    """Gets the sampling strategy of a number of shots.
+
+    Args:
+        shots (int or :obj:`Sampling`): The number of shots of each circuit, or a sampling strategy, which is returned as it is.
+
+    Returns:
+        :obj:`Sampling`: The strategy, computing exact probabilities for no shots and submitting each circuit once with the shots otherwise.
+    """
+    if isinstance(shots, Sampling):
+        return shots
+    return FixedShots(shots) if shots else ExactProbabilities()
+
+
+def fed_batches(batches) -> List[int]:
+    """Finds the batches of knowledge islands fed by the consequents of others, which change once those are executed.
+
+    Args:
+        batches (List[List[:obj:`~neasqc_qrbs.knowledge_rep.KnowledgeIsland`]]): The knowledge islands of each circuit, in execution order.
+
+    Returns:
+        List[int]: The indexes of the batches with an input fact which is a consequent of another batch.
+    """
+    produced = {id(rule.right_hand_side): number for number, batch in enumerate(batches) for island in batch for rule in island.rules}
+    return [number for number, batch in enumerate(batches)
+            if any(produced.get(id(node), number) != number for island in batch for node in IslandPlan.from_island(island).nodes if isinstance(node, Fact))]
+
+
+def _reduce(probabilities, qubits) -> np.ndarray:
+    # Joint probabilities of some qubits from those of every qubit, with an axis per qubit
+    others = tuple(qubit for qubit in range(probabilities.ndim) if qubit not in qubits)
+    # The remaining axes are in increasing order of their qubits, so they are permuted to the order requested
+    return probabilities.sum(axis=others).transpose(np.argsort(np.argsort(qubits)))
+
+
+def exact_marginals(qpu, circuit, qubits) -> np.ndarray:
+    """Computes the exact joint probability of the outcomes of some qubits at the end of a circuit.
+
+    The state vector of a ``PyLinalg`` QPU is simulated directly, and the probabilities of its basis states are reduced by a reshape-and-sum over the axes of the other qubits, without building a sample for each of them. Other QPUs are submitted a job without shots measuring the qubits only, so their result has a sample per outcome of those qubits.
+
+    Args:
+        qpu: The QPU simulating the circuit, possibly a stack of plugins.
+        circuit (:obj:`Circuit`): The circuit being simulated.
+        qubits (List[int]): The qubits being measured.
+
+    Returns:
+        np.ndarray: The probability of each outcome, with an axis per measured qubit, in their order.
+    """
+    try:
+        from qat.pylinalg import PyLinalg
+        from qat.pylinalg.simulator import simulate
+    except ModuleNotFoundError:
+        PyLinalg = None
+    if PyLinalg is not None and isinstance(qpu, PyLinalg):
+        state, _ = simulate(circuit)
+        return _reduce(np.abs(state) ** 2, qubits)
+    probabilities = np.zeros(2 ** len(qubits))
+    for sample in PLUGIN_CACHE.submit(qpu, circuit.to_job(qubits=list(qubits))):
+        probabilities[int(sample.state.bitstring, 2)] += sample.probability
+    return probabilities.reshape([2] * len(qubits))
+
+
+def marginal(probabilities, axis) -> float:
+    """Computes the probability of measuring one qubit as 1 from the joint probabilities of the outcomes of several.
+
+    Args:
+        probabilities (np.ndarray): The probability of each outcome, with an axis per qubit, as returned by :obj:`exact_marginals`.
+        axis (int): The axis of the qubit.
+
+    Returns:
+        float: The probability of the qubit being measured as 1.
+    """
+    return float(np.moveaxis(probabilities, axis, 0).reshape(2, -1)[1].sum())
+
+
+class JointDistribution:
+    """Class representing the joint probability distribution of the consequents of a knowledge island, as measured from its circuit.
+
+    Queries on several consequents, like the probability of one being true and another one false, or the most probable of mutually exclusive consequents, are answered from the distribution, without executing the circuit again. Consequents are given by instance or by attribute, since the hash of a fact changes with its precision.
+
+    Attributes:
+        facts (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact`]): The consequents, in the order of the axes.
+        probabilities (np.ndarray): The probability of each outcome, with an axis per consequent, indexed by whether it is false (0) or true (1).
+    """
+
+    def __init__(self, facts, probabilities) -> None:
+        super().__init__()
+        self.facts = list(facts)
+        self.probabilities = np.asarray(probabilities, dtype=float).reshape([2] * len(self.facts))
+
+    @classmethod
+    def from_probabilities(cls, facts, axes, probabilities) -> 'JointDistribution':
+        """Builds the joint distribution of some consequents from the joint probabilities of more qubits, as returned by :obj:`exact_marginals`.
+
+        Args:
+            facts (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact`]): The consequents.
+            axes (List[int]): The axis of each consequent in the probabilities.
+            probabilities (np.ndarray): The probability of each outcome, with an axis per qubit.
+
+        Returns:
+            :obj:`JointDistribution`: The joint distribution of the consequents.
+        """
+        return cls(facts, _reduce(probabilities, axes))
+
+    @classmethod
+    def from_frequencies(cls, facts, qubits, frequencies) -> 'JointDistribution':
+        """Builds the joint distribution of some consequents from the frequency of each sampled bitstring of a circuit.
+
+        Args:
+            facts (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact`]): The consequents.
+            qubits (List[int]): The qubit of each consequent in the circuit.
+            frequencies (Dict[str, float]): The frequency of each bitstring.
+
+        Returns:
+            :obj:`JointDistribution`: The joint distribution of the consequents.
+        """
+        probabilities = np.zeros([2] * len(facts))
+        for bits, frequency in frequencies.items():
+            probabilities[tuple(int(bits[qubit]) for qubit in qubits)] += frequency
+        return cls(facts, probabilities)
+
+    def axis(self, fact) -> int:
+        """Gets the axis of a consequent.
+
+        Args:
+            fact (:obj:`~neasqc_qrbs.knowledge_rep.Fact` or str): The consequent, or its attribute.
+
+        Returns:
+            int: The axis of the consequent.
+
+        Raises:
+            ValueError: In case the fact is not a consequent of the distribution.
+        """
+        for axis, other in enumerate(self.facts):
+            if other is fact or (isinstance(fact, str) and other.attribute == fact):
+                return axis
+        raise ValueError('The fact is not part of the joint distribution', fact)
+
+    def probability(self, assignment) -> float:
+        """Computes the probability of some consequents having the given values, whatever the values of the others.
+
+        Args:
+            assignment (Dict[:obj:`~neasqc_qrbs.knowledge_rep.Fact` or str, bool]): The value of each consequent, by instance or attribute.
+
+        Returns:
+            float: The probability of the assignment.
+
+        Raises:
+            ValueError: In case a fact is not a consequent of the distribution.
+        """
+        index = [slice(None)] * len(self.facts)
+        for fact, value in assignment.items():
+            index[self.axis(fact)] = int(bool(value))
+        return float(self.probabilities[tuple(index)].sum())
+
+    def marginal(self, fact) -> float:
+        """Computes the probability of a consequent being true.
+
+        Args:
+            fact (:obj:`~neasqc_qrbs.knowledge_rep.Fact` or str): The consequent, or its attribute.
+
+        Returns:
+            float: The probability of the consequent being true.
+
+        Raises:
+            ValueError: In case the fact is not a consequent of the distribution.
+        """
+        return marginal(self.probabilities, self.axis(fact))
+
+    def argmax(self, facts=None):
+        """Gets the most probable of mutually exclusive consequents, the one with the highest probability of being the only one true.
+
+        Args:
+            facts (List[:obj:`~neasqc_qrbs.knowledge_rep.Fact` or str], optional): The mutually exclusive consequents. Every consequent if not specified.
+
+        Returns:
+            Tuple[:obj:`~neasqc_qrbs.knowledge_rep.Fact`, float]: The most probable consequent and its probability of being the only one true.
+
+        Raises:
+            ValueError: In case a fact is not a consequent of the distribution.
+        """
+        axes = list(range(len(self.facts))) if facts is None else [self.axis(fact) for fact in facts]
+        exclusive = [self.probability({self.facts[other]: other == axis for other in axes}) for axis in axes]
+        best = int(np.argmax(exclusive))
+        return self.facts[axes[best]], exclusive[best]
+
+
+class ShotEmulator(QPUHandler):
+    """Implementation of a myQLM QPU drawing the shots of a job locally, from the exact probabilities of its outcomes computed by another QPU.
+
+    The exact probabilities of the outcomes of every qubit of each distinct circuit are computed once, by :obj:`exact_marginals`, and every later job with it only reduces them to its measured qubits and draws its shots from a multinomial distribution. Shot studies then reuse a single simulation for every number of shots and realisation of their noise. Its backend is that of the QPU computing the probabilities, so it can be given to :obj:`~neasqc_qrbs.qrbs.MyQlmQPU` like any other QPU.
+
+    Attributes:
+        qpu: The QPU computing the exact probabilities, possibly a stack of plugins.
+        seed (int): The seed of the random number generator drawing the shots, if any.
+        simulations (int): Number of circuits simulated by the QPU.
+    """
+
+    def __init__(self, qpu, seed=None) -> None:
+        super().__init__()
+        self.qpu = qpu
+        self.seed = seed
+        self.simulations = 0
+        self._rng = np.random.default_rng(seed)
+        self._probabilities = {}
+
+    @property
+    def backend(self):
+        """:obj:`~neasqc_qrbs.backends.Backend`: The backend of the QPU computing the probabilities."""
+        return describe(self.qpu)
+
+    def probabilities(self, job) -> np.ndarray:
+        """Gets the exact probability of each outcome of a job, simulating it only the first time its circuit is requested.
+
+        Args:
+            job (:obj:`Job`): The job whose outcomes are requested.
+
+        Returns:
+            np.ndarray: The probability of each outcome, indexed by the integer of its bitstring.
+        """
+        qubits = list(range(job.circuit.nbqbits)) if job.qubits is None else list(job.qubits)
+        key = (job.circuit.nbqbits, tuple((name, tuple(params), tuple(wires)) for name, params, wires in job.circuit.iterate_simple()))
+        if key not in self._probabilities:
+            self._probabilities[key] = exact_marginals(self.qpu, job.circuit, list(range(job.circuit.nbqbits)))
+            self.simulations += 1
+        return _reduce(self._probabilities[key], qubits).ravel()
+
+    def submit_job(self, job) -> Result:
+        """Executes a job, giving the exact probabilities if it has no shots and drawing them otherwise.
+
+        Args:
+            job (:obj:`Job`): The job being executed.
+
+        Returns:
+            :obj:`Result`: The result of the job.
+        """
+        probabilities = self.probabilities(job)
+        result = Result(nbqbits=int(np.log2(probabilities.size)))
+        if job.nbshots:
+            counts = self._rng.multinomial(job.nbshots, probabilities / probabilities.sum())
+            for state in np.flatnonzero(counts):
+                result.add_sample(int(state), probability=counts[state] / job.nbshots)
+        else:
+            for state in np.flatnonzero(probabilities > 1e-12):
+                result.add_sample(int(state), probability=float(probabilities[state]))
+        return result
+
+    def clear(self) -> None:
+        """Removes every exact probability from the emulator, so they are simulated again when requested.
+        """
+        self._probabilities.clear()
+        self.simulations = 0
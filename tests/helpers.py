@@ -0,0 +1,40 @@
+# -*- coding : utf-8 -*-
+
+"""
+Helpers shared by the tests
+"""
+
+from neasqc_qrbs.knowledge_rep import AndOperator, NotOperator, OrOperator
+from neasqc_qrbs.qrbs import QRBS
+from qat.qpus import PyLinalg
+
+
+def distribution(circuit, qpu=None, qubits=None):
+    """
+    Distribution of the outcomes of a circuit executed on a QPU, exact if not specified
+    """
+    qpu = PyLinalg() if qpu is None else qpu
+    return {sample.state.int: sample.probability for sample in qpu.submit(circuit.to_job(qubits=qubits))}
+
+
+def marginals(circuit, elements, facts):
+    """
+    Exact probability of each fact being measured as 1
+    """
+    result = PyLinalg().submit(circuit.to_job())
+    return [sum(sample.probability for sample in result if sample.state.bitstring[elements[fact]] == '1') for fact in facts]
+
+
+def chained_system():
+    """
+    QRBS with a knowledge island feeding another one
+    """
+    system = QRBS()
+    in_1 = system.assert_fact('in_1', 0.8, 0.9)
+    in_2 = system.assert_fact('in_2', 0.7, 0.4)
+    middle = system.assert_fact('middle', 0.5)
+    in_3 = system.assert_fact('in_3', 0.4, 0.6)
+    consequent = system.assert_fact('consequent', 0.3)
+    _ = system.assert_island([system.assert_rule(AndOperator(in_1, NotOperator(in_2)), middle, 0.9)])
+    _ = system.assert_island([system.assert_rule(OrOperator(middle, in_3), consequent, 0.8)])
+    return system, middle, consequent
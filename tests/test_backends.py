@@ -0,0 +1,122 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the backend descriptors
+"""
+
+import pytest
+from neasqc_qrbs.backends import BACKENDS, QPU_POOL, Backend, clear_pool, config_key, describe, get_backend, list_backends, pooled, register_backend, tag_qpu
+from neasqc_qrbs.qrbs import MyQlmQPU, QRBS
+from qat.qpus import PyLinalg
+
+
+class TestBackend:
+    """
+    Testing the registry of backends
+    """
+
+    def test_registry(self):
+        """
+        Test the registered backends and their capabilities
+        """
+        python = get_backend('python')
+        assert python.max_arity == 20
+        assert python.exact and not python.noisy
+        assert get_backend('noisy_deterministic').noisy
+        assert not get_backend('mps').exact
+        assert get_backend('tensor_network').batch
+        assert get_backend('bdd').fits(1000)
+        assert python.fits(20) and not python.fits(21)
+        assert [backend.cost for backend in list_backends()] == sorted(backend.cost for backend in BACKENDS.values())
+        assert all(backend.noisy for backend in list_backends(noisy=True))
+
+    def test_unknown(self):
+        """
+        Test unknown backends
+        """
+        with pytest.raises(ValueError) as ex_info:
+            get_backend('quantum')
+        assert ex_info.match(r'.*Unknown backend.*')
+        with pytest.raises(ValueError) as ex_info:
+            describe(object())
+        assert ex_info.match(r'.*Unknown backend.*')
+
+    def test_describe(self):
+        """
+        Test the backends describing QPUs
+        """
+        qpu = get_backend('python').create()
+        assert isinstance(qpu, PyLinalg)
+        assert describe(qpu) is get_backend('python')
+        assert describe(PyLinalg()) is get_backend('python')
+        assert describe(tag_qpu(PyLinalg(), 'ideal')) is get_backend('ideal')
+        assert describe('c') is get_backend('c')
+
+    def test_capacity(self, monkeypatch):
+        """
+        Test the capacity of the QPU is that of its backend
+        """
+        monkeypatch.setitem(BACKENDS, 'small', Backend('small', 4, factory=PyLinalg))
+        monkeypatch.setattr(MyQlmQPU, 'BACKEND', 'small')
+        system = QRBS()
+        facts = [system.assert_fact('fact_{}'.format(n), 1.0) for n in range(3)]
+        facts[0].precision = 1.0
+        rules = [system.assert_rule(facts[i], facts[i+1], 1.0) for i in range(2)]
+        _ = system.assert_island(rules)
+
+        with pytest.raises(ValueError) as ex_info:
+            MyQlmQPU.evaluate(system)
+        assert ex_info.match(r'.*surpasses capacity of QPU \(4 qubits\).*')
+
+        register_backend(Backend('small', 5, factory=PyLinalg))
+        assert MyQlmQPU.evaluate(system)
+        MyQlmQPU.execute(system)
+        assert all(fact.precision == pytest.approx(1.0) for fact in facts)
+
+
+class TestPool:
+    """
+    Testing the pool of QPUs
+    """
+
+    def test_config_key(self):
+        """
+        Test configurations with the same content have the same key
+        """
+        config = {'qpu_type': 'noisy', 'idle': {'t1': 231.94e3, 'amplitude_damping': True}}
+        assert config_key(config) == config_key({'idle': {'amplitude_damping': True, 't1': 231.94e3}, 'qpu_type': 'noisy'})
+        assert config_key(config) != config_key({'qpu_type': 'noisy', 'idle': {'t1': 100e3, 'amplitude_damping': True}})
+
+    def test_pooled(self):
+        """
+        Test pooled objects are constructed once per key
+        """
+        clear_pool()
+        calls = []
+
+        def factory():
+            calls.append(None)
+            return object()
+
+        first = pooled(config_key({'qpu_type': 'ideal'}), factory)
+        assert pooled(config_key({'qpu_type': 'ideal'}), factory) is first
+        assert pooled(config_key({'qpu_type': 'noisy'}), factory) is not first
+        assert len(calls) == 2
+        clear_pool()
+        assert not QPU_POOL
+
+    def test_shared(self):
+        """
+        Test executions reuse the QPU of the backend
+        """
+        clear_pool()
+        qpu = get_backend('python').shared()
+        assert isinstance(qpu, PyLinalg) and describe(qpu) is get_backend('python')
+        system = QRBS()
+        facts = [system.assert_fact('fact_{}'.format(n), 1.0) for n in range(2)]
+        facts[0].precision = 1.0
+        _ = system.assert_island([system.assert_rule(facts[0], facts[1], 1.0)])
+        MyQlmQPU.execute(system)
+        MyQlmQPU.execute(system)
+        assert get_backend('python').shared() is qpu
+        assert len(QPU_POOL) == 1
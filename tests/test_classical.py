@@ -0,0 +1,335 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the classical inference engines
+"""
+
+import numpy as np
+import pytest
+from neasqc_qrbs.knowledge_rep import BuilderBayes, BuilderImpl, BuilderFuzzy, Fact, NotOperator, AndOperator, OrOperator, Rule, KnowledgeIsland
+from neasqc_qrbs.classical import BDD, BddQPU, IslandNetwork, MonteCarloQPU, TensorNetworkQPU, island_bdd, island_polynomial, monte_carlo
+from neasqc_qrbs.compiler import compile_island
+from neasqc_qrbs.qrbs import MyQlmQPU, QRBS
+from helpers import marginals
+
+
+class TestBDD:
+    """
+    Testing the BDD manager
+    """
+
+    def test_reduction(self):
+        """
+        Test equal functions are represented by the same node
+        """
+        bdd = BDD()
+        x, y = bdd.variable(0.3), bdd.variable(0.6)
+
+        assert bdd.apply('and', x, x) == x
+        assert bdd.apply('xor', x, x) == BDD.FALSE
+        assert bdd.apply('or', x, bdd.negate(x)) == BDD.TRUE
+        assert bdd.negate(bdd.negate(y)) == y
+        assert bdd.apply('and', x, y) == bdd.negate(bdd.apply('or', bdd.negate(x), bdd.negate(y)))
+
+    def test_probability(self):
+        """
+        Test the weighted model counting of diagrams
+        """
+        bdd = BDD()
+        x, y, z = bdd.variable(0.3), bdd.variable(0.6), bdd.variable(0.5)
+
+        assert bdd.probability(BDD.TRUE) == 1.0
+        assert bdd.probability(bdd.apply('and', x, y)) == pytest.approx(0.18)
+        assert bdd.probability(bdd.apply('or', x, y)) == pytest.approx(0.72)
+        assert bdd.probability(bdd.apply('xor', bdd.apply('and', x, z), bdd.negate(y))) == pytest.approx(0.15 * 0.6 + 0.85 * 0.4)
+
+
+class TestIslandBdd:
+    """
+    Testing the compilation of knowledge islands into BDDs
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+    middle = Fact('middle', 0.5)
+    right_hand = Fact('rh', 0.0)
+
+    rule_1 = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), in_3), middle, 0.9)
+    rule_2 = Rule(AndOperator(middle, in_2), right_hand, 0.7)
+    rule_3 = Rule(NotOperator(in_1), right_hand, 0.4)
+
+    @pytest.mark.parametrize('builder, model', [(BuilderImpl, 'cf'), (BuilderFuzzy, 'fuzzy'), (BuilderBayes, 'bayes')])
+    def test_island_bdd(self, builder, model):
+        """
+        Test the diagrams give the same probabilities as the circuits
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2])
+        circuit, elements, _ = compile_island(island, builder)
+        bdd, diagrams = island_bdd(island, model)
+
+        assert [bdd.probability(diagrams[fact]) for fact in (self.middle, self.right_hand)] == pytest.approx(marginals(circuit, elements, [self.middle, self.right_hand]))
+
+    @pytest.mark.parametrize('builder, model', [(BuilderImpl, 'cf'), (BuilderFuzzy, 'fuzzy')])
+    def test_shared_consequent(self, builder, model):
+        """
+        Test consequents targeted by several rules
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        circuit, elements, _ = compile_island(island, builder)
+        bdd, diagrams = island_bdd(island, model)
+
+        assert bdd.probability(diagrams[self.right_hand]) == pytest.approx(marginals(circuit, elements, [self.right_hand])[0])
+
+    def test_failed_bayes(self):
+        """
+        Test consequents targeted by several rules cannot be represented in the bayesian model
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        with pytest.raises(ValueError) as ex_info:
+            island_bdd(island, 'bayes')
+        assert ex_info.match(r'.*cannot be represented classically in the bayesian model.*')
+
+
+class TestIslandPolynomial:
+    """
+    Testing the polynomials of knowledge islands
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+    middle = Fact('middle', 0.5)
+    right_hand = Fact('rh', 0.0)
+
+    rule_1 = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), in_3), middle, 0.9)
+    rule_2 = Rule(AndOperator(middle, in_2), right_hand, 0.7)
+    rule_3 = Rule(NotOperator(in_1), right_hand, 0.4)
+
+    def test_closed_form(self):
+        """
+        Test the polynomial of a single rule
+        """
+        polynomial = island_polynomial(KnowledgeIsland([Rule(AndOperator(self.in_1, self.in_2), self.right_hand, 0.7)]))
+
+        assert polynomial.facts == [self.in_1, self.in_2]
+        assert polynomial.consequents == [self.right_hand]
+        assert polynomial.monomials.tolist() == [[True, True, True]]
+        assert polynomial.coefficients.tolist() == [[1.0]]
+
+    @pytest.mark.parametrize('builder, model', [(BuilderImpl, 'cf'), (BuilderFuzzy, 'fuzzy')])
+    def test_island_polynomial(self, builder, model):
+        """
+        Test the polynomials give the same probabilities as the circuits
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        circuit, elements, _ = compile_island(island, builder)
+        polynomial = island_polynomial(island, model)
+
+        assert polynomial.consequents == [self.middle, self.right_hand]
+        assert polynomial.evaluate() == pytest.approx(marginals(circuit, elements, polynomial.consequents))
+
+    def test_batch(self):
+        """
+        Test the evaluation of a batch of inputs
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        polynomial = island_polynomial(island)
+        scenarios = [{self.in_1: 1.0, self.in_2: 1.0, self.in_3: 0.0}, {self.in_1: 0.0, self.in_2: 0.0, self.in_3: 1.0}]
+        precisions = np.array([[scenario[fact] for fact in polynomial.facts] for scenario in scenarios])
+
+        probabilities = polynomial.evaluate(precisions, np.full(3, 0.5))
+        assert probabilities.shape == (2, 2)
+        assert probabilities == pytest.approx(np.array([[0.0, 0.0], [0.5, 0.5]]))
+        assert polynomial.evaluate(precisions[1], np.full(3, 0.5)) == pytest.approx(probabilities[1])
+
+
+class TestBddQPU:
+    """
+    Testing BddQPU execution
+    """
+
+    def test_successful_default(self):
+        """
+        Test the successful default execution
+        """
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        implication = system.assert_rule(precedent, consequent, 1.0)
+        _ = system.assert_island([implication])
+
+        reports = BddQPU.execute(system)
+        assert consequent.precision == 1.0
+        assert reports == [{'variables': 2, 'nodes': 5}]
+
+    def test_successful_large(self):
+        """
+        Test the execution of a knowledge island surpassing any statevector simulation
+        """
+        FACTS = 100
+        system = QRBS()
+        facts = [system.assert_fact('fact_{}'.format(n), 0.8, 0.5) for n in range(FACTS)]
+        left_hand = facts[0]
+        for fact in facts[1:]:
+            left_hand = OrOperator(left_hand, fact)
+        consequent = system.assert_fact('consequent', 0.3)
+        implication = system.assert_rule(left_hand, consequent, 1.0)
+        _ = system.assert_island([implication])
+
+        BddQPU.execute(system, model='fuzzy')
+        probability = 1 - (1 - np.sin(np.pi / 4) ** 2) ** FACTS
+        assert consequent.precision == pytest.approx(2 * np.arcsin(np.sqrt(probability)) / np.pi)
+
+    def test_failed_evaluation(self):
+        """
+        Test the failed evaluation of unknown models
+        """
+        system = QRBS()
+        with pytest.raises(ValueError) as ex_info:
+            BddQPU.evaluate(system, model='quantum')
+        assert ex_info.match(r'.*Unknown model.*')
+
+
+class TestIslandNetwork:
+    """
+    Testing the tensor networks of knowledge islands
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+    middle = Fact('middle', 0.5)
+    right_hand = Fact('rh', 0.0)
+
+    rule_1 = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), in_3), middle, 0.9)
+    rule_2 = Rule(AndOperator(middle, in_2), right_hand, 0.7)
+    rule_3 = Rule(NotOperator(in_1), right_hand, 0.4)
+
+    @pytest.mark.parametrize('builder, model', [(BuilderImpl, 'cf'), (BuilderFuzzy, 'fuzzy'), (BuilderBayes, 'bayes')])
+    def test_island_network(self, builder, model):
+        """
+        Test the networks give the same probabilities as the circuits, also for consequents targeted by several rules
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        circuit, elements, _ = compile_island(island, builder)
+        network = IslandNetwork(island, model)
+
+        assert network.consequents == [self.middle, self.right_hand]
+        assert network.evaluate() == pytest.approx(marginals(circuit, elements, network.consequents))
+
+    def test_batch(self):
+        """
+        Test the evaluation of a batch of inputs matches the polynomial
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        network, polynomial = IslandNetwork(island), island_polynomial(island)
+        precisions = np.random.default_rng(0).random((16, 3))
+        certainties = np.random.default_rng(1).random((16, 3))
+
+        probabilities = network.evaluate(precisions[:, [network.facts.index(fact) for fact in polynomial.facts]], certainties)
+        assert probabilities.shape == (16, 2)
+        assert probabilities == pytest.approx(polynomial.evaluate(precisions, certainties))
+
+
+class TestTensorNetworkQPU:
+    """
+    Testing TensorNetworkQPU execution
+    """
+
+    def test_successful_default(self):
+        """
+        Test the successful default execution
+        """
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        implication = system.assert_rule(precedent, consequent, 1.0)
+        _ = system.assert_island([implication])
+
+        reports = TensorNetworkQPU.execute(system)
+        assert consequent.precision == pytest.approx(1.0)
+        assert reports == [{'tensors': 3}]
+
+    def test_successful_large(self):
+        """
+        Test the execution of a knowledge island surpassing any statevector simulation
+        """
+        FACTS = 100
+        system = QRBS()
+        facts = [system.assert_fact('fact_{}'.format(n), 0.8, 0.5) for n in range(FACTS)]
+        left_hand = facts[0]
+        for fact in facts[1:]:
+            left_hand = OrOperator(left_hand, AndOperator(fact, NotOperator(facts[0])))
+        consequent = system.assert_fact('consequent', 0.3)
+        implication = system.assert_rule(left_hand, consequent, 1.0)
+        _ = system.assert_island([implication])
+
+        TensorNetworkQPU.execute(system, model='bayes')
+        probability = 0.5 + 0.5 * (1 - 0.5 ** (FACTS - 1))
+        assert consequent.precision == pytest.approx(2 * np.arcsin(np.sqrt(probability)) / np.pi)
+
+    def test_failed_evaluation(self):
+        """
+        Test the failed evaluation of unknown models
+        """
+        system = QRBS()
+        with pytest.raises(ValueError) as ex_info:
+            TensorNetworkQPU.evaluate(system, model='quantum')
+        assert ex_info.match(r'.*Unknown model.*')
+
+
+class TestMonteCarlo:
+    """
+    Testing the Monte Carlo estimation of knowledge islands
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+    middle = Fact('middle', 0.5)
+    right_hand = Fact('rh', 0.0)
+
+    rule_1 = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), in_3), middle, 0.9)
+    rule_2 = Rule(AndOperator(middle, in_2), right_hand, 0.7)
+    rule_3 = Rule(NotOperator(in_1), right_hand, 0.4)
+
+    @pytest.mark.parametrize('builder, model', [(BuilderImpl, 'cf'), (BuilderFuzzy, 'fuzzy'), (BuilderBayes, 'bayes')])
+    def test_monte_carlo(self, builder, model):
+        """
+        Test the intervals contain the probabilities of the circuits
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        circuit, elements, _ = compile_island(island, builder)
+        estimates = monte_carlo(island, model, 100000, 0.999, seed=7)
+
+        for fact, probability in zip([self.middle, self.right_hand], marginals(circuit, elements, [self.middle, self.right_hand])):
+            estimate, low, high = estimates[fact]
+            assert low <= probability <= high
+            assert low <= estimate <= high
+            assert high - low < 0.02
+
+    def test_workers(self):
+        """
+        Test the samples drawn by several processes are reproducible
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2, self.rule_3])
+        estimates = monte_carlo(island, samples=10000, workers=2, seed=7, chunk=1000)
+
+        assert estimates == monte_carlo(island, samples=10000, workers=2, seed=7, chunk=1000)
+        assert estimates != monte_carlo(island, samples=10000, workers=1, seed=7, chunk=1000)
+
+    def test_fallback(self):
+        """
+        Test the execution of knowledge islands surpassing the capacity of MyQlmQPU
+        """
+        FACTS = 20
+        system = QRBS()
+        facts = [system.assert_fact('fact_{}'.format(n), 0.5) for n in range(FACTS)]
+        facts[0].precision = 1.0
+        rules = [system.assert_rule(facts[i], facts[i+1], 1.0) for i in range(FACTS - 1)]
+        small = system.assert_fact('small', 0.5)
+        _ = system.assert_island(rules)
+        _ = system.assert_island([system.assert_rule(facts[-1], small, 1.0)])
+
+        reports = MyQlmQPU.execute(system, fallback=MonteCarloQPU)
+        assert all(fact.precision == 1.0 for fact in facts + [small])
+        assert reports[0]['samples'] == 100000
+        assert reports[0]['intervals']['fact_19'][1] == 1.0
+        assert reports[1] == {'qubits': 3, 'gates': 3, 'depth': 2}
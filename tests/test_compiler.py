@@ -0,0 +1,399 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the compiler passes
+"""
+
+import pytest
+from neasqc_qrbs.knowledge_rep import BuilderBayes, BuilderImpl, BuilderFuzzy, Fact, NotOperator, AndOperator, OrOperator, Rule, KnowledgeIsland, IslandPlan
+from neasqc_qrbs.compiler import PluginCache, circuit_cutwidth, compile_island, cut_island, join_circuits, pack_islands, parametrize, peephole, rebalance, reorder, schedule
+from qat.lang.AQASM import Program, CCNOT, CNOT, X
+from qat.plugins import KAKCompression, PatternManager
+from qat.qpus import PyLinalg
+from qat.synthopline.compiler import EXPANSION_COLLECTION
+from helpers import distribution, marginals
+import numpy as np
+
+
+def assert_same_distribution(circuit_1, circuit_2):
+    """
+    Asserts two circuits produce the same distribution
+    """
+    distribution_1 = distribution(circuit_1)
+    distribution_2 = distribution(circuit_2)
+    for state in set(distribution_1) | set(distribution_2):
+        assert distribution_1.get(state, 0.0) == pytest.approx(distribution_2.get(state, 0.0))
+
+
+class TestSchedule:
+    """
+    Testing the layer scheduler
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+    in_4 = Fact('lh_4', 0.5, 0.1)
+
+    right_hand_1 = Fact('rh_1', 0.5)
+    rule_1 = Rule(OrOperator(AndOperator(in_1, in_2), AndOperator(in_3, in_4)), right_hand_1, 0.9)
+    right_hand_2 = Fact('rh_2', 0.0)
+    rule_2 = Rule(AndOperator(NotOperator(in_1), in_4), right_hand_2, 0.7)
+
+    def test_schedule_layers(self):
+        """
+        Test every block is scheduled once and no layer uses a wire twice
+        """
+        plan = IslandPlan.from_island(KnowledgeIsland([self.rule_1, self.rule_2]))
+        scheduled = schedule(plan)
+
+        blocks = [index for index, step in enumerate(plan.steps) if step[0] != 'consequent']
+        assert sorted(index for layer in scheduled.layers for index in layer) == blocks
+        assert sorted(scheduled.order) == list(range(len(plan.steps)))
+        for layer in scheduled.layers:
+            wires = [node for index in layer for node in plan.steps[index][2] + (plan.steps[index][3],)]
+            assert len(wires) == len(set(wires))
+        # The original plan is left untouched
+        assert plan.layers is None
+        assert plan.order == list(range(len(plan.steps)))
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_schedule_circuit(self, builder):
+        """
+        Test the scheduled circuit is equivalent and not deeper
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2])
+        circuit, elements, report = compile_island(island, builder)
+        scheduled_circuit, scheduled_elements, scheduled_report = compile_island(island, builder, ['schedule'])
+
+        assert elements == scheduled_elements
+        assert scheduled_report['depth'] <= report['depth']
+        assert scheduled_report['gates'] == report['gates']
+        assert_same_distribution(circuit, scheduled_circuit)
+
+    def test_unknown_pass(self):
+        """
+        Test an unknown pass is rejected
+        """
+        with pytest.raises(ValueError) as ex_info:
+            compile_island(KnowledgeIsland([self.rule_1]), BuilderImpl, ['unknown'])
+        assert ex_info.match('Unknown compilation pass')
+
+
+class TestPeephole:
+    """
+    Testing the peephole optimiser
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+
+    right_hand_1 = Fact('rh_1', 0.5)
+    rule_1 = Rule(OrOperator(OrOperator(in_1, in_2), in_3), right_hand_1, 0.9)
+    right_hand_2 = Fact('rh_2', 0.0)
+    rule_2 = Rule(OrOperator(NotOperator(in_1), AndOperator(NotOperator(in_2), in_3)), right_hand_2, 0.7)
+
+    def test_cancellation(self):
+        """
+        Test adjacent self-inverse gates are cancelled in cascade
+        """
+        prog = Program()
+        qbits = prog.qalloc(3)
+        prog.apply(X, qbits[0])
+        prog.apply(CNOT, qbits[1], qbits[2])
+        prog.apply(CCNOT, qbits[0], qbits[1], qbits[2])
+        prog.apply(CCNOT, qbits[1], qbits[0], qbits[2])
+        prog.apply(CNOT, qbits[1], qbits[2])
+        prog.apply(X, qbits[0])
+        prog.apply(X, qbits[1])
+        circuit = prog.to_circ()
+
+        optimised, _, report = peephole(circuit, {})
+        assert [name for name, _, _ in optimised.iterate_simple()] == ['X']
+        assert report == {'gates_removed': 6, 'folded_wires': []}
+        assert len(circuit.ops) == 7
+
+    def test_chained_or(self):
+        """
+        Test the X conjugations of chained or operators are cancelled
+        """
+        island = KnowledgeIsland([self.rule_1])
+        circuit, elements, _ = compile_island(island, BuilderFuzzy)
+        optimised, optimised_elements, report = compile_island(island, BuilderFuzzy, ['peephole'])
+
+        assert report['peephole']['gates_removed'] == 2
+        assert report['gates'] == len(circuit.ops) - 2
+        assert marginals(optimised, optimised_elements, [self.right_hand_1]) == pytest.approx(marginals(circuit, elements, [self.right_hand_1]))
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_negative_controls(self, builder):
+        """
+        Test the outputs of not operators are folded into negative controls
+        """
+        island = KnowledgeIsland([self.rule_2])
+        circuit, elements, _ = compile_island(island, builder)
+        optimised, optimised_elements, report = compile_island(island, builder, ['peephole'])
+
+        not_wires = [elements[NotOperator(self.in_1)], elements[NotOperator(self.in_2)]]
+        assert report['peephole']['folded_wires'] == sorted(not_wires)
+        assert NotOperator(self.in_1) not in optimised_elements
+        assert all(wire not in op.qbits for op in optimised.ops for wire in not_wires)
+        assert report['gates'] <= len(circuit.ops)
+        assert marginals(optimised, optimised_elements, [self.right_hand_2]) == pytest.approx(marginals(circuit, elements, [self.right_hand_2]))
+
+
+class TestRebalance:
+    """
+    Testing the rebalancing of associative chains
+    """
+    facts = [Fact('lh_' + str(index), 1.0, 0.1 * index) for index in range(8)]
+    right_hand = Fact('rh', 0.5)
+
+    def chain(self, operator, facts):
+        left_hand = facts[0]
+        for fact in facts[1:]:
+            left_hand = operator(left_hand, fact)
+        return left_hand
+
+    def test_rebalance(self):
+        """
+        Test left-deep chains are regrouped into balanced trees
+        """
+        a, b, c, d = self.facts[:4]
+        rule = Rule(AndOperator(self.chain(OrOperator, [a, b, c, d]), NotOperator(self.chain(AndOperator, [a, b, c]))), self.right_hand, 0.9)
+        rebalanced, = rebalance([rule], BuilderImpl)
+
+        assert rebalanced.left_hand_side.left_child == OrOperator(OrOperator(a, b), OrOperator(c, d))
+        assert rebalanced.left_hand_side.right_child is rule.left_hand_side.right_child
+        assert rebalanced.right_hand_side is self.right_hand
+        assert rebalanced.certainty == rule.certainty
+
+    def test_non_associative(self):
+        """
+        Test operators not declared associative by the builder are left as they are
+        """
+        class BuilderSequential(BuilderImpl):
+            ASSOCIATIVE_OPERATORS = (AndOperator,)
+
+        rule = Rule(self.chain(OrOperator, self.facts[:4]), self.right_hand, 0.9)
+        assert rebalance([rule], BuilderSequential)[0] is rule
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_rebalance_circuit(self, builder):
+        """
+        Test rebalancing reduces the depth of wide disjunctions without changing their result
+        """
+        island = KnowledgeIsland([Rule(self.chain(OrOperator, self.facts), self.right_hand, 0.9)])
+        circuit, elements, report = compile_island(island, builder)
+        rebalanced, rebalanced_elements, rebalanced_report = compile_island(island, builder, ['rebalance'])
+
+        assert rebalanced_report['depth'] < report['depth']
+        assert rebalanced_report['qubits'] == report['qubits']
+        assert marginals(rebalanced, rebalanced_elements, [self.right_hand]) == pytest.approx(marginals(circuit, elements, [self.right_hand]))
+
+
+class TestReorder:
+    """
+    Testing the qubit reordering pass
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+    in_4 = Fact('lh_4', 0.5, 0.1)
+
+    right_hand = Fact('rh', 0.5)
+    rule = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), OrOperator(AndOperator(in_3, in_4), NotOperator(in_1))), right_hand, 0.9)
+
+    def test_cutwidth(self):
+        """
+        Test the cutwidth counts the gates spanning each cut
+        """
+        prog = Program()
+        qbits = prog.qalloc(4)
+        prog.apply(X, qbits[3])
+        prog.apply(CNOT, qbits[0], qbits[3])
+        prog.apply(CNOT, qbits[1], qbits[2])
+        prog.apply(CCNOT, qbits[0], qbits[1], qbits[2])
+        circuit = prog.to_circ()
+
+        assert circuit_cutwidth(circuit) == 3
+
+    def test_adjacent_operands(self):
+        """
+        Test the operands of distant gates are moved next to each other
+        """
+        prog = Program()
+        qbits = prog.qalloc(4)
+        prog.apply(CNOT, qbits[0], qbits[3])
+        prog.apply(CNOT, qbits[3], qbits[1])
+        prog.apply(CNOT, qbits[1], qbits[2])
+        circuit = prog.to_circ()
+
+        reordered, _, report = reorder(circuit, {})
+        assert report['span_before'] == 6 and report['span_after'] == 3
+        assert report['cutwidth_after'] == 1
+        assert sorted(report['permutation']) == [0, 1, 2, 3]
+        assert [op.qbits for op in reordered.ops] == [[report['permutation'][first], report['permutation'][second]] for first, second in [[0, 3], [3, 1], [1, 2]]]
+        assert [op.qbits for op in circuit.ops] == [[0, 3], [3, 1], [1, 2]]
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_same_marginals(self, builder):
+        """
+        Test the reordered circuit gives the same marginals, never spanning more than before
+        """
+        island = KnowledgeIsland([self.rule])
+        circuit, elements, _ = compile_island(island, builder)
+        reordered, reordered_elements, report = compile_island(island, builder, ['peephole', 'reorder'])
+
+        assert report['reorder']['span_after'] <= report['reorder']['span_before']
+        assert report['reorder']['cutwidth_after'] == circuit_cutwidth(reordered)
+        assert marginals(reordered, reordered_elements, [self.right_hand, self.in_3]) == pytest.approx(marginals(circuit, elements, [self.right_hand, self.in_3]))
+
+
+class TestCut:
+    """
+    Testing the cutting of knowledge islands
+    """
+
+    def island(self, shared):
+        facts = [Fact('lh_' + str(index), 1.0, 0.1 + 0.15 * index) for index in range(6)]
+        middle = Fact('middle', 0.5)
+        right_hand = Fact('rh', 0.5)
+        rule_1 = Rule(OrOperator(AndOperator(facts[0], facts[1]), OrOperator(facts[2], NotOperator(facts[3]))), middle, 0.8)
+        rule_2 = Rule(AndOperator(middle, facts[0] if shared else facts[4]), right_hand, 0.9)
+        rule_3 = Rule(facts[5], right_hand, 0.6)
+        return KnowledgeIsland([rule_1, rule_2, rule_3]), middle, right_hand
+
+    def feed_forward(self, sub_islands, builder):
+        for sub_island in sub_islands:
+            circuit, elements, _ = compile_island(sub_island, builder)
+            consequents = [rule.right_hand_side for rule in sub_island.rules]
+            for consequent, probability in zip(consequents, marginals(circuit, elements, consequents)):
+                consequent.precision = 2 * np.arcsin(np.sqrt(min(probability, 1.0))) / np.pi
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_cut_island(self, builder):
+        """
+        Test the sub-islands fit and reproduce the knowledge island when their inputs are independent
+        """
+        island, middle, right_hand = self.island(False)
+        circuit, elements, report = compile_island(island, builder)
+        expected = marginals(circuit, elements, [middle, right_hand])
+
+        sub_islands, cut_report = cut_island(island, builder, 8)
+        assert all(compile_island(sub_island, builder)[2]['qubits'] <= 8 for sub_island in sub_islands)
+        assert cut_report['islands'] == len(sub_islands) > 1
+        assert 'middle' in cut_report['intermediates']
+        assert cut_report['correlated'] == []
+
+        self.feed_forward(sub_islands, builder)
+        assert [np.sin(fact.precision * np.pi / 2) ** 2 for fact in (middle, right_hand)] == pytest.approx(expected)
+
+    def test_correlated(self):
+        """
+        Test the loss of correlation between shared inputs is reported
+        """
+        island, middle, _ = self.island(True)
+        _, cut_report = cut_island(island, BuilderImpl, 12)
+
+        assert cut_report['intermediates'] == ['middle']
+        assert cut_report['correlated'] == [{'fact': 'middle', 'shared': ['lh_0']}]
+
+    def test_cut_failure(self):
+        """
+        Test an island which cannot fit raises an error
+        """
+        island, _, _ = self.island(False)
+        with pytest.raises(ValueError) as ex_info:
+            cut_island(island, BuilderImpl, 3)
+        assert ex_info.match(r'.*A KnowledgeIsland cannot be cut to fit the capacity of QPU.*')
+
+
+class TestPack:
+    """
+    Testing the packing of knowledge islands
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+    right_hand_1 = Fact('rh_1', 0.5)
+    right_hand_2 = Fact('rh_2', 0.0)
+    right_hand_3 = Fact('rh_3', 0.0)
+
+    island_1 = KnowledgeIsland([Rule(AndOperator(in_1, in_2), right_hand_1, 0.9)])
+    island_2 = KnowledgeIsland([Rule(OrOperator(in_2, in_3), right_hand_2, 0.7)])
+    island_3 = KnowledgeIsland([Rule(NotOperator(right_hand_1), right_hand_3, 0.4)])
+
+    def test_pack_islands(self):
+        """
+        Test islands are packed by capacity, after the islands producing their inputs
+        """
+        islands = [self.island_1, self.island_2, self.island_3]
+        assert pack_islands(islands, BuilderImpl, 20) == [[self.island_1, self.island_2], [self.island_3]]
+        assert pack_islands(islands, BuilderImpl, 9) == [[self.island_1], [self.island_2, self.island_3]]
+        assert pack_islands(islands, BuilderImpl, 4) == [[self.island_1], [self.island_2], [self.island_3]]
+        assert pack_islands([self.island_3, self.island_1, self.island_2], BuilderImpl, 20) == [[self.island_3, self.island_1, self.island_2]]
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_join_circuits(self, builder):
+        """
+        Test joint circuits keep the distribution of each circuit on its own wires
+        """
+        compiled = [compile_island(island, builder) for island in (self.island_1, self.island_2)]
+        circuit, offsets = join_circuits([circuit for circuit, _, _ in compiled])
+
+        assert offsets == [0, compiled[0][0].nbqbits]
+        assert circuit.nbqbits == sum(circuit.nbqbits for circuit, _, _ in compiled)
+        for (single, elements, _), offset in zip(compiled, offsets):
+            shifted = {element: offset + wire for element, wire in elements.items()}
+            facts = [self.right_hand_1, self.right_hand_2]
+            facts = [fact for fact in facts if fact in elements]
+            assert marginals(circuit, shifted, facts) == pytest.approx(marginals(single, elements, facts))
+
+
+class TestPluginCache:
+    """
+    Testing the cache of circuits compiled by plugins
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+
+    right_hand = Fact('rh', 0.5)
+    rule = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), in_3), right_hand, 0.9)
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_parametrize(self, builder):
+        """
+        Test parametrized circuits keep their distribution and only their variables depend on the precisions
+        """
+        island = KnowledgeIsland([self.rule])
+        circuit, _, _ = compile_island(island, builder)
+        parametrized, structure, values = parametrize(circuit)
+        assert_same_distribution(circuit, parametrized.bind_variables(values))
+
+        in_1 = Fact('lh_1', 1.0, 0.2)
+        other, _, _ = compile_island(KnowledgeIsland([Rule(OrOperator(AndOperator(in_1, NotOperator(self.in_2)), self.in_3), self.right_hand, 0.9)]), builder)
+        other_parametrized, other_structure, other_values = parametrize(other)
+        assert other_structure == structure
+        assert other_values != values
+        assert_same_distribution(other, other_parametrized.bind_variables(other_values))
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_cached_compilation(self, builder):
+        """
+        Test circuits with the same structure are compiled once by the plugins, giving the same results
+        """
+        qpu = KAKCompression(decomposition='ZYZ') | PatternManager(collections=[EXPANSION_COLLECTION]) | PyLinalg()
+        cache = PluginCache()
+        for certainty in [0.9, 0.4, 0.9]:
+            island = KnowledgeIsland([Rule(OrOperator(AndOperator(self.in_1, NotOperator(self.in_2)), self.in_3), self.right_hand, certainty)])
+            circuit, _, _ = compile_island(island, builder)
+            expected = {sample.state.int: sample.probability for sample in qpu.submit(circuit.to_job())}
+            result = {sample.state.int: sample.probability for sample in cache.submit(qpu, circuit.to_job())}
+            for state in set(expected) | set(result):
+                assert result.get(state, 0.0) == pytest.approx(expected.get(state, 0.0))
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        cache.clear()
+        assert cache.submit(PyLinalg(), circuit.to_job()) is not None
+        assert (cache.hits, cache.misses) == (0, 0)
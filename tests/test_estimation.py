@@ -0,0 +1,94 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the amplitude estimation of consequents
+"""
+
+import numpy as np
+import pytest
+from neasqc_qrbs.estimation import AmplitudeEstimationQPU, grover_circuit, iterative_amplitude_estimation, maximum_likelihood_amplitude_estimation
+from neasqc_qrbs.knowledge_rep import AndOperator, BuilderBayes, BuilderFuzzy, BuilderImpl, Fact, KnowledgeIsland, NotOperator, Rule
+from neasqc_qrbs.qrbs import MyQlmQPU, QRBS
+from qat.qpus import PyLinalg
+
+
+def probability(circuit, qubit):
+    """
+    Exact probability of a qubit being measured as 1
+    """
+    return sum(sample.probability for sample in PyLinalg().submit(circuit.to_job()) if sample.state.bitstring[qubit] == '1')
+
+
+class TestAmplitudeEstimation:
+    """
+    Testing the amplitude estimation of the probability of a qubit
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.4)
+    right_hand = Fact('rh', 0.0)
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_grover_circuit(self, builder):
+        """
+        Test each power of the Grover operator rotates the angle of the consequent
+        """
+        routine, elements = builder.build_island(KnowledgeIsland([Rule(AndOperator(self.in_1, NotOperator(self.in_2)), self.right_hand, 0.7)]))
+        angle = np.arcsin(np.sqrt(probability(grover_circuit(routine, elements[self.right_hand]), elements[self.right_hand])))
+
+        for power in range(1, 4):
+            assert probability(grover_circuit(routine, elements[self.right_hand], power), elements[self.right_hand]) == pytest.approx(np.sin((2 * power + 1) * angle) ** 2)
+
+    @pytest.mark.parametrize('method', [iterative_amplitude_estimation, maximum_likelihood_amplitude_estimation])
+    def test_estimation(self, method):
+        """
+        Test the estimate is within the requested precision, with fewer applications of the circuit than sampling it
+        """
+        np.random.seed(3)
+        routine, elements = BuilderImpl.build_island(KnowledgeIsland([Rule(AndOperator(self.in_1, self.in_2), self.right_hand, 0.7)]))
+        exact = probability(grover_circuit(routine, elements[self.right_hand]), elements[self.right_hand])
+        estimate, (low, high), report = method(PyLinalg(), routine, elements[self.right_hand], epsilon=0.002)
+
+        assert low <= exact <= high
+        assert high - low <= 0.004
+        assert estimate == pytest.approx(exact, abs=0.002)
+        # Shots sampling the circuit alone needs for the same interval, from the normal approximation
+        assert report['oracle_calls'] < 1.96 ** 2 * exact * (1 - exact) / 0.002 ** 2
+        assert report['shots'] == 100 * len(report['powers'])
+
+
+class TestAmplitudeEstimationQPU:
+    """
+    Testing AmplitudeEstimationQPU execution
+    """
+
+    @pytest.mark.parametrize('method', ['iterative', 'maximum_likelihood'])
+    def test_successful_default(self, method):
+        """
+        Test the precisions of chained knowledge islands are within the requested precision
+        """
+        np.random.seed(5)
+        system = QRBS()
+        inputs = [system.assert_fact('fact_{}'.format(n), 1.0, 0.6) for n in range(2)]
+        middle = system.assert_fact('middle', 0.0)
+        output = system.assert_fact('output', 0.0)
+        _ = system.assert_island([system.assert_rule(AndOperator(*inputs), middle, 0.8)])
+        _ = system.assert_island([system.assert_rule(NotOperator(middle), output, 0.9)])
+        MyQlmQPU.execute(system, qpu=PyLinalg(), shots=0)
+        expected = [middle.precision, output.precision]
+        middle.precision, output.precision = 0.0, 0.0
+
+        reports = AmplitudeEstimationQPU.execute(system, method=method, epsilon=0.005)
+        for fact, precision, report in zip([middle, output], expected, reports):
+            low, high = report['intervals'][fact.attribute]
+            assert low <= np.sin(precision * np.pi / 2) ** 2 <= high
+            assert report['precisions'][fact.attribute][0] <= fact.precision <= report['precisions'][fact.attribute][1]
+            assert report['oracle_calls'] > report['shots']
+
+    def test_failed_evaluation(self):
+        """
+        Test the failed evaluation of unknown methods
+        """
+        system = QRBS()
+        with pytest.raises(ValueError) as ex_info:
+            AmplitudeEstimationQPU.evaluate(system, method='canonical')
+        assert ex_info.match(r'.*Unknown amplitude estimation method.*')
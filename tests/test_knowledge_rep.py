@@ -6,7 +6,7 @@ Test for KnowledgeRep elements
 
 import numpy as np
 import pytest
-from neasqc_qrbs.knowledge_rep import BuilderBayes, BuilderImpl, BuilderFuzzy, Fact, NotOperator, AndOperator, OrOperator, Rule, KnowledgeIsland
+from neasqc_qrbs.knowledge_rep import BuilderBayes, BuilderImpl, BuilderFuzzy, Fact, NotOperator, AndOperator, OrOperator, Rule, KnowledgeIsland, IslandPlan
 from qat.lang.AQASM import QRoutine, Program, CCNOT, CNOT, X, RY
 
 
@@ -593,3 +593,60 @@ class TestBuilderBayes:
 
         for (built_op, test_op) in zip(built_circ.iterate_simple(), test_circ.iterate_simple()):
             assert built_op == test_op
+
+
+class TestIslandPlan:
+    """
+    Testing IslandPlan
+    """
+    in_1 = Fact('lh_1', 1.0)
+    in_2 = Fact('lh_2', 0.7)
+    in_3 = Fact('lh_3', 0.5)
+
+    not_op = NotOperator(in_2)
+    or_op = OrOperator(in_1, not_op)
+    right_hand_1 = Fact('rh_1', 0.5)
+    rule_1 = Rule(or_op, right_hand_1)
+
+    and_op = AndOperator(right_hand_1, in_3)
+    right_hand_2 = Fact('rh_2', 0.0)
+    rule_2 = Rule(and_op, right_hand_2)
+
+    def test_plan_structure(self):
+        """
+        Test the structure of the plan
+        """
+        plan = IslandPlan.from_island(KnowledgeIsland([self.rule_1, self.rule_2]))
+
+        assert plan.nodes == [self.in_1, self.in_2, self.in_3, self.right_hand_1, self.right_hand_2, self.not_op, self.or_op, self.and_op]
+        assert [step[0] for step in plan.steps] == ['fact', 'fact', 'fact', 'consequent', 'consequent', 'operator', 'operator', 'implication', 'operator', 'implication']
+        assert plan.layout()[0] == [0, 1, 2, 3, 4, 5, 6, 7]
+        assert plan.layout({7: 1, 9: 1})[0] == [0, 1, 2, 3, 4, 5, 6, 8]
+
+    def test_plan_reuse(self):
+        """
+        Test the plan is shared by every model and renewed when the island changes
+        """
+        island = KnowledgeIsland([self.rule_1])
+        plan = IslandPlan.from_island(island)
+
+        for builder in [BuilderImpl, BuilderFuzzy, BuilderBayes]:
+            builder.build_island(island)
+            assert IslandPlan.from_island(island) is plan
+
+        island.rules = [self.rule_1, self.rule_2]
+        assert IslandPlan.from_island(island) is not plan
+
+    def test_plan_instantiation(self):
+        """
+        Test every model instantiates the plan with its own wires
+        """
+        island = KnowledgeIsland([self.rule_1, self.rule_2])
+
+        routine, elements = BuilderImpl.build_island(island)
+        assert routine.arity == 10
+        assert elements[self.and_op] == 8
+
+        routine, elements = BuilderBayes.build_island(island)
+        assert routine.arity == 8
+        assert elements[self.and_op] == 7
@@ -0,0 +1,362 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the local noisy simulators
+"""
+
+import pytest
+import numpy as np
+from neasqc_qrbs.backends import describe, get_backend, tag_qpu
+from neasqc_qrbs.classical import BddQPU
+from neasqc_qrbs.compiler import compile_island
+from neasqc_qrbs.knowledge_rep import AndOperator, BuilderBayes, BuilderFuzzy, BuilderImpl, Fact, KnowledgeIsland, NotOperator, OrOperator, Rule
+from neasqc_qrbs.noise import DensityMatrixSimulator, NoiseModel, TrajectorySimulator, analytic_error_report, noise_sweep, propagate_noise, superoperator
+from neasqc_qrbs.qrbs import MyQlmQPU, QRBS
+from qat.lang.AQASM import Program, CNOT, CSIGN, H, RY, X
+from qat.qpus import PyLinalg
+from qat.pbo import PatternManager
+from qat.plugins import KAKCompression
+from qat.synthopline.compiler import EXPANSION_COLLECTION
+import neasqc_qrbs.noise
+from helpers import chained_system, distribution
+
+
+class TestNoiseModel:
+    """
+    Testing the noise model read from hardware configurations
+    """
+
+    def test_from_config(self):
+        """
+        Test active channels take the configured values or the defaults of noisy_hw_model
+        """
+        model = NoiseModel.from_config({
+            't_gate_1qb': None,
+            't_gate_2qbs': 500,
+            'depol_channel': {'active': True, 'error_gate_1qb': 1e-3, 'error_gate_2qbs': None},
+            'idle': {'amplitude_damping': True, 'dephasing_channel': False, 't1': 1e5, 't2': 1e4},
+            'meas': {'active': True, 'readout_error': 0.02}
+        })
+        assert (model.t_gate_1qb, model.t_gate_2qbs) == (35, 500)
+        assert (model.error_gate_1qb, model.error_gate_2qbs) == (1e-3, 7.741e-3)
+        assert (model.t1, model.t2) == (1e5, None)
+        assert model.readout_error == 0.02
+        assert model.depolarization(1) == pytest.approx(2e-3)
+
+    def test_inactive_channels(self):
+        """
+        Test inactive channels are not modelled
+        """
+        model = NoiseModel.from_config({
+            'depol_channel': {'active': False, 'error_gate_1qb': 1e-3, 'error_gate_2qbs': 1e-2},
+            'idle': {'amplitude_damping': False, 'dephasing_channel': True, 't1': 1e5, 't2': 1e4},
+            'meas': {'active': False, 'readout_error': 0.02}
+        })
+        assert model.depolarization(1) == model.depolarization(2) == 0.0
+        assert model.t1 is None and model.t2 is None
+        assert model.readout_error == 0.0
+        assert model.idle_decay(1e3) == (0.0, 1.0)
+
+    def test_idle_kraus(self):
+        """
+        Test the Kraus operators of idle qubits give their decay
+        """
+        model = NoiseModel(t1=1e3, t2=8e2)
+        damping, coherence = model.idle_decay(500)
+        channel = superoperator(model.idle_kraus(500))
+        assert channel[0, 3] == pytest.approx(damping)
+        assert channel[3, 3] == pytest.approx(1.0 - damping)
+        assert channel[1, 1] == pytest.approx(np.sqrt(1.0 - damping) * coherence)
+
+    @pytest.mark.parametrize('simulator', [DensityMatrixSimulator, TrajectorySimulator])
+    def test_dephasing_only(self, simulator):
+        """
+        Test idle qubits dephase without a time T1
+        """
+        prog = Program()
+        qbits = prog.qalloc(2)
+        prog.apply(H, qbits[0])
+        for _ in range(200):
+            prog.apply(X, qbits[1])
+        prog.apply(CSIGN, qbits[1], qbits[0])
+        prog.apply(H, qbits[0])
+        circuit = prog.to_circ()
+
+        noise = NoiseModel(t_gate_1qb=4, t2=800.0)
+        # The first qubit is idle from its first gate to the controlled one
+        expected = (1 + np.exp(-796 / 800)) / 2
+        qpu = simulator(noise, seed=5) if simulator is DensityMatrixSimulator else simulator(noise, n_samples=4000, seed=5)
+        assert distribution(circuit, qpu, [0])[0] == pytest.approx(expected, abs=0.03)
+
+
+class TestDensityMatrixSimulator:
+    """
+    Testing the density matrix simulator
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+
+    right_hand = Fact('rh', 0.5)
+    rule = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), in_3), right_hand, 0.9)
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_noiseless(self, builder):
+        """
+        Test circuits without noise give the distribution of the state vector simulator
+        """
+        circuit, elements, _ = compile_island(KnowledgeIsland([self.rule]), builder)
+        qubits = [elements[self.right_hand], elements[self.in_1]]
+        for measured in [None, qubits]:
+            expected = distribution(circuit, PyLinalg(), measured)
+            result = distribution(circuit, DensityMatrixSimulator(), measured)
+            for state in set(expected) | set(result):
+                assert result.get(state, 0.0) == pytest.approx(expected.get(state, 0.0))
+
+    def test_gate_noise(self):
+        """
+        Test the depolarizing channel of the gates and the readout error
+        """
+        prog = Program()
+        qbits = prog.qalloc(2)
+        prog.apply(X, qbits[0])
+        prog.apply(CNOT, qbits[0], qbits[1])
+        circuit = prog.to_circ()
+
+        depolarized = distribution(circuit, DensityMatrixSimulator(NoiseModel(error_gate_1qb=0.01, error_gate_2qbs=0.03)))
+        # The 1-qubit fraction, 0.02, leaves half its weight in state 1, and the 2-qubit fraction, 0.04, spreads evenly over the four states
+        assert depolarized[0b11] == pytest.approx(0.99 * 0.96 + 0.01)
+        assert depolarized[0b00] == pytest.approx(0.01 * 0.96 + 0.01)
+        assert sum(depolarized.values()) == pytest.approx(1.0)
+
+        flipped = distribution(circuit, DensityMatrixSimulator(NoiseModel(readout_error=0.1)), [1])
+        assert flipped == pytest.approx({0: 0.1, 1: 0.9})
+
+    def test_idle_noise(self):
+        """
+        Test idle qubits decay while the other qubits are busy
+        """
+        prog = Program()
+        qbits = prog.qalloc(2)
+        prog.apply(X, qbits[0])
+        prog.apply(H, qbits[1])
+        prog.apply(X, qbits[1])
+        prog.apply(X, qbits[1])
+        circuit = prog.to_circ()
+
+        result = distribution(circuit, DensityMatrixSimulator(NoiseModel(t_gate_1qb=100, t1=1000.0)), [0])
+        assert result[1] == pytest.approx(np.exp(-0.2))
+
+    def test_shots(self):
+        """
+        Test sampled executions are reproducible with a seed
+        """
+        circuit, _, _ = compile_island(KnowledgeIsland([self.rule]), BuilderFuzzy)
+        noise = NoiseModel(error_gate_1qb=1e-3, error_gate_2qbs=1e-2)
+        job = circuit.to_job(nbshots=500)
+        first = {sample.state.int: sample.probability for sample in DensityMatrixSimulator(noise, seed=7).submit(job)}
+        second = {sample.state.int: sample.probability for sample in DensityMatrixSimulator(noise, seed=7).submit(job)}
+        assert first == second
+        assert sum(first.values()) == pytest.approx(1.0)
+        assert all(probability * 500 == pytest.approx(round(probability * 500)) for probability in first.values())
+
+    def test_noisy_execution(self):
+        """
+        Test the execution of a QRBS on a tagged noisy simulator
+        """
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        _ = system.assert_island([system.assert_rule(NotOperator(precedent), consequent, 1.0)])
+
+        qpu = tag_qpu(DensityMatrixSimulator(NoiseModel(readout_error=0.5)), 'noisy_local')
+        assert describe(qpu) is get_backend('noisy_local')
+        MyQlmQPU.execute(system, qpu=qpu)
+        assert consequent.precision == pytest.approx(0.5, abs=0.05)
+
+    def test_unsupported_operation(self):
+        """
+        Test operations without a matrix cannot be simulated
+        """
+        prog = Program()
+        qbits = prog.qalloc(1)
+        cbits = prog.calloc(1)
+        prog.measure(qbits[0], cbits[0])
+        with pytest.raises(ValueError) as ex_info:
+            DensityMatrixSimulator().probabilities(prog.to_circ())
+        assert ex_info.match(r'.*Operation cannot be simulated.*')
+
+
+class TestTrajectorySimulator:
+    """
+    Testing the trajectory simulator
+    """
+    noise = NoiseModel(error_gate_1qb=0.02, error_gate_2qbs=0.08, t1=2000.0, t2=1500.0, readout_error=0.02)
+
+    @staticmethod
+    def circuit():
+        """
+        Circuit with gates of one and two qubits and idle qubits
+        """
+        prog = Program()
+        qbits = prog.qalloc(4)
+        prog.apply(H, qbits[0])
+        prog.apply(CNOT, qbits[0], qbits[1])
+        prog.apply(RY(0.7), qbits[2])
+        prog.apply(CNOT, qbits[2], qbits[3])
+        prog.apply(X, qbits[3])
+        prog.apply(CNOT, qbits[1], qbits[2])
+        return prog.to_circ()
+
+    def test_density_matrix(self):
+        """
+        Test the average over trajectories gives the distribution of the density matrix simulator
+        """
+        circuit = self.circuit()
+        expected = DensityMatrixSimulator(self.noise).probabilities(circuit, [0, 2, 3])
+        result = TrajectorySimulator(self.noise, n_samples=2000, seed=3).probabilities(circuit, [0, 2, 3])
+        assert result.sum() == pytest.approx(1.0)
+        assert np.abs(result - expected).max() < 0.02
+
+    def test_workers(self):
+        """
+        Test trajectories split among processes are reproducible with a seed
+        """
+        circuit = self.circuit()
+        first = TrajectorySimulator(self.noise, n_samples=300, workers=2, seed=11).probabilities(circuit)
+        second = TrajectorySimulator(self.noise, n_samples=300, workers=2, seed=11).probabilities(circuit)
+        assert np.array_equal(first, second)
+        assert first.sum() == pytest.approx(1.0)
+        expected = DensityMatrixSimulator(self.noise).probabilities(circuit)
+        assert np.abs(first - expected).max() < 0.05
+
+    def test_noisy_execution(self):
+        """
+        Test the execution of a QRBS on the trajectory simulator
+        """
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        _ = system.assert_island([system.assert_rule(NotOperator(precedent), consequent, 1.0)])
+
+        qpu = TrajectorySimulator(NoiseModel(error_gate_1qb=1e-3, error_gate_2qbs=1e-2), n_samples=100, seed=5)
+        assert describe(qpu) is get_backend('noisy_local_stochastic')
+        MyQlmQPU.execute(system, qpu=qpu)
+        assert consequent.precision == pytest.approx(0.07, abs=0.05)
+
+
+class TestNoiseSweep:
+    """
+    Testing the sweep of noise models
+    """
+    noises = [NoiseModel(), NoiseModel(error_gate_1qb=1e-3, error_gate_2qbs=1e-2), NoiseModel(error_gate_1qb=1e-2, error_gate_2qbs=5e-2, t1=5e4, t2=4e4, readout_error=0.02)]
+
+    def test_sweep(self):
+        """
+        Test the table of precisions of the consequents under each noise model
+        """
+        system, middle, consequent = chained_system()
+        rows = noise_sweep(system, self.noises)
+        assert [(row['point'], row['island'], row['fact']) for row in rows] == [(point, island, fact) for point in range(3) for island, fact in enumerate(['middle', 'consequent'])]
+        assert rows[5]['error_gate_2qbs'] == 5e-2 and rows[5]['t1'] == 5e4
+        assert middle.precision == consequent.precision == 0.0
+
+        BddQPU.execute(system)
+        assert rows[0]['precision'] == pytest.approx(middle.precision)
+        assert rows[1]['precision'] == pytest.approx(consequent.precision)
+        assert rows[5]['precision'] < rows[3]['precision'] < rows[1]['precision']
+
+    def test_compiled_once(self, monkeypatch):
+        """
+        Test knowledge islands are only compiled again when the precision of their facts changes
+        """
+        calls = []
+
+        def counted(*args):
+            calls.append(args[0])
+            return compile_island(*args)
+
+        monkeypatch.setattr(neasqc_qrbs.noise, 'compile_island', counted)
+        system, _, _ = chained_system()
+        noise_sweep(system, self.noises)
+        # The first island is compiled once, the second one for each precision of its intermediate fact
+        assert len(calls) == 4
+        assert calls.count(system._engine._islands[0]) == 1
+
+    def test_plugins(self):
+        """
+        Test circuits are transpiled by the plugins of the QPU
+        """
+        system, _, _ = chained_system()
+        qpu = KAKCompression(decomposition='ZYZ') | PatternManager(collections=[EXPANSION_COLLECTION]) | DensityMatrixSimulator()
+        transpiled = noise_sweep(system, self.noises, qpu=qpu)
+        expected = noise_sweep(system, self.noises)
+        assert [row['precision'] for row in transpiled[:2]] == pytest.approx([row['precision'] for row in expected[:2]], abs=1e-6)
+        # The Toffolis are expanded into more gates, so they accumulate more noise
+        assert all(row['precision'] < other['precision'] for row, other in zip(transpiled[2:], expected[2:]))
+        assert qpu.qpu.noise.error_gate_1qb == 0.0
+
+    def test_unsupported_qpu(self):
+        """
+        Test QPUs without a noise model cannot be swept
+        """
+        system, _, _ = chained_system()
+        with pytest.raises(ValueError) as ex_info:
+            noise_sweep(system, self.noises, qpu=PyLinalg())
+        assert ex_info.match(r'.*The QPU does not simulate a noise model.*')
+
+
+class TestPropagateNoise:
+    """
+    Testing the analytic propagation of noise
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    in_3 = Fact('lh_3', 0.5, 0.6)
+
+    right_hand = Fact('rh', 0.5)
+    rule = Rule(OrOperator(AndOperator(in_1, NotOperator(in_2)), in_3), right_hand, 0.9)
+    noise = NoiseModel(error_gate_1qb=1e-2, error_gate_2qbs=5e-2, t1=5e4, t2=4e4, readout_error=0.02)
+
+    @pytest.mark.parametrize('builder', [BuilderImpl, BuilderFuzzy, BuilderBayes])
+    def test_density_matrix(self, builder):
+        """
+        Test the noise propagated through the classical logic of knowledge islands gives the distribution of the density matrix simulator
+        """
+        circuit, elements, _ = compile_island(KnowledgeIsland([self.rule]), builder)
+        qubits = [elements[self.right_hand], elements[self.in_1]]
+        expected = DensityMatrixSimulator(self.noise).probabilities(circuit, qubits)
+        assert propagate_noise(circuit, self.noise, qubits) == pytest.approx(expected)
+
+    def test_analytic_sweep(self):
+        """
+        Test analytic sweeps do not need a simulator
+        """
+        system, _, _ = chained_system()
+        noises = [NoiseModel(), self.noise]
+        rows = noise_sweep(system, noises, qpu=PyLinalg(), analytic=True)
+        assert [row['precision'] for row in rows] == pytest.approx([row['precision'] for row in noise_sweep(system, noises)])
+
+    def test_analytic_shots(self):
+        """
+        Test analytic sweeps with shots are reproduced by their seed
+        """
+        system, _, _ = chained_system()
+        noises = [NoiseModel(), self.noise]
+        rows = noise_sweep(system, noises, shots=100, analytic=True, seed=7)
+        assert rows == noise_sweep(system, noises, shots=100, analytic=True, seed=7)
+
+    def test_error_report(self):
+        """
+        Test the error of the analytic propagation against the simulation of transpiled circuits
+        """
+        system, _, _ = chained_system()
+        noises = [NoiseModel(), self.noise]
+        report = analytic_error_report(system, noises)
+        assert max(row['error'] for row in report) < 1e-9
+
+        qpu = KAKCompression(decomposition='ZYZ') | PatternManager(collections=[EXPANSION_COLLECTION]) | DensityMatrixSimulator()
+        report = analytic_error_report(system, noises, qpu=qpu)
+        assert [row['error'] for row in report[:2]] == pytest.approx([0.0, 0.0], abs=1e-6)
+        # The gates expanding the Toffolis add noise the logical circuits do not have
+        assert all(0.0 < row['error'] < 0.1 for row in report[2:])
@@ -0,0 +1,168 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the backend planner
+"""
+
+import pytest
+from neasqc_qrbs.knowledge_rep import AndOperator, Fact, KnowledgeIsland, NotOperator, OrOperator, Rule
+import neasqc_qrbs.planner
+from neasqc_qrbs.planner import BDD_VARIABLES, PlannedQPU, estimate_island, explain_plan, plan_islands
+from neasqc_qrbs.classical import BddQPU, island_bdd
+from neasqc_qrbs.qrbs import QRBS
+from qat.qpus import PyLinalg
+
+
+def wide_system(facts):
+    """
+    QRBS with a single knowledge island whose circuit has about three qubits per fact
+    """
+    system = QRBS()
+    inputs = [system.assert_fact('fact_{}'.format(n), 0.8, 0.5) for n in range(facts)]
+    left_hand = inputs[0]
+    for fact in inputs[1:]:
+        left_hand = OrOperator(left_hand, AndOperator(fact, NotOperator(inputs[0])))
+    consequent = system.assert_fact('consequent', 0.3)
+    _ = system.assert_island([system.assert_rule(left_hand, consequent, 1.0)])
+    return system, consequent
+
+
+class TestPlanner:
+    """
+    Testing the planning of the execution of knowledge islands
+    """
+    in_1 = Fact('lh_1', 1.0, 0.8)
+    in_2 = Fact('lh_2', 0.7, 0.3)
+    right_hand = Fact('rh', 0.0)
+
+    def test_estimate(self):
+        """
+        Test the estimate of a knowledge island
+        """
+        estimate = estimate_island(KnowledgeIsland([Rule(AndOperator(self.in_1, self.in_2), self.right_hand, 0.7)]))
+
+        assert estimate['qubits'] == 5
+        assert estimate['tensors'] == 5
+        assert estimate['width'] == 3
+        assert estimate['cutwidth'] >= 1
+        assert estimate['gates'] > 0 and estimate['depth'] > 0
+        assert estimate['variables'] == 3
+        assert estimate['nodes'] == len(island_bdd(KnowledgeIsland([Rule(AndOperator(self.in_1, self.in_2), self.right_hand, 0.7)]))[0])
+
+    def test_diagram_bound(self):
+        """
+        Test the nodes of the diagrams of knowledge islands with too many variables are bounded instead of counted
+        """
+        system, _ = wide_system(BDD_VARIABLES)
+        estimate = estimate_island(system._engine._islands[0])
+
+        assert estimate['variables'] == BDD_VARIABLES + 1
+        assert estimate['nodes'] >= 2 ** estimate['variables']
+
+    def test_circuit_backends(self):
+        """
+        Test small knowledge islands are planned on the cheapest circuit simulator
+        """
+        system, _ = wide_system(3)
+        plan = plan_islands(system, backends=['python', 'c'])
+
+        assert plan[0]['backend'] == 'c'
+        assert plan[0]['candidates']['python'] > plan[0]['candidates']['c'] == plan[0]['cost']
+
+    def test_wide_island(self):
+        """
+        Test knowledge islands too wide for the circuit simulators are planned on classical engines
+        """
+        system, _ = wide_system(20)
+        plan = plan_islands(system, backends=['python', 'c', 'tensor_network', 'monte_carlo'])
+
+        assert plan[0]['backend'] == 'tensor_network'
+        assert plan[0]['candidates']['python'] == 'requires {} qubits, more than 20'.format(plan[0]['estimate']['qubits'])
+        assert plan[0]['candidates']['monte_carlo'] == 'is not exact'
+        assert plan_islands(system, backends=['python', 'monte_carlo'], exact=False)[0]['backend'] == 'monte_carlo'
+        assert 'tensor_network' in explain_plan(plan)
+
+    def test_diagram_backend(self):
+        """
+        Test knowledge islands with small diagrams are planned on binary decision diagrams
+        """
+        system, _ = wide_system(20)
+        plan = plan_islands(system, backends=['bdd', 'tensor_network'])
+
+        assert plan[0]['backend'] == 'bdd'
+        assert plan[0]['candidates']['bdd'] < plan[0]['candidates']['tensor_network']
+
+    def test_discarded_backends(self):
+        """
+        Test the reasons backends are discarded
+        """
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        other = system.assert_fact('other', 0.8, 0.4)
+        middle = system.assert_fact('middle', 0.5)
+        rules = [system.assert_rule(precedent, middle, 0.5), system.assert_rule(middle, consequent, 0.5), system.assert_rule(NotOperator(other), middle, 0.5)]
+        _ = system.assert_island(rules)
+        plan = plan_islands(system, model='bayes', backends=['bdd', 'tensor_network', 'noisy_deterministic'])
+
+        assert plan[0]['backend'] == 'tensor_network'
+        assert plan[0]['candidates']['bdd'].endswith('cannot be represented classically in the bayesian model')
+        assert plan[0]['candidates']['noisy_deterministic'] == 'adds noise'
+
+    def test_failed_plan(self):
+        """
+        Test the failed planning of knowledge islands no backend can execute
+        """
+        system, _ = wide_system(20)
+        with pytest.raises(ValueError) as ex_info:
+            plan_islands(system, backends=['python'])
+        assert ex_info.match(r'.*No backend can execute a KnowledgeIsland.*')
+
+
+class TestPlannedQPU:
+    """
+    Testing PlannedQPU execution
+    """
+
+    def test_successful_default(self):
+        """
+        Test the planned execution gives the exact precisions
+        """
+        system, consequent = wide_system(3)
+        BddQPU.execute(system)
+        expected = consequent.precision
+        consequent.precision = 0.3
+
+        reports = PlannedQPU.execute(system, backends=['python', 'tensor_network'])
+        assert consequent.precision == pytest.approx(expected)
+        assert reports[0]['plan']['backend'] == 'tensor_network'
+
+    def test_single_plan(self, monkeypatch):
+        """
+        Test the knowledge islands are planned once per execution
+        """
+        system, _ = wide_system(3)
+        plans = []
+        plan = neasqc_qrbs.planner.plan_islands
+        monkeypatch.setattr(neasqc_qrbs.planner, 'plan_islands', lambda *args, **kwargs: plans.append(args) or plan(*args, **kwargs))
+
+        PlannedQPU.execute(system, backends=['python'])
+        assert len(plans) == 1
+
+    def test_provided_qpu(self):
+        """
+        Test the execution on a QPU provided for a backend
+        """
+        system, _ = wide_system(3)
+        reports = PlannedQPU.execute(system, backends=['ideal'], qpus={'ideal': PyLinalg()})
+        assert reports[0]['plan']['backend'] == 'ideal'
+        assert reports[0]['qubits'] == 10
+
+    def test_failed_evaluation(self):
+        """
+        Test the failed evaluation of knowledge islands no backend can execute
+        """
+        system, _ = wide_system(3)
+        with pytest.raises(ValueError) as ex_info:
+            PlannedQPU.evaluate(system, backends=['python'], noisy=True)
+        assert ex_info.match(r'.*No backend can execute a KnowledgeIsland.*')
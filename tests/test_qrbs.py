@@ -5,9 +5,13 @@ Test for QRBS
 """
 
 import random
+import numpy as np
 import pytest
-from neasqc_qrbs.knowledge_rep import Fact, NotOperator, AndOperator, OrOperator, Rule, KnowledgeIsland
-from neasqc_qrbs.qrbs import MyQlmQPU, WorkingMemory, InferenceEngine, QRBS
+from neasqc_qrbs.backends import get_backend
+from neasqc_qrbs.sampling import AdaptiveShots, ExactProbabilities, ShotBudget, sampling_strategy
+from neasqc_qrbs.knowledge_rep import BuilderImpl, Fact, NotOperator, AndOperator, OrOperator, Rule, KnowledgeIsland
+from neasqc_qrbs.qrbs import MyQlmQPU, WorkingMemory, InferenceEngine, QRBS, execute_batches, prepared_precision
+from qat.qpus import PyLinalg
 
 
 class TestWorkingMemory:
@@ -290,6 +294,107 @@ class TestExecution:
         MyQlmQPU.execute(system, [island])
         assert consequent.precision == 1.0
 
+    def test_adaptive_shots(self):
+        """
+        Test the execution submitting shots in rounds until the consequents are known within a tolerance
+        """
+        np.random.seed(11)
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        other = system.assert_fact('other', 0.8, 0.5)
+        uncertain = system.assert_fact('uncertain', 0.3)
+        _ = system.assert_island([system.assert_rule(precedent, consequent, 1.0)])
+        _ = system.assert_island([system.assert_rule(other, uncertain, 1.0)])
+
+        reports = MyQlmQPU.execute(system, shots=AdaptiveShots(128, tolerance=0.02))
+        assert consequent.precision == 1.0
+        assert uncertain.precision == pytest.approx(0.5, abs=0.05)
+        assert reports[0]['shots']['shots'] < reports[1]['shots']['shots'] <= 8192
+        estimate, low, high = reports[1]['shots']['intervals']['uncertain']
+        assert low <= estimate <= high and (high - low) / 2 <= 0.02
+
+    def test_shot_budget(self):
+        """
+        Test the execution splitting a budget of shots among the knowledge islands from pilot shots
+        """
+        np.random.seed(11)
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        other = system.assert_fact('other', 0.8, 0.5)
+        uncertain = system.assert_fact('uncertain', 0.3)
+        last = system.assert_fact('last', 0.2, 0.7)
+        fed = system.assert_fact('fed', 0.3)
+        _ = system.assert_island([system.assert_rule(precedent, consequent, 1.0)])
+        _ = system.assert_island([system.assert_rule(other, uncertain, 1.0)])
+        _ = system.assert_island([system.assert_rule(AndOperator(uncertain, last), fed, 1.0)])
+
+        reports = MyQlmQPU.execute(system, shots=ShotBudget(6000, 128))
+        shots = [report['shots']['shots'] for report in reports]
+        # The pilot of the fed knowledge island is discarded
+        assert sum(shots) + 128 == 6000
+        assert shots[0] == 128 < min(shots[1:])
+        assert consequent.precision == 1.0
+        _, low, high = reports[1]['shots']['intervals']['uncertain']
+        assert low < 0.5 < high
+
+        reports = MyQlmQPU.execute(system, shots=ShotBudget(6000, 128, weights={'fed': 1.0}))
+        assert [report['shots']['shots'] for report in reports] == [128, 128, 5616]
+        with pytest.raises(ValueError) as ex_info:
+            MyQlmQPU.execute(system, shots=ShotBudget(300, 128))
+        assert ex_info.match(r'.*The shot budget does not cover the minimum shots.*')
+
+    def test_exact(self, monkeypatch):
+        """
+        Test the exact execution reduces the state vector of PyLinalg, without sampling it
+        """
+        system = QRBS()
+        inputs = [system.assert_fact('fact_{}'.format(n), 0.8, 0.4 + 0.2 * n) for n in range(3)]
+        middle = system.assert_fact('middle', 0.3)
+        consequent = system.assert_fact('consequent', 0.3)
+        _ = system.assert_island([system.assert_rule(AndOperator(inputs[0], NotOperator(inputs[1])), middle, 0.9)])
+        _ = system.assert_island([system.assert_rule(OrOperator(middle, inputs[2]), consequent, 0.7)])
+        # Other QPUs give the marginals as samples
+        MyQlmQPU.execute(system, qpu='c', shots=0)
+        sampled = [middle.precision, consequent.precision]
+
+        monkeypatch.setattr(PyLinalg, 'submit', lambda *_: pytest.fail('The state vector was sampled'))
+        for _ in range(2):
+            middle.precision, consequent.precision = 0.3, 0.3
+            MyQlmQPU.execute(system, shots=ExactProbabilities())
+            assert [middle.precision, consequent.precision] == pytest.approx(sampled)
+        with pytest.raises(ValueError) as ex_info:
+            MyQlmQPU.execute(system, shots=AdaptiveShots(0, tolerance=0.01))
+        assert ex_info.match(r'.*Adaptive shots need a first round of shots.*')
+
+    def test_joint(self):
+        """
+        Test the joint distribution of the consequents of a knowledge island is kept for later queries
+        """
+        np.random.seed(11)
+        system = QRBS()
+        first = system.assert_fact('first', 0.8, 0.7)
+        second = system.assert_fact('second', 0.8, 0.6)
+        third = system.assert_fact('third', 0.8, 0.5)
+        middle = system.assert_fact('middle', 0.0)
+        last = system.assert_fact('last', 0.0)
+        _ = system.assert_island([system.assert_rule(AndOperator(first, second), middle, 1.0),
+                                  system.assert_rule(AndOperator(middle, NotOperator(third)), last, 1.0)])
+
+        distribution = MyQlmQPU.execute(system, shots=ExactProbabilities(), joint=True)[0]['joint']
+        assert distribution.probabilities.shape == (2, 2)
+        assert distribution.marginal(last) == pytest.approx(np.sin(last.precision * np.pi / 2) ** 2)
+        # The last consequent requires the middle one
+        assert distribution.probability({middle: False, 'last': True}) == pytest.approx(0.0)
+        assert distribution.probability({'middle': True, last: False}) == pytest.approx(distribution.marginal(middle) - distribution.marginal(last))
+        assert distribution.argmax()[0] is middle
+
+        sampled = MyQlmQPU.execute(system, shots=1000, joint=True)[0]['joint']
+        assert sampled.probabilities.sum() == pytest.approx(1.0)
+        assert sampled.probability({middle: False, last: True}) == 0.0
+        assert sampled.marginal(last) == pytest.approx(distribution.marginal(last), abs=0.05)
+
     def test_failed_specified_evaluation(self):
         """
         Test the failed specified evaluation
@@ -563,4 +668,92 @@ class TestExecutionBayes:
         with pytest.raises(ValueError) as ex_info:
             MyQlmQPU.execute(system_2, [island_1], model='bayes')
         assert ex_info.match(r'.*A specified KnowledgeIsland is not part of the QRBS.*')
-        
\ No newline at end of file
+        
+
+class TestExecutionPasses:
+    """
+    Testing MyQlmQPU execution with compilation passes
+    """
+
+    def test_successful_schedule(self):
+        """
+        Test the successful execution of a scheduled circuit
+        """
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequent = system.assert_fact('consequent', 0.3)
+        implication = system.assert_rule(precedent, consequent, 1.0)
+        _ = system.assert_island([implication])
+
+        reports = MyQlmQPU.execute(system, passes=['schedule'])
+        assert consequent.precision == 1.0
+        assert reports == [{'qubits': 3, 'gates': 3, 'depth': 2}]
+
+
+class TestExecutionCut:
+    """
+    Testing MyQlmQPU execution of cut knowledge islands
+    """
+
+    def test_successful_cut(self):
+        """
+        Test the successful execution of a knowledge island surpassing the capacity of the QPU
+        """
+        FACTS = 20
+        system = QRBS()
+        facts = [system.assert_fact('fact_{}'.format(n), random.random()) for n in range(FACTS)]
+        facts[0].precision = 1.0
+        rules = [system.assert_rule(facts[i], facts[i+1], 1.0) for i in range(FACTS - 1)]
+        _ = system.assert_island(rules)
+
+        assert MyQlmQPU.evaluate(system, cut=True)
+        reports = MyQlmQPU.execute(system, cut=True)
+        assert all(fact.precision == 1.0 for fact in facts)
+        assert all(report['qubits'] <= get_backend(MyQlmQPU.BACKEND).max_arity for report in reports[0]['subcircuits'])
+        assert reports[0]['cut']['islands'] == len(reports[0]['subcircuits']) > 1
+        assert reports[0]['cut']['correlated'] == []
+
+
+class TestExecutionPack:
+    """
+    Testing MyQlmQPU execution of packed knowledge islands
+    """
+
+    def test_successful_pack(self):
+        """
+        Test the successful execution of knowledge islands packed in the same circuits
+        """
+        system = QRBS()
+        precedent = system.assert_fact('precedent', 0.8, 1.0)
+        consequents = [system.assert_fact('consequent_{}'.format(n), 0.3) for n in range(3)]
+        rules = [system.assert_rule(precedent, consequents[0], 1.0), system.assert_rule(precedent, consequents[1], 1.0),
+                 system.assert_rule(consequents[0], consequents[2], 1.0)]
+        _ = [system.assert_island([rule]) for rule in rules]
+
+        reports = MyQlmQPU.execute(system, pack=True)
+        assert all(consequent.precision == 1.0 for consequent in consequents)
+        assert [report['pack'] for report in reports] == [{'job': 0, 'offset': 0}, {'job': 0, 'offset': 3}, {'job': 1, 'offset': 0}]
+
+
+class TestExecuteBatches:
+    """
+    Testing the execution of batches of knowledge islands shared by the QPUs
+    """
+
+    def test_precision(self):
+        """
+        Test the precision written to the facts, fed forward through a cut knowledge island with the one reproducing their probability
+        """
+        FACTS = 20
+        system = QRBS()
+        facts = [system.assert_fact('fact_{}'.format(n), 0.0) for n in range(FACTS)]
+        facts[0].precision = 1/3
+        rules = [system.assert_rule(facts[i], facts[i+1], 1.0) for i in range(FACTS - 1)]
+        island = system.assert_island(rules)
+        backend = get_backend(MyQlmQPU.BACKEND)
+
+        reports = execute_batches(system, [island], BuilderImpl, backend, backend.shared(), sampling_strategy(0), cut=True, precision=lambda probability: probability)
+        assert len(reports[0]['subcircuits']) > 1
+        assert [fact.precision for fact in facts[1:]] == pytest.approx([0.25] * (FACTS - 1))
+        reports = execute_batches(system, [island], BuilderImpl, backend, backend.shared(), sampling_strategy(0), cut=True)
+        assert [fact.precision for fact in facts[1:]] == pytest.approx([prepared_precision(0.25)] * (FACTS - 1))
@@ -0,0 +1,275 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the sampling of the circuits of knowledge islands
+"""
+
+import pytest
+from neasqc_qrbs.backends import describe, get_backend
+from neasqc_qrbs.knowledge_rep import AndOperator, Fact, KnowledgeIsland, Rule
+from neasqc_qrbs.qrbs import MyQlmQPU, QRBS
+from neasqc_qrbs.sampling import AdaptiveShots, ExactProbabilities, FixedShots, JointDistribution, ShotBudget, ShotEmulator, adaptive_submit, allocate_shots, exact_marginals, fed_batches, marginal, sampling_strategy, wilson_interval
+from qat.lang.AQASM import Program, H, RY, X
+from qat.qpus import PyLinalg
+import numpy as np
+
+
+class TestAdaptiveShots:
+    """
+    Testing the submission of shots in rounds
+    """
+
+    @staticmethod
+    def circuit():
+        """
+        Circuit with a qubit always measured as 1 and a qubit measured as 1 with probability 0.5
+        """
+        prog = Program()
+        qbits = prog.qalloc(3)
+        prog.apply(X, qbits[0])
+        prog.apply(H, qbits[1])
+        prog.apply(RY(0.3), qbits[2])
+        return prog.to_circ()
+
+    def test_wilson_interval(self):
+        """
+        Test the intervals contain the estimate and shrink with the samples
+        """
+        estimate, low, high = wilson_interval(30, 100)
+        assert estimate == 0.3 and low < 0.3 < high
+        assert wilson_interval(300, 1000)[2] - wilson_interval(300, 1000)[1] < high - low
+        assert wilson_interval(0, 100)[:2] == (0.0, 0.0)
+        assert wilson_interval(30, 100, 0.99)[1] < low
+
+    def test_tolerance(self):
+        """
+        Test qubits near 0 or 1 converge in fewer shots than those near 0.5
+        """
+        np.random.seed(11)
+        circuit = self.circuit()
+        frequencies, report = adaptive_submit(PyLinalg(), circuit.to_job(nbshots=128), [0], tolerance=0.01)
+        assert report['shots'] < 1024
+        assert report['intervals'][0][0] == 1.0 and report['intervals'][0][2] - report['intervals'][0][1] <= 0.02
+        assert sum(frequencies.values()) == pytest.approx(1.0)
+
+        _, report = adaptive_submit(PyLinalg(), circuit.to_job(nbshots=128), [0, 1], tolerance=0.02, budget=100000)
+        assert report['shots'] > 1024 and report['rounds'] > 1
+        assert all((high - low) / 2 <= 0.02 for _, low, high in report['intervals'].values())
+
+    def test_budget(self):
+        """
+        Test the shots never exceed the budget
+        """
+        np.random.seed(11)
+        _, report = adaptive_submit(PyLinalg(), self.circuit().to_job(nbshots=100), [1, 2], tolerance=0.001, budget=1000)
+        assert report['shots'] == 1000
+        assert report['intervals'][1][1] < 0.5 < report['intervals'][1][2]
+
+
+class TestAllocateShots:
+    """
+    Testing the split of a budget of shots among circuits
+    """
+    variances = [[0.25], [0.01], [0.09, 0.2]]
+
+    def test_worst(self):
+        """
+        Test circuits get shots in proportion to their largest variance, equalizing the worst variances
+        """
+        allocation = allocate_shots(self.variances, 1000)
+        assert sum(allocation) == 1000
+        assert 0.25 / allocation[0] == pytest.approx(0.01 / allocation[1], rel=0.1) == pytest.approx(0.2 / allocation[2], rel=0.1)
+
+    def test_sum(self):
+        """
+        Test circuits get shots in proportion to the square root of the sum of their variances
+        """
+        allocation = allocate_shots(self.variances, 1000, objective='sum')
+        assert sum(allocation) == 1000
+        assert allocation[0] / allocation[2] == pytest.approx(np.sqrt(0.25 / 0.29), rel=0.01)
+
+    def test_minimum(self):
+        """
+        Test circuits below their minimum keep it, and the others split the rest
+        """
+        allocation = allocate_shots(self.variances, 1000, [128, 128, 128])
+        assert sum(allocation) == 1000 and allocation[1] == 128
+        assert allocation[0] / allocation[2] == pytest.approx(0.25 / 0.2, rel=0.01)
+        with pytest.raises(ValueError) as ex_info:
+            allocate_shots(self.variances, 300, [128, 128, 128])
+        assert ex_info.match(r'.*The shot budget does not cover the minimum shots.*')
+        with pytest.raises(ValueError) as ex_info:
+            allocate_shots(self.variances, 1000, objective='mean')
+        assert ex_info.match(r'.*Unknown objective.*')
+
+
+class TestSampling:
+    """
+    Testing the strategies sampling the circuits of knowledge islands
+    """
+
+    def circuit(self):
+        """
+        Circuit with a qubit always measured as 1 and a qubit measured as 1 with probability 0.5
+        """
+        prog = Program()
+        qbits = prog.qalloc(2)
+        prog.apply(X, qbits[0])
+        prog.apply(H, qbits[1])
+        return prog.to_circ()
+
+    def test_strategy(self):
+        """
+        Test numbers of shots get the strategy of fixed shots, or of exact probabilities if 0
+        """
+        assert isinstance(sampling_strategy(0), ExactProbabilities)
+        assert sampling_strategy(100).shots == 100
+        budget = ShotBudget(1000)
+        assert sampling_strategy(budget) is budget
+        with pytest.raises(ValueError) as ex_info:
+            AdaptiveShots(0)
+        assert ex_info.match(r'.*Adaptive shots need a first round of shots.*')
+
+    def test_strategies(self):
+        """
+        Test every strategy gives the joint probabilities of the measured qubits, in their order
+        """
+        np.random.seed(11)
+        for sampling in [FixedShots(1000), AdaptiveShots(128, tolerance=0.05), ExactProbabilities()]:
+            probabilities, _ = sampling.sample(PyLinalg(), self.circuit(), [1, 0], {1: 'half'})
+            assert probabilities.shape == (2, 2)
+            assert marginal(probabilities, 1) == pytest.approx(1.0)
+            assert marginal(probabilities, 0) == pytest.approx(0.5, abs=0.1)
+
+    def test_shot_budget(self):
+        """
+        Test the pilots of circuits not fed by others are kept, adding the shots allocated to them
+        """
+        np.random.seed(11)
+        sampling = ShotBudget(1000, 100, weights={'half': 1.0})
+        for key, fed in enumerate([False, True]):
+            sampling.pilot(PyLinalg(), self.circuit(), [0, 1], {1: 'half'} if key == 0 else {0: 'one'}, key, fed)
+        sampling.allocate()
+        _, report = sampling.sample(PyLinalg(), self.circuit(), [0, 1], {1: 'half'}, 0)
+        # The discarded pilot of the fed circuit is part of the budget
+        assert report['shots'] == 899 and report['rounds'] == 2
+        assert report['intervals'][1][1] < 0.5 < report['intervals'][1][2]
+        _, report = sampling.sample(PyLinalg(), self.circuit(), [0, 1], {0: 'one'}, 1)
+        assert report['shots'] == 1 and report['rounds'] == 1
+
+    def test_fed_batches(self):
+        """
+        Test the batches with an input fact which is a consequent of another batch
+        """
+        precedent, middle, consequent = Fact('precedent', 0.8, 0.6), Fact('middle', 0.3), Fact('consequent', 0.3)
+        first = KnowledgeIsland([Rule(precedent, middle, 0.7)])
+        second = KnowledgeIsland([Rule(middle, consequent, 0.9)])
+        assert fed_batches([[first], [second]]) == [1]
+        assert fed_batches([[first, second]]) == []
+
+
+class TestShotEmulator:
+    """
+    Testing the local emulation of shots from exact probabilities
+    """
+
+    def test_exact(self):
+        """
+        Test jobs without shots give the exact probabilities of the QPU
+        """
+        circuit = TestAdaptiveShots.circuit()
+        emulator = ShotEmulator(PyLinalg())
+        expected = {sample.state.bitstring: sample.probability for sample in PyLinalg().submit(circuit.to_job(qubits=[1, 2]))}
+        result = {sample.state.bitstring: sample.probability for sample in emulator.submit(circuit.to_job(qubits=[1, 2]))}
+        assert result.keys() == expected.keys()
+        assert all(result[bits] == pytest.approx(expected[bits]) for bits in expected)
+        assert describe(emulator) is get_backend('python')
+
+    def test_shots(self):
+        """
+        Test shots are drawn reproducibly from a single simulation of each circuit
+        """
+        circuit = TestAdaptiveShots.circuit()
+        emulator = ShotEmulator(PyLinalg(), seed=7)
+        first = [{sample.state.bitstring: sample.probability for sample in emulator.submit(circuit.to_job(nbshots=shots))} for shots in [10, 100, 1000]]
+        assert emulator.simulations == 1
+        assert all(sum(frequencies.values()) == pytest.approx(1.0) for frequencies in first)
+        assert all(bits[0] == '1' for frequencies in first for bits in frequencies)
+
+        emulator.clear()
+        emulator = ShotEmulator(PyLinalg(), seed=7)
+        assert first == [{sample.state.bitstring: sample.probability for sample in emulator.submit(circuit.to_job(nbshots=shots))} for shots in [10, 100, 1000]]
+
+    def test_execution(self):
+        """
+        Test executions with several numbers of shots simulate each knowledge island once
+        """
+        system = QRBS()
+        inputs = [system.assert_fact('fact_{}'.format(n), 1.0, 0.6) for n in range(2)]
+        consequent = system.assert_fact('consequent', 0.0)
+        _ = system.assert_island([system.assert_rule(AndOperator(*inputs), consequent, 0.8)])
+        MyQlmQPU.execute(system, qpu=PyLinalg(), shots=0)
+        expected = consequent.precision
+
+        emulator = ShotEmulator(PyLinalg(), seed=3)
+        for shots in [0, 100, 10000, 100]:
+            consequent.precision = 0.0
+            MyQlmQPU.execute(system, qpu=emulator, shots=shots)
+            assert consequent.precision == pytest.approx(expected, abs=0.2 if shots else 1e-9)
+        assert emulator.simulations == 1
+
+
+class TestExactMarginals:
+    """
+    Testing the exact marginals of the measured qubits
+    """
+
+    @pytest.mark.parametrize('qubits', [[0, 1, 2], [2, 1], [1], [2, 0]])
+    def test_marginals(self, qubits):
+        """
+        Test the reduced state vector matches the samples of the measured qubits, in their order
+        """
+        circuit = TestAdaptiveShots.circuit()
+        expected = {sample.state.bitstring: sample.probability for sample in PyLinalg().submit(circuit.to_job(qubits=qubits))}
+        for qpu in [PyLinalg(), ShotEmulator(PyLinalg())]:
+            probabilities = exact_marginals(qpu, circuit, qubits)
+            assert probabilities.shape == (2,) * len(qubits)
+            for bits, probability in expected.items():
+                assert probabilities[tuple(int(bit) for bit in bits)] == pytest.approx(probability)
+        assert [marginal(probabilities, axis) for axis in range(len(qubits))] == pytest.approx([[1.0, 0.5, np.sin(0.15) ** 2][qubit] for qubit in qubits])
+
+
+class TestJointDistribution:
+    """
+    Testing the queries on the joint distribution of consequents
+    """
+    stages = [Fact('stage_{}'.format(n), 'stage {}'.format(n)) for n in range(3)]
+
+    def test_queries(self):
+        """
+        Test the probabilities of assignments and the most probable exclusive consequent
+        """
+        probabilities = np.zeros((2, 2, 2))
+        probabilities[1, 0, 0], probabilities[0, 1, 0], probabilities[0, 0, 1], probabilities[1, 1, 0] = 0.2, 0.35, 0.3, 0.15
+        distribution = JointDistribution(self.stages, probabilities)
+
+        assert distribution.marginal(self.stages[0]) == pytest.approx(0.35)
+        assert distribution.probability({'stage_0': True, self.stages[1]: False}) == pytest.approx(0.2)
+        assert distribution.probability({}) == pytest.approx(1.0)
+        assert distribution.argmax() == (self.stages[1], pytest.approx(0.35))
+        # The third stage is the only one true more often, but the first one is once the second is ignored
+        assert distribution.argmax(['stage_0', 'stage_2']) == (self.stages[0], pytest.approx(0.35))
+        with pytest.raises(ValueError) as ex_info:
+            distribution.marginal('stage_3')
+        assert ex_info.match(r'.*The fact is not part of the joint distribution.*')
+
+    def test_sources(self):
+        """
+        Test the distributions built from samples and from exact marginals agree
+        """
+        circuit = TestAdaptiveShots.circuit()
+        frequencies = {sample.state.bitstring: sample.probability for sample in PyLinalg().submit(circuit.to_job())}
+        sampled = JointDistribution.from_frequencies(self.stages[:2], [2, 1], frequencies)
+        exact = JointDistribution.from_probabilities(self.stages[:2], [1, 0], exact_marginals(PyLinalg(), circuit, [1, 2]))
+        assert sampled.probabilities == pytest.approx(exact.probabilities)
+        assert exact.marginal(self.stages[0]) == pytest.approx(np.sin(0.15) ** 2)
@@ -0,0 +1,99 @@
+# -*- coding : utf-8 -*-
+
+"""
+Test for the backend-selectable QPU
+"""
+
+import importlib
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from misc.selectable_qpu import SelectableQPU
+from neasqc_qrbs.backends import BACKENDS, Backend
+from neasqc_qrbs.sampling import AdaptiveShots, ExactProbabilities, ShotBudget
+from neasqc_qrbs.knowledge_rep import AndOperator, BuilderImpl
+from neasqc_qrbs.qrbs import MyQlmQPU
+from qat.qpus import PyLinalg
+from helpers import chained_system
+
+
+class TestSelectableQPU:
+    """
+    Testing SelectableQPU execution
+    """
+
+    def test_exact(self):
+        """
+        Test exact executions give the probability of the consequent of the first knowledge island
+        """
+        system, middle, _ = chained_system()
+        MyQlmQPU.execute(system, [system._engine._islands[0]], qpu=PyLinalg(), shots=0)
+        expected = np.sin(middle.precision * np.pi / 2) ** 2
+        middle.precision = 0.3
+
+        SelectableQPU.execute(system, [system._engine._islands[0]], qpu=PyLinalg(), shots=ExactProbabilities())
+        # SelectableQPU keeps the probability of each consequent as its precision
+        assert middle.precision == pytest.approx(expected)
+
+    def test_shot_budget(self):
+        """
+        Test the execution splitting a budget of shots among the knowledge islands from pilot shots
+        """
+        np.random.seed(11)
+        system, _, _ = chained_system()
+        reports = SelectableQPU.execute(system, qpu=PyLinalg(), shots=ShotBudget(3000, 128))
+        # The pilot of the fed knowledge island is discarded
+        assert sum(report['shots']['shots'] for report in reports) + 128 == 3000
+        assert set(reports[1]['shots']['intervals']) == {'consequent'}
+
+    def test_failed_sampling(self):
+        """
+        Test the failed execution of adaptive shots without a first round
+        """
+        system, _, _ = chained_system()
+        with pytest.raises(ValueError) as ex_info:
+            SelectableQPU.execute(system, qpu=PyLinalg(), shots=AdaptiveShots(0, tolerance=0.05))
+        assert ex_info.match(r'.*Adaptive shots need a first round of shots.*')
+
+    def test_failed_evaluation(self, monkeypatch):
+        """
+        Test the evaluation of a specified knowledge island which cannot be cut to fit the QPU
+        """
+        monkeypatch.setitem(BACKENDS, 'small', Backend('small', 3, factory=PyLinalg))
+        system, middle, _ = chained_system()
+        other = system.assert_fact('other', 0.8, 0.4)
+        last = system.assert_fact('last', 0.3)
+        big = system.assert_island([system.assert_rule(AndOperator(middle, other), last, 0.8)])
+        for qpu in [MyQlmQPU, SelectableQPU]:
+            with pytest.raises(ValueError) as ex_info:
+                qpu.evaluate(system, [big], qpu='small', cut=True)
+            assert ex_info.match(r'.*A KnowledgeIsland cannot be cut to fit the capacity of QPU.*')
+
+
+class TestIdc:
+    """
+    Testing the solution of the IDC
+    """
+
+    def test_amplitude_estimation(self, monkeypatch):
+        """
+        Test the outputs estimated by amplitude estimation are given as probabilities, like those of SelectableQPU
+        """
+        monkeypatch.syspath_prepend(os.path.join(os.path.dirname(__file__), '..', 'misc'))
+        idc = importlib.import_module('misc.idc')
+        inputs = ['T0', 'T1', 'T2', 'T3', 'T4', 'T5', 'N0A', 'N0B', 'N1A', 'N1B', 'N2A', 'N2B', 'N3A', 'N3B', 'N3C', 'M0', 'M1']
+        row = pd.Series({attribute: 0.1 + 0.05*n for n, attribute in enumerate(inputs)})
+
+        def system():
+            # Knowledge islands simulated in a reasonable time
+            system = idc.load_data_in_qrbs(row, idc.qrbs_idc())
+            for island in list(system._engine._islands):
+                if BuilderImpl.build_island(island)[0].arity > 9:
+                    system.retract_island(island)
+            return system
+
+        exact = idc.solve_qrbs(system(), PyLinalg(), shots=0)
+        estimated = idc.solve_qrbs(system(), PyLinalg(), ae_epsilon=0.05)
+        assert exact.values[0][-1] > 0.9
+        assert estimated.values[0] == pytest.approx(exact.values[0], abs=0.05)